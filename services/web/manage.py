@@ -1,9 +1,14 @@
 """Gunicorn integration w/ Flask"""
 
+import os
+
 from flask.cli import FlaskGroup
 from prepavol import create_app
 
-app = create_app()
+# Caches built in the gunicorn master before it forks its workers, when run
+# with --preload and PREPAVOL_PRELOAD=1 as in Dockerfile.prod. The flask CLI
+# and the development server build them on first use.
+app = create_app(preload=os.environ.get("PREPAVOL_PRELOAD") == "1")
 cli = FlaskGroup(app)
 
 if __name__ == "__main__":
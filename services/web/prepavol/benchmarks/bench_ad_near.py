@@ -0,0 +1,61 @@
+# *_* coding: utf-8 *_*
+
+"""Latency of the nearest aerodrome queries.
+
+Run from the prepavol directory:
+    python benchmarks/bench_ad_near.py
+"""
+
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from prepavol.ads import ad_index  # noqa: E402
+from prepavol.geo import great_circle_nm  # noqa: E402
+
+
+def random_locations(n_queries, seed=0):
+    """Locations over metropolitan France."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack(
+        (rng.uniform(42.3, 51.1, n_queries), rng.uniform(-4.8, 8.2, n_queries))
+    ).tolist()
+
+
+def brute_force(locations, k, radius):
+    """Distances to every aerodrome, one Python loop per query."""
+    aerodromes = list(ad_index.aerodromes.values())
+    for lat, lon in locations:
+        distances = sorted(
+            (float(great_circle_nm(lat, lon, ad.lat, ad.lon)), ad.code)
+            for ad in aerodromes
+        )
+        _ = distances[:k], [d for d in distances if d[0] <= radius]
+
+
+def indexed(locations, k, radius):
+    """Queries of the aerodrome index."""
+    for lat, lon in locations:
+        _ = ad_index.nearest(lat, lon, k), ad_index.within(lat, lon, radius)
+
+
+def bench(function, n_queries, k=5, radius=30):
+    """Time n_queries k-NN plus radius queries."""
+    locations = random_locations(n_queries)
+    start = perf_counter()
+    function(locations, k, radius)
+    elapsed = perf_counter() - start
+    print(
+        f"{function.__name__:>12}: {n_queries:>6} queries in {elapsed * 1000:8.1f} ms,"
+        f" {elapsed / n_queries * 1e6:7.1f} µs/query"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{len(ad_index)} aerodromes")
+    bench(brute_force, 200)
+    bench(indexed, 10_000)
@@ -0,0 +1,44 @@
+# *_* coding: utf-8 *_*
+
+"""Latency of the aerodrome typeahead search.
+
+Run from the prepavol directory:
+    python benchmarks/bench_ad_search.py
+"""
+
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from prepavol.ads import ad_index  # noqa: E402
+
+QUERIES = {
+    "code": "LFPO",
+    "code prefix": "LFP",
+    "one letter": "L",
+    "name": "toussus",
+    "word": "aubin",
+    "typo": "lognse",
+    "long typo": "toussus le nobel",
+    "no match": "qqq",
+}
+
+
+def bench(label, query, repeat=2_000, limit=10):
+    """Average time of one search."""
+    start = perf_counter()
+    for _ in range(repeat):
+        results = ad_index.search(query, limit)
+    elapsed = perf_counter() - start
+    print(
+        f"{label:>12} {query!r:>20}: {elapsed / repeat * 1e6:7.1f} µs,"
+        f" {', '.join(results[:3])}"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{len(ad_index)} aerodromes")
+    for label, query in QUERIES.items():
+        bench(label, query)
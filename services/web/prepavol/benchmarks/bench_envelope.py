@@ -0,0 +1,64 @@
+# *_* coding: utf-8 *_*
+
+"""Cost of 100k cg envelope checks.
+
+Run from the prepavol directory:
+    python benchmarks/bench_envelope.py
+"""
+
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from prepavol.fleet import fleet_registry  # noqa: E402
+from prepavol.planes import WeightBalance  # noqa: E402
+
+N_CHECKS = 100_000
+
+
+def timed(label, func):
+    """Print the time of func."""
+    start = perf_counter()
+    func()
+    elapsed = perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms, {N_CHECKS / elapsed:12,.0f} checks/s")
+
+
+def main():
+    """Run the benchmarks."""
+    envelope = fleet_registry.get("F-GTZR").geometry
+    rng = np.random.default_rng(0)
+    cg = rng.uniform(0.15, 0.6, N_CHECKS)
+    auw = rng.uniform(550, 1050, N_CHECKS)
+    plane = WeightBalance("F-GTZR", pax0=80, mainfuel=60)
+
+    def cg_property():
+        for _ in range(N_CHECKS):
+            _ = plane.cg
+
+    def scalar_checks():
+        for x, y in zip(cg.tolist(), auw.tolist()):
+            envelope.contains(x, y)
+
+    timed("WeightBalance.cg reads", cg_property)
+    timed("Envelope.contains, one point per call", scalar_checks)
+    timed("Envelope.contains, one array", lambda: envelope.contains(cg, auw))
+    try:
+        from shapely.geometry import Point
+        from shapely.geometry.polygon import Polygon
+    except ImportError:
+        return
+
+    def shapely_checks():
+        for x, y in zip(cg.tolist(), auw.tolist()):
+            Polygon(envelope.points).contains(Point(x, y))
+
+    timed("shapely Polygon built per check", shapely_checks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# *_* coding: utf-8 *_*
+
+"""Throughput of WeightBalance.evaluate_batch.
+
+Run from the prepavol directory:
+    python benchmarks/bench_evaluate_batch.py
+"""
+
+import logging
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from prepavol.planes import WeightBalance  # noqa: E402
+
+
+def random_loadings(n_rows, seed=0):
+    """Occupants, baggage and fuel, one loading per row."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack(
+        (
+            rng.integers(0, 111, (n_rows, 4)),  # pax0 to pax3
+            rng.integers(0, 61, (n_rows, 2)),  # baggage, baggage2
+            rng.integers(0, 131, (n_rows, 1)),  # mainfuel
+            rng.integers(0, 71, (n_rows, 3)),  # wing and auxiliary tanks
+        )
+    ).astype(np.float64)
+
+
+def bench(n_rows, callsign="F-GTZR"):
+    """Time one evaluate_batch call over n_rows random loadings."""
+    loadings = random_loadings(n_rows)
+    start = perf_counter()
+    batch = WeightBalance.evaluate_batch(callsign, loadings)
+    elapsed = perf_counter() - start
+    print(
+        f"{n_rows:>9} loadings, {int(batch.ready_to_fly.sum()):>7} ready to fly:"
+        f" {elapsed * 1000:8.1f} ms, {n_rows / elapsed:12,.0f} loadings/s"
+    )
+
+
+def bench_instances(n_rows, callsign="F-GTZR"):
+    """Time the same loadings as one WeightBalance each."""
+    loadings = random_loadings(n_rows).tolist()
+    logging.disable(logging.CRITICAL)
+    start = perf_counter()
+    for row in loadings:
+        plane = WeightBalance(callsign, *row)
+        _ = plane.is_ready_to_fly, plane.endurance
+    elapsed = perf_counter() - start
+    logging.disable(logging.NOTSET)
+    print(
+        f"{n_rows:>9} WeightBalance instances:  {elapsed * 1000:8.1f} ms,"
+        f" {n_rows / elapsed:12,.0f} loadings/s"
+    )
+
+
+if __name__ == "__main__":
+    bench_instances(2_000)
+    for rows in (10_000, 1_000_000):
+        bench(rows)
@@ -0,0 +1,43 @@
+# *_* coding: utf-8 *_*
+
+"""Import time of prepavol in a fresh interpreter, as a worker starts.
+
+Run from the prepavol directory:
+    python benchmarks/bench_import.py
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULES = ("prepavol", "prepavol.main", "prepavol.planes", "prepavol.logbook", "numpy", "flask")
+
+
+def import_times(module):
+    """Cumulative import times in µs of a fresh interpreter importing module."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (ROOT, env.get("PYTHONPATH"))))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    runs = [import_times("prepavol") for _ in range(5)]
+    for module in MODULES:
+        best = min(run.get(module, 0) for run in runs)
+        print(f"{module:>18}: {best / 1000:7.1f} ms")
@@ -0,0 +1,40 @@
+# *_* coding: utf-8 *_*
+
+"""Throughput of PlanePerf.predict_many.
+
+Run from the prepavol directory:
+    python benchmarks/bench_plane_perf.py
+"""
+
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from prepavol.plane_perf import PlanePerf  # noqa: E402
+
+
+def bench(n_rows, planetype="DR400-140B", operation="takeoff"):
+    """Time one predict_many call over n_rows random conditions."""
+    rng = np.random.default_rng(0)
+    auw = rng.uniform(650, 1000, n_rows)
+    altitude = rng.uniform(0, 8000, n_rows)
+    temperature = rng.uniform(-20, 50, n_rows)
+    qnh = rng.uniform(950, 1050, n_rows)
+    # Model fitting is not part of the measure
+    PlanePerf.model(planetype, operation)
+    start = perf_counter()
+    distances = PlanePerf.predict_many(planetype, operation, auw, altitude, temperature, qnh)
+    elapsed = perf_counter() - start
+    print(
+        f"{n_rows:>9} rows -> {distances.shape}: {elapsed * 1000:8.1f} ms,"
+        f" {n_rows / elapsed:12,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    for rows in (10_000, 1_000_000):
+        bench(rows)
@@ -16,13 +16,21 @@ from flask_session import Session
 import prepavol.logbook
 import prepavol.planes
 from .main import main as main_blueprint
+from .metar_service import metar_service
+from .plot_cache import plot_cache
+from .warmup import preload as preload_caches
 from flask_wtf.csrf import CSRFProtect
 
 __all__ = ["logbook", "planes"]
 csrf = CSRFProtect()
 
-def create_app():
-    """Flask app."""
+def create_app(preload=False):
+    """Flask app.
+
+    Arguments:
+        preload (bool): build the static caches now rather than on the
+            first requests, see prepavol.warmup.
+    """
     app = Flask(__name__)
     csrf.init_app(app)
     if os.environ["FLASK_ENV"].lower() in ["dev", "development"]:
@@ -36,9 +44,25 @@ def create_app():
 
     sess = Session()
     sess.init_app(app)
+
+    plot_cache.configure(
+        app.config["PLOT_CACHE_MAX_BYTES"],
+        app.config["PLOT_CACHE_DIR"],
+        app.config["PLOT_CACHE_MAX_DISK_BYTES"],
+    )
+    metar_service.configure(
+        url=app.config["METAR_URL"],
+        ttl=app.config["METAR_TTL"],
+        stations=app.config["METAR_STATIONS"],
+    )
     
     # Registrations
     # blueprint for non-auth parts of app
     app.register_blueprint(main_blueprint)
 
+    if preload:
+        # The forms are built in a request context
+        with app.test_request_context():
+            preload_caches()
+
     return app
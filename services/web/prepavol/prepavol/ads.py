@@ -1,49 +1,374 @@
-from .file_reader import FileReader
+"""Aerodromes of data/alts.yaml.
+
+The file is parsed once per process into an index of immutable records
+keyed by ICAO code, with the coordinates already decoded to decimal
+degrees, so that a lookup is a dict hit. As for the fleet, the index is
+swapped as a whole when the file's modification time changes.
+
+The coordinates are also indexed for radius and nearest neighbour
+queries in nautical miles, used to suggest alternates, and the codes and
+names in a sorted array of search keys for typeahead queries.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+from .geo import PointIndex, great_circle_nm
+
+AD_FILE = Path(__file__).parent / "data" / "alts.yaml"
+
+
+class UnknownAerodromeError(Exception):
+    """ICAO code missing from alts.yaml."""
+
+
+def normalize(text):
+    """Uppercase text without accents nor punctuation, for searches."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return " ".join(re.split(r"[^A-Z0-9]+", text.upper())).strip()
+
+
+def _leading(matches):
+    """all(matches[:i]) for i from 0 to m, as an (m + 1, n) array."""
+    leading = np.ones((len(matches) + 1, matches.shape[1]), dtype=bool)
+    np.logical_and.accumulate(matches, axis=0, out=leading[1:])
+    return leading
+
+
+def _trailing(matches):
+    """all(matches[i:]) for i from 0 to m, as an (m + 1, n) array."""
+    return _leading(matches[::-1])[::-1]
+
+
+@dataclass(frozen=True)
+class NameIndex:
+    """Sorted search keys over aerodrome codes and names.
+
+    Every record has a key for its code, one for its name and one for
+    each word that starts its name over, so that "AUBIN" finds "DIEPPE
+    SAINT AUBIN". The keys starting with a query are a contiguous slice
+    found by bisection. The keys are also stored as a byte matrix, to
+    look for typos in all of them at once with NumPy.
+
+    Attributes:
+        codes (tuple): ICAO codes.
+        keys (tuple): sorted normalized keys.
+        ranks (ndarray): 0 for a code, 1 for a name, 2 for a word.
+        targets (ndarray): index in codes of every key.
+        letters (ndarray): (width, keys) uint8 matrix, zero padded, one
+            row per letter position.
+    """
+
+    codes: tuple
+    keys: tuple
+    ranks: np.ndarray
+    targets: np.ndarray
+    letters: np.ndarray
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the keys of an {code: Aerodrome} mapping."""
+        codes = tuple(records)
+        entries = set()
+        for target, code in enumerate(codes):
+            entries.add((normalize(code), 0, target))
+            words = normalize(records[code].nom).split()
+            for position in range(len(words)):
+                entries.add((" ".join(words[position:]), min(position, 1) + 1, target))
+        entries = sorted(entries)
+        keys = tuple(key for key, _, _ in entries)
+        width = max(map(len, keys), default=0) + 1
+        letters = np.frombuffer(
+            b"".join(key.encode().ljust(width, b"\0") for key in keys), dtype=np.uint8
+        ).reshape(len(keys), width)
+        # Letter positions as rows: the NumPy scans below run along keys
+        return cls(
+            codes,
+            keys,
+            np.array([rank for _, rank, _ in entries], dtype=np.int8),
+            np.array([target for _, _, target in entries], dtype=np.intp),
+            np.ascontiguousarray(letters.T),
+        )
+
+    def _typos(self, query):
+        """Indices of the keys with a prefix one edit away from query.
+
+        Substitution, extra or missing letter and transposition of two
+        adjacent letters are single edits.
+        """
+        keys = self.letters
+        q = np.frombuffer(query[: len(keys) - 1].encode(), dtype=np.uint8)[:, np.newaxis]
+        size = len(q)
+        same = keys[:size] == q
+        # leading[i]: the first i letters match
+        leading = _leading(same)
+        substitution = (~same).sum(axis=0) <= 1
+        extra = leading[:size] & _trailing(keys[: size - 1] == q[1:])
+        missing = leading & _trailing(keys[1 : size + 1] == q)
+        swapped = (keys[: size - 1] == q[1:]) & (keys[1:size] == q[:-1])
+        transposition = leading[: size - 1] & swapped & _trailing(same)[2:]
+        return np.flatnonzero(
+            substitution | extra.any(axis=0) | missing.any(axis=0) | transposition.any(axis=0)
+        )
+
+    def search(self, query, limit=10):
+        """Codes matching a query, best first.
+
+        Keys starting with the query come first: exact code, code
+        prefix, name prefix then word prefix. When none does, keys one
+        typing error away from the query are looked for, in the same
+        order.
+
+        Arguments:
+            query (str): code or name, or their beginning.
+            limit (int): maximum number of codes.
+
+        Returns:
+            list: ICAO codes.
+        """
+        query = normalize(query)
+        if not query or limit < 1:
+            return []
+        # Keys only hold A-Z, 0-9 and spaces, all before "~"
+        found = np.arange(
+            bisect_left(self.keys, query), bisect_left(self.keys, query + "~")
+        )
+        if not len(found) and len(query) >= 3:
+            found = self._typos(query)
+        ranks = self.ranks[found]
+        targets = self.targets[found]
+        # Best rank of every aerodrome, then aerodromes by rank and code
+        order = np.lexsort((targets, ranks))
+        targets = targets[order]
+        _, first = np.unique(targets, return_index=True)
+        best = [self.codes[target] for target in targets[np.sort(first)]]
+        if query in self.codes:
+            best.remove(query)
+            best.insert(0, query)
+        return best[:limit]
+
+
+def dms_to_decimal(old):
+    """Convert a 49°52'57"N like coordinate to decimal degrees."""
+    direction = {'N': 1, 'S': -1, 'E': 1, 'W': -1}
+    new = old.replace(u'°', ' ').replace('\'', ' ').replace('"', ' ')
+    new = new.split()
+    new_dir = new.pop()
+    new.extend([0, 0, 0])
+    degrees = int(new[0]) + int(new[1]) / 60.0 + int(new[2]) / 3600.0
+    return round(degrees * direction[new_dir], 5)
+
+
+@dataclass(frozen=True)
+class Aerodrome:
+    """Immutable description of an aerodrome."""
+
+    code: str
+    nom: str
+    var: float
+    lat: float
+    lon: float
+    alt: int
+    GUND_DTHR_ALT_ft: Optional[int]
+    trafic: str
+    statut: str
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from an alts.yaml entry."""
+        lat, lon = data["Geo"].split(' ')
+        return cls(
+            code=data["code"],
+            nom=data["nom"],
+            var=data["var"],
+            lat=dms_to_decimal(lat),
+            lon=dms_to_decimal(lon),
+            alt=data["alt"],
+            GUND_DTHR_ALT_ft=data["GUND_DTHR_ALT_ft"],
+            trafic=data["trafic"],
+            statut=data["statut"],
+        )
+
+    @property
+    def point(self):
+        """[latitude, longitude] in decimal degrees."""
+        return [self.lat, self.lon]
+
+
+class AerodromeIndex:
+    """Aerodromes loaded once and refreshed when the file changes.
+
+    Arguments:
+        path (Path): the aerodromes yaml file.
+    """
+
+    def __init__(self, path=AD_FILE):
+        """Init."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # (mtime, raw data, records, codes, spatial index, name index)
+        # swapped as a whole on reload
+        self._state = (None, {}, {}, (), None, None)
+
+    def _current(self):
+        """Return the current state, reloading the file if its mtime changed."""
+        mtime = self.path.stat().st_mtime_ns
+        state = self._state
+        if state[0] == mtime:
+            return state
+        with self._lock:
+            # Another thread may have reloaded while we were waiting
+            if self._state[0] != mtime:
+                self._state = self._load(mtime)
+            return self._state
+
+    def _load(self, mtime):
+        """Parse the aerodromes file and decode the coordinates."""
+        with open(self.path, "rb") as stream:
+            raw = yaml.safe_load(stream)
+        records = {str(k): Aerodrome.from_dict(v) for k, v in raw.items()}
+        codes = tuple(records)
+        points = PointIndex(
+            [records[code].lat for code in codes], [records[code].lon for code in codes]
+        )
+        return (mtime, raw, records, codes, points, NameIndex.from_records(records))
+
+    @property
+    def data(self) -> dict:
+        """Raw data as parsed from yaml. Must be treated as read-only."""
+        return self._current()[1]
+
+    @property
+    def aerodromes(self) -> Dict[str, Aerodrome]:
+        """Aerodrome records keyed by ICAO code."""
+        return self._current()[2]
+
+    def get(self, code) -> Aerodrome:
+        """Return the record of an ICAO code.
+
+        Raises:
+            UnknownAerodromeError: unknown code.
+        """
+        records = self.aerodromes
+        if code not in records:
+            suggestions = self.search(code, 5)
+            hint = f" Did you mean {', '.join(suggestions)}?" if suggestions else ""
+            raise UnknownAerodromeError(f"No such AD name {code!r}.{hint}")
+        return records[code]
+
+    def search(self, query, limit=10) -> List[str]:
+        """ICAO codes whose code or name match a typeahead query, best first."""
+        return self._current()[5].search(query, limit)
+
+    def _matches(self, state, indices, distances):
+        """(record, distance) pairs of a spatial query."""
+        records, codes = state[2], state[3]
+        return [
+            (records[codes[i]], round(d, 1))
+            for i, d in zip(indices.tolist(), distances.tolist())
+        ]
+
+    def within(self, lat, lon, radius_nm) -> List[Tuple[Aerodrome, float]]:
+        """Aerodromes within a radius of a location, nearest first.
+
+        Arguments:
+            lat, lon (float): location in decimal degrees.
+            radius_nm (float): radius in nautical miles.
+
+        Returns:
+            list: (aerodrome, distance in NM) pairs.
+        """
+        state = self._current()
+        return self._matches(state, *state[4].within(lat, lon, radius_nm))
+
+    def nearest(self, lat, lon, k=1) -> List[Tuple[Aerodrome, float]]:
+        """The k aerodromes nearest to a location, nearest first.
+
+        Returns:
+            list: (aerodrome, distance in NM) pairs.
+        """
+        state = self._current()
+        return self._matches(state, *state[4].nearest(lat, lon, k))
+
+    def alternates(self, code, k=5, radius_nm=None) -> List[Tuple[Aerodrome, float]]:
+        """Nearest aerodromes to a destination, the destination excluded.
+
+        Arguments:
+            code (str): ICAO code of the destination.
+            k (int): maximum number of alternates.
+            radius_nm (float): optional maximum distance in NM.
+
+        Raises:
+            UnknownAerodromeError: unknown code.
+        """
+        destination = self.get(code)
+        if radius_nm is None:
+            found = self.nearest(destination.lat, destination.lon, k + 1)
+        else:
+            found = self.within(destination.lat, destination.lon, radius_nm)
+        return [(ad, d) for ad, d in found if ad.code != code][:k]
+
+    def distance(self, origin, destination) -> float:
+        """Great-circle distance in NM between two ICAO codes.
+
+        Raises:
+            UnknownAerodromeError: unknown code.
+        """
+        first, second = self.get(origin), self.get(destination)
+        return float(great_circle_nm(first.lat, first.lon, second.lat, second.lon))
+
+    def __contains__(self, code):
+        """Membership test on ICAO codes."""
+        return code in self.aerodromes
+
+    def __len__(self):
+        """Number of aerodromes."""
+        return len(self.aerodromes)
+
+
+ad_index = AerodromeIndex()
+
 
 class ADs:
     def __init__(
         self,
         nom
     ) -> None:
-        terrains = ADs.load_ad_data()
-        if nom not in terrains.keys():
-            raise Exception(
-                f"No such AD name. Valid AD names are {', '.join(terrains.keys())}"
-            )
-        selected_ad = terrains[nom]
-        self.nom: str = selected_ad["nom"]
-        self.code: str = selected_ad["code"]
-        self.var: float = selected_ad["var"]
-        self.point: list = self.get_geo(selected_ad["Geo"])
-        self.alt: int = selected_ad["alt"]
-        self.GUND_DTHR_ALT_ft: int = selected_ad["GUND_DTHR_ALT_ft"]
-        self.trafic: str = selected_ad["trafic"]
-        self.statut: str = selected_ad["statut"]
+        # Decoded record from the process-wide index: no yaml parsing here
+        selected_ad = ad_index.get(nom)
+        self.nom: str = selected_ad.nom
+        self.code: str = selected_ad.code
+        self.var: float = selected_ad.var
+        self.point: list = selected_ad.point
+        self.alt: int = selected_ad.alt
+        self.GUND_DTHR_ALT_ft: int = selected_ad.GUND_DTHR_ALT_ft
+        self.trafic: str = selected_ad.trafic
+        self.statut: str = selected_ad.statut
 
     @staticmethod
     def load_ad_data():
-        return FileReader("data/alts.yaml").readfile()
-
-    
-    def __conversion(self,old):
-        direction = {'N':1, 'S':-1, 'E': 1, 'W':-1}
-        new = old.replace(u'°',' ').replace('\'',' ').replace('"',' ')
-        new = new.split()
-        new_dir = new.pop()
-        new.extend([0,0,0])
-        return round((int(new[0])+int(new[1])/60.0+int(new[2])/3600.0) * direction[new_dir], 5)
-    
-    def get_geo(self,str):
+        """Aerodromes as loaded from alts.yaml. Must be treated as read-only."""
+        return ad_index.data
+
+    def get_geo(self, str):
         lat, lon = str.split(' ')
-        return [self.__conversion(lat), self.__conversion(lon)]
+        return [dms_to_decimal(lat), dms_to_decimal(lon)]
 
     def get_dict(self):
         return {
-        'code': self.code,
-        'var': self.var,
-        'geo': self.point,
-        'nom': self.nom, 
-        'alt': self.alt, 
-        'trafic': self.trafic,
-        'statut': self.statut
-        }
\ No newline at end of file
+            'code': self.code,
+            'var': self.var,
+            'geo': self.point,
+            'nom': self.nom,
+            'alt': self.alt,
+            'trafic': self.trafic,
+            'statut': self.statut,
+        }
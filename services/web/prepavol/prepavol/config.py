@@ -5,7 +5,8 @@
 from datetime import timedelta
 from dataclasses import dataclass
 import pathlib
-from tempfile import mkdtemp
+import os
+from tempfile import gettempdir, mkdtemp
 
 
 @dataclass
@@ -21,6 +22,13 @@ class Config:
     SESSION_TYPE: str = "filesystem"
     SESSION_FILE_DIR: str = mkdtemp()
     SESSION_PERMANENT: bool = True
+    PLOT_CACHE_MAX_BYTES: int = 32 * 2**20
+    PLOT_CACHE_DIR: str = None
+    PLOT_CACHE_MAX_DISK_BYTES: int = 256 * 2**20
+    METAR_URL: str = "https://tgftp.nws.noaa.gov/data/observations/metar/stations"
+    METAR_TTL: int = 600
+    # Home stations of the clubs, refreshed in the background: "LFPN,LFPZ"
+    METAR_STATIONS: tuple = tuple(filter(None, os.environ.get("METAR_STATIONS", "").split(",")))
     
 @dataclass
 class DevelopmentConfig(Config):
@@ -34,6 +42,8 @@ class ProductionConfig(Config):
     """App prod config."""
 
     SECRET_KEY: str = "MeRgUeZ34"
+    # Shared by the gunicorn workers so that any of them serves the report plots
+    PLOT_CACHE_DIR: str = os.path.join(gettempdir(), "prepavol-plots")
 
 
 @dataclass
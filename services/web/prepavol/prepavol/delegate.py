@@ -0,0 +1,29 @@
+# *_* coding: utf-8 *_*
+
+"""Read-only attributes delegated to an attribute of the instance.
+
+WeightBalance exposes the fields of its aircraft record and EmportCarburant
+those of its fuel plan as their own attributes, without copying them.
+"""
+
+__all__ = ["DelegatedField"]
+
+
+class DelegatedField:
+    """Read-only attribute read from an attribute of the instance.
+
+    Arguments:
+        source (str): attribute of the instance holding the value.
+        name (str): attribute of the source.
+    """
+
+    def __init__(self, source, name):
+        """Init."""
+        self.source = source
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        """Value of the source attribute, or the descriptor on the class."""
+        if instance is None:
+            return self
+        return getattr(getattr(instance, self.source), self.name)
@@ -1,8 +1,93 @@
 import datetime
+from dataclasses import dataclass
+from typing import Tuple
 
 import humanize
-from.planes import WeightBalance
+import numpy as np
+from .ads import ad_index
+from .delegate import DelegatedField
 from .emport_carburant_form import TypeVol
+from .fleet import fleet_registry
+from .route import plan_legs
+
+
+@dataclass(frozen=True)
+class FuelPlan:
+    """Times in minutes and fuel in litres of a fuel plan.
+
+    Computed once by EmportCarburant from the aircraft's fleet record, so
+    that the report and the formatters only read precomputed numbers.
+    """
+
+    unusable_fuel: float
+    unusable_fuel_time: int
+    roulage_time: int
+    roulage_fuel: float
+    arrival_time: int
+    arrival_fuel: float
+    branches_time: Tuple[float, ...]
+    branches_fuel: Tuple[float, ...]
+    degagement_distance: float
+    degagement_time: float
+    degagement_fuel: float
+    marge_time: int
+    marge_fuel: float
+    reserve_time: int
+    reserve_fuel: float
+    sum_time: float
+    sum_fuel: float
+    carburant_emporte_main: float
+    carburant_emporte_main_time: float
+    carburant_emporte_wings: float
+    carburant_emporte_wings_time: float
+    carburant_emporte_aux: float
+    carburant_emporte_aux_time: float
+    sum_carburant_emporte: float
+    sum_carburant_emporte_time: float
+    max_flight_time: float
+    compared_fuel: float
+
+
+@dataclass(frozen=True)
+class FleetFuelPlan:
+    """Minimum fuel of a route for several aircraft, one row each.
+
+    Attributes:
+        callsigns (list): call signs, in fleet order.
+        time (ndarray): planned time in minutes, reserve included.
+        required (ndarray): minimum fuel on board in litres.
+        tanks (ndarray): (aircraft, 4) litres in the main, left wing,
+            right wing and auxiliary tanks, filled in this order, both
+            wing tanks evenly.
+        percent (ndarray): (aircraft, 4) tank levels rounded up to the
+            next 10 % as in the fuel form, 0 for missing tanks.
+        fits (ndarray): whether the tanks can hold the required fuel.
+        flyable (ndarray): whether the aircraft is faster than the wind on
+            every leg and on the dégagement. Time, fuel and tanks are NaN
+            otherwise, and the aircraft does not fit.
+    """
+
+    callsigns: list
+    time: np.ndarray
+    required: np.ndarray
+    tanks: np.ndarray
+    percent: np.ndarray
+    fits: np.ndarray
+    flyable: np.ndarray
+
+    def __len__(self):
+        """Number of aircraft."""
+        return len(self.callsigns)
+
+
+def _reserve_time(type_vol) -> int:
+    """Final reserve in minutes of a TypeVol."""
+    if type_vol.name == "NUIT":
+        return 45
+    elif type_vol.name == "NAV" or type_vol.name == "VLJHA":
+        return 30
+    else:
+        return 10
 
 
 class EmportCarburant():
@@ -18,6 +103,11 @@ class EmportCarburant():
         leftwingfuel,
         rightwingfuel,
         auxfuel,
+        destination=None,
+        alternate=None,
+        route=None,
+        wind_direction=0,
+        wind_speed=0,
         **kwargs
         ) -> None:
         self.callsign = callsign
@@ -30,142 +120,230 @@ class EmportCarburant():
         self.leftwingfuel = leftwingfuel
         self.rightwingfuel = rightwingfuel
         self.auxfuel = auxfuel
-        self.plane = WeightBalance(callsign)
+        self.destination = destination.upper() if destination else None
+        self.alternate = alternate.upper() if alternate else None
+        # Immutable fleet record: planetype, fuelrate, tas and tank sizes
+        self.plane = fleet_registry.get(callsign)
+        # Legs between aerodromes replace the hand-entered branches
+        self.legs = None
+        if route:
+            self.legs = plan_legs(route, self.plane.tas, wind_direction, wind_speed)
+            self.nb_branches = len(self.legs)
+            self.branches = [
+                {"distance": round(distance, 1), "vent": round(headwind)}
+                for distance, headwind in zip(
+                    self.legs.distance.tolist(), self.legs.headwind.tolist()
+                )
+            ]
+            self.destination = self.destination or self.legs.codes[-1]
+        self.plan = self._compute_plan()
+
+    def _compute_plan(self) -> FuelPlan:
+        """Compute every time and fuel quantity of the plan once."""
+        plane = self.plane
+        per_minute = plane.fuelrate / 60
+
+        if self.legs is not None:
+            branches_time = tuple(self.legs.time.tolist())
+        else:
+            branches_time = tuple(
+                EmportCarburant.calculate_tps_vol_corrige(b["vent"], b["distance"], plane.tas)
+                for b in self.branches
+            )
+        branches_fuel = tuple(per_minute * t for t in branches_time)
+
+        if self.destination and self.alternate:
+            degagement_distance = round(ad_index.distance(self.destination, self.alternate), 1)
+        else:
+            degagement_distance = self.degagement["distance"]
+        degagement_time = (60 / (plane.tas - self.degagement["vent"])) * degagement_distance
+
+        reserve_time = _reserve_time(self.type_vol)
+        unusable_fuel = plane.unusable_mainfuel + plane.unusable_wingfuel
+        unusable_fuel_time = 0
+        roulage_time = self.nb_branches * 5
+        arrival_time = self.nb_branches * 10
+        marge_time = int(self.marge)
+        sum_time = (
+            sum(branches_time) + marge_time + arrival_time + roulage_time
+            + reserve_time + degagement_time + unusable_fuel_time
+        )
+        sum_fuel = (
+            sum(branches_fuel) + per_minute * marge_time + per_minute * arrival_time
+            + per_minute * roulage_time + per_minute * reserve_time
+            + per_minute * degagement_time + unusable_fuel
+        )
+
+        carburant_emporte_main = plane.maxmainfuel * (self.mainfuel / 100)
+        carburant_emporte_wings = plane.maxwingfuel * (self.carburant_wings / 100)
+        carburant_emporte_aux = plane.maxauxfuel * (self.auxfuel / 100)
+        carburant_emporte_main_time = (carburant_emporte_main / plane.fuelrate * 60) - (plane.unusable_mainfuel / plane.fuelrate * 60)
+        carburant_emporte_wings_time = (carburant_emporte_wings / plane.fuelrate * 60) - (plane.unusable_wingfuel / plane.fuelrate * 60)
+        carburant_emporte_aux_time = carburant_emporte_aux / plane.fuelrate * 60
+        sum_carburant_emporte = carburant_emporte_main + carburant_emporte_aux + carburant_emporte_wings
+        sum_carburant_emporte_time = carburant_emporte_main_time + carburant_emporte_wings_time + carburant_emporte_aux_time
+
+        return FuelPlan(
+            unusable_fuel=unusable_fuel,
+            unusable_fuel_time=unusable_fuel_time,
+            roulage_time=roulage_time,
+            roulage_fuel=per_minute * roulage_time,
+            arrival_time=arrival_time,
+            arrival_fuel=per_minute * arrival_time,
+            branches_time=branches_time,
+            branches_fuel=branches_fuel,
+            degagement_distance=degagement_distance,
+            degagement_time=degagement_time,
+            degagement_fuel=per_minute * degagement_time,
+            marge_time=marge_time,
+            marge_fuel=per_minute * marge_time,
+            reserve_time=reserve_time,
+            reserve_fuel=per_minute * reserve_time,
+            sum_time=sum_time,
+            sum_fuel=sum_fuel,
+            carburant_emporte_main=carburant_emporte_main,
+            carburant_emporte_main_time=carburant_emporte_main_time,
+            carburant_emporte_wings=carburant_emporte_wings,
+            carburant_emporte_wings_time=carburant_emporte_wings_time,
+            carburant_emporte_aux=carburant_emporte_aux,
+            carburant_emporte_aux_time=carburant_emporte_aux_time,
+            sum_carburant_emporte=sum_carburant_emporte,
+            sum_carburant_emporte_time=sum_carburant_emporte_time,
+            max_flight_time=sum_carburant_emporte_time - reserve_time,
+            compared_fuel=sum_fuel - sum_carburant_emporte,
+        )
+
+    unusable_fuel = DelegatedField("plan", "unusable_fuel")
+    unusable_fuel_time = DelegatedField("plan", "unusable_fuel_time")
+    roulage_time = DelegatedField("plan", "roulage_time")
+    roulage_fuel = DelegatedField("plan", "roulage_fuel")
+    arrival_time = DelegatedField("plan", "arrival_time")
+    arrival_fuel = DelegatedField("plan", "arrival_fuel")
+    branches_time = DelegatedField("plan", "branches_time")
+    branches_fuel = DelegatedField("plan", "branches_fuel")
+    degagement_distance = DelegatedField("plan", "degagement_distance")
+    degagement_time = DelegatedField("plan", "degagement_time")
+    degagement_fuel = DelegatedField("plan", "degagement_fuel")
+    marge_time = DelegatedField("plan", "marge_time")
+    marge_fuel = DelegatedField("plan", "marge_fuel")
+    reserve_time = DelegatedField("plan", "reserve_time")
+    reserve_fuel = DelegatedField("plan", "reserve_fuel")
+    sum_time = DelegatedField("plan", "sum_time")
+    sum_fuel = DelegatedField("plan", "sum_fuel")
+    carburant_emporte_main = DelegatedField("plan", "carburant_emporte_main")
+    carburant_emporte_main_time = DelegatedField("plan", "carburant_emporte_main_time")
+    carburant_emporte_wings = DelegatedField("plan", "carburant_emporte_wings")
+    carburant_emporte_wings_time = DelegatedField("plan", "carburant_emporte_wings_time")
+    carburant_emporte_aux = DelegatedField("plan", "carburant_emporte_aux")
+    carburant_emporte_aux_time = DelegatedField("plan", "carburant_emporte_aux_time")
+    sum_carburant_emporte = DelegatedField("plan", "sum_carburant_emporte")
+    sum_carburant_emporte_time = DelegatedField("plan", "sum_carburant_emporte_time")
+    max_flight_time = DelegatedField("plan", "max_flight_time")
+    get_compared_fuel = DelegatedField("plan", "compared_fuel")
+
+    @staticmethod
+    def fleet_minimum_fuel(
+        route,
+        type_vol,
+        marge,
+        alternate=None,
+        degagement=None,
+        wind_direction=0,
+        wind_speed=0,
+        callsigns=None,
+    ) -> FleetFuelPlan:
+        """Minimum fuel of a route for every aircraft of the fleet at once.
+
+        Times and fuel follow the plan of an EmportCarburant with the same
+        route, for every aircraft's tas, fuel flow and tanks, as arrays.
+
+        Arguments:
+            route (str or sequence): ICAO codes of the aerodromes, in order.
+            type_vol (str): TypeVol name, for the final reserve.
+            marge (int): margin in minutes.
+            alternate (str): ICAO code of the alternate, the dégagement
+                being the great-circle distance from the destination.
+            degagement (dict): "distance" and "vent" of the dégagement
+                when there is no alternate, its "vent" applying to the
+                alternate otherwise.
+            wind_direction, wind_speed: wind along the route.
+            callsigns (list): subset of the fleet, the whole fleet by default.
+
+        Raises:
+            UnknownAerodromeError: unknown code.
+            ValueError: fewer than two aerodromes in the route.
+        """
+        table = fleet_registry.table
+        if callsigns is not None:
+            table = table.take(callsigns)
+        tas = table.tas[:, np.newaxis]
+        legs = plan_legs(route, tas, wind_direction, wind_speed)
+        nb_branches = len(legs)
+        degagement = degagement or {"distance": 0, "vent": 0}
+        if alternate:
+            distance = round(ad_index.distance(legs.codes[-1], alternate.upper()), 1)
+        else:
+            distance = degagement["distance"]
+        # A head wind at or above the tas never gets there
+        degagement_speed = table.tas - degagement["vent"]
+        flyable = np.isfinite(legs.time).all(axis=1) & (degagement_speed > 0)
+        with np.errstate(divide="ignore"):
+            degagement_time = (60 / degagement_speed) * distance
+
+        time = (
+            legs.time.sum(axis=1) + int(marge) + nb_branches * 10 + nb_branches * 5
+            + _reserve_time(TypeVol[type_vol]) + degagement_time
+        )
+        time = np.where(flyable, time, np.nan)
+        unusable = table.unusable_mainfuel + table.unusable_wingfuel
+        required = table.fuelrate / 60 * time + unusable
+
+        # Main tank first, then both wing tanks evenly, then the auxiliary one
+        capacity = table.capacity
+        stages = np.column_stack(
+            (capacity[:, 0], capacity[:, 1] + capacity[:, 2], capacity[:, 3])
+        )
+        before = np.cumsum(stages, axis=1) - stages
+        fill = np.clip(required[:, np.newaxis] - before, 0, stages)
+        tanks = np.column_stack((fill[:, 0], fill[:, 1] / 2, fill[:, 1] / 2, fill[:, 2]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where(
+                capacity > 0, np.clip(10 * np.ceil(tanks / capacity * 10 - 1e-9), 0, 100), 0
+            )
+        percent = np.where(flyable[:, np.newaxis], percent, 0)
+        return FleetFuelPlan(
+            callsigns=list(table.callsigns),
+            time=time,
+            required=required,
+            tanks=tanks,
+            percent=percent,
+            fits=flyable & (required <= stages.sum(axis=1)),
+            flyable=flyable,
+        )
 
     @property
     def rng_nb_branches(self):
         return range(self.nb_branches)
 
     @property
-    def unusable_fuel(self) -> int:
-        return self.plane.unusable_fuel
-
-    @property
-    def unusable_fuel_time(self) -> int:
-        return 0
-
-    @property
-    def roulage_time(self) -> int:
-        return self.nb_branches * 5
-
-    @property
-    def roulage_fuel(self) -> float:
-        return (self.plane.fuelrate / 60) * self.roulage_time
-
-    @property
-    def arrival_time(self) -> int:
-        return self.nb_branches * 10
-
-    @property
-    def arrival_fuel(self) -> float:
-        return (self.plane.fuelrate / 60) * self.arrival_time
-
-    @property
-    def degagement_time(self) -> int:
-        return (60 / (100 - self.degagement["vent"])) * self.degagement["distance"]
-
-    @property
-    def degagement_fuel(self) -> float:
-        return (self.plane.fuelrate / 60) * self.degagement_time
-
-    @property
-    def marge_time(self) -> int:
-        return int(self.marge)
-
-    @property
-    def marge_fuel(self) -> float:
-        return (self.plane.fuelrate / 60) * self.marge_time
-
-    @property
-    def reserve_time(self) -> int:
-        if self.type_vol.name == "NUIT":
-            return 45
-        elif self.type_vol.name == "NAV" or self.type_vol.name == "VLJHA":
-            return 30
-        else:
-            return 10
-
-    @property
-    def max_flight_time(self) -> int:
-        return self.sum_carburant_emporte_time - self.reserve_time
-    
-    @property
-    def reserve_fuel(self) -> float:
-        return (self.plane.fuelrate / 60) * self.reserve_time
+    def alternates(self) -> list:
+        """Nearest aerodromes to the destination with their distances."""
+        if not self.destination:
+            return []
+        return ad_index.alternates(self.destination)
 
     @staticmethod
-    def calculate_tps_vol_corrige(vent, distance):
+    def calculate_tps_vol_corrige(vent, distance, tas=100):
         if vent >= 0:
-            sh = (60 / (100 - vent)) * distance
+            sh = (60 / (tas - vent)) * distance
         else:
-            sh = (60 / (100 + vent)) * distance
-        return sh 
-
-    @property
-    def branches_time(self):
-        br = []
-        for b in self.branches:
-            vent = b["vent"]
-            dist = b["distance"]
-            tsv = EmportCarburant.calculate_tps_vol_corrige(vent, dist)
-            br.append(tsv)
-        return br
-
-    @property
-    def branches_fuel(self):
-        br = []
-        for b in self.branches:
-            vent = b["vent"]
-            dist = b["distance"]
-            tps = EmportCarburant.calculate_tps_vol_corrige(vent, dist)
-            fu = (self.plane.fuelrate / 60) * tps
-            br.append(fu)
-        return br
-
-    @property
-    def sum_time(self):
-        return sum(self.branches_time) + self.marge_time + self.arrival_time + self.roulage_time + self.reserve_time + self.degagement_time + self.unusable_fuel_time
-
-    @property
-    def sum_fuel(self):
-        return sum(self.branches_fuel) + self.marge_fuel + self.arrival_fuel + self.roulage_fuel + self.reserve_fuel + self.degagement_fuel + self.unusable_fuel
+            sh = (60 / (tas + vent)) * distance
+        return sh
 
     @property
     def carburant_wings(self):
         return self.leftwingfuel + self.rightwingfuel
 
-    @property
-    def carburant_emporte_wings(self):
-        return self.plane.maxwingfuel * (self.carburant_wings / 100)
-
-    @property
-    def carburant_emporte_wings_time(self):
-        return (self.carburant_emporte_wings / self.plane.fuelrate * 60) - (self.plane.unusable_wingfuel / self.plane.fuelrate * 60)
-    
-    @property
-    def carburant_emporte_main(self):
-        return self.plane.maxmainfuel * (self.mainfuel / 100)
-    
-    @property
-    def carburant_emporte_main_time(self):
-        return (self.carburant_emporte_main / self.plane.fuelrate * 60) - (self.plane.unusable_mainfuel / self.plane.fuelrate * 60)
-    
-    @property
-    def carburant_emporte_aux(self):
-        return self.plane.maxauxfuel * (self.auxfuel / 100)
-
-    @property
-    def carburant_emporte_aux_time(self):
-        return self.carburant_emporte_aux / self.plane.fuelrate * 60
-
-    @property
-    def sum_carburant_emporte(self):
-        return self.carburant_emporte_main + self.carburant_emporte_aux + self.carburant_emporte_wings
-    
-    @property
-    def sum_carburant_emporte_time(self):
-        return self.carburant_emporte_main_time + self.carburant_emporte_wings_time + self.carburant_emporte_aux_time
-
     @property
     def compare_fuel(self) -> bool:
         return self.sum_carburant_emporte >= self.sum_fuel
@@ -173,10 +351,6 @@ class EmportCarburant():
     def authorized(self):
         return self.compare_fuel
 
-    @property
-    def get_compared_fuel(self):
-        return self.sum_fuel - self.sum_carburant_emporte
-
     def get_str_estime(self):
         return str(datetime.timedelta(minutes=self.sum_time))
 
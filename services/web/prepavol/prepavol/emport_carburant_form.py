@@ -4,8 +4,10 @@ from wtforms import SubmitField, SelectField, StringField
 from wtforms.fields.form import FormField
 from wtforms.fields.list import FieldList
 from wtforms.validators import DataRequired, NoneOf, InputRequired, NumberRange, Length, Optional, ValidationError
-from .planes import WeightBalance
-import json
+from .fleet import fleet_registry
+from .forms import callsign_choices
+from .ads import UnknownAerodromeError, ad_index
+from .route import parse_route, plan_legs
 from enum import Enum
 
 def my_function(value):
@@ -45,10 +47,15 @@ class DegagementForm(FlaskForm):
     )
 
 class EmportCarburantForm(FlaskForm):
-    planes_data = WeightBalance.load_fleet_data()
-    planes = json.dumps(planes_data)
+    def __init__(self, *args, **kwargs):
+        """Init, with the call signs of the current fleet."""
+        super().__init__(*args, **kwargs)
+        self.callsign.choices = fleet_registry.derived(callsign_choices)
 
-    callsigns = list(planes_data.keys())
+    @property
+    def fleet_digest(self):
+        """Hash of the fleet data, versioning the URL the pages fetch it from."""
+        return fleet_registry.digest
 
     fuel_range = range(0, 101, 10)
 
@@ -60,7 +67,6 @@ class EmportCarburantForm(FlaskForm):
     callsign = SelectField(
         "Call sign",
         validators=[NoneOf("F-XXXX", message=("Veuillez choisir un appareil"))],
-        choices=list(zip(callsigns, callsigns)),
     )
 
     type_vol_liste_values = list(zip((k.name for k in TypeVol),(k.value for k in TypeVol)))
@@ -74,7 +80,14 @@ class EmportCarburantForm(FlaskForm):
         """Valide le vol local ou tour de piste selon les règles du SERA (CTR ou <=6.5NM)"""
         type_vol = TypeVol[field.data].value.lower()
         if field.data == "TDP" or field.data == "VLJVA" or field.data == "VLJHA":
-            if form.branches.data[0]["distance"] > 6.5:
+            distance = form.branches.data[0]["distance"]
+            if form.route.data:
+                try:
+                    distance = plan_legs(form.route.data).distance.sum()
+                except (UnknownAerodromeError, ValueError):
+                    # Reported by validate_route
+                    return
+            if distance > 6.5:
                 raise ValidationError(f"Le {type_vol} ne peut pas dépasser la CTR ou 6,5NM.")
 
     nb_branches_liste = range(0, 7)
@@ -91,11 +104,56 @@ class EmportCarburantForm(FlaskForm):
         max_entries=6
     )
 
+    def validate_route(form, field):
+        """Au moins deux codes OACI connus de data/alts.yaml"""
+        codes = parse_route(field.data)
+        if len(codes) < 2:
+            raise ValidationError("La route comporte au moins deux aérodromes")
+        unknown = [code for code in codes if code not in ad_index]
+        if unknown:
+            raise ValidationError(f"Aérodrome {', '.join(unknown)} inconnu")
+
+    route = StringField(
+        "Route (codes OACI)",
+        validators=[Optional(), validate_route]
+    )
+
+    wind_direction_rng = range(0, 360, 10)
+    wind_direction = SelectField(
+        "Vent (direction)",
+        coerce=int,
+        choices=[(x, f"{x:03d}°") for x in wind_direction_rng],
+        default=0
+    )
+
+    wind_speed_rng = range(0, 41, 5)
+    wind_speed = SelectField(
+        "Vent (kt)",
+        coerce=int,
+        choices=list(zip(wind_speed_rng, wind_speed_rng)),
+        default=0
+    )
+
     degagement = FormField(
         DegagementForm,
         "Dégagement"
     )
 
+    def validate_aerodrome(form, field):
+        """Code OACI connu de data/alts.yaml"""
+        if field.data and field.data.upper() not in ad_index:
+            raise ValidationError(f"Aérodrome {field.data.upper()} inconnu")
+
+    destination = StringField(
+        "Destination (OACI)",
+        validators=[Optional(), Length(4, 4), validate_aerodrome]
+    )
+
+    alternate = StringField(
+        "Dégagement (OACI)",
+        validators=[Optional(), Length(4, 4), validate_aerodrome]
+    )
+
     marge_rng = range(0, 61, 2)
     marge = SelectField(
         "Marge (mn)",
@@ -106,7 +164,7 @@ class EmportCarburantForm(FlaskForm):
 
     
     def validate_carburant(form, field):
-        plane = WeightBalance(form.data["callsign"])
+        plane = fleet_registry.get(form.data["callsign"])
         if field.name == "mainfuel":
             if plane.maxmainfuel > 0:
                 if field.data == 0:
@@ -0,0 +1,234 @@
+# *_* coding: utf-8 *_*
+
+"""Center of gravity envelope of an aircraft.
+
+The envelope polygon is prepared once per aircraft as NumPy edge arrays,
+so that containment checks are a few vectorized operations for one point
+or for a whole array of loadings. EnvelopeStack does the same for the
+envelopes of the whole fleet at once.
+"""
+
+import numpy as np
+
+__all__ = ["Envelope", "EnvelopeStack"]
+
+
+def _contains(cg, auw, edges, eps):
+    """Even-odd ray casting towards +x, points on an edge excluded.
+
+    Arguments:
+        cg, auw: coordinates of the points.
+        edges (list): (x0, y0, x1, y1, length) of every edge, as floats
+            or as arrays broadcasting with the points.
+        eps: tolerance of the on-edge test.
+    """
+    x = np.asarray(cg, dtype=np.float64)
+    y = np.asarray(auw, dtype=np.float64)
+    shape = np.broadcast_shapes(x.shape, y.shape, np.shape(edges[0][0]))
+    inside = np.zeros(shape, dtype=bool)
+    on_edge = np.zeros(shape, dtype=bool)
+    # One pass per edge over flat arrays: no (n, edges) temporaries
+    for x0, y0, x1, y1, length in edges:
+        cross = (x1 - x0) * (y - y0) - (y1 - y0) * (x - x0)
+        near = np.abs(cross) <= eps * length
+        if near.any():
+            on_edge |= (
+                near
+                & (np.minimum(x0, x1) - eps <= x)
+                & (x <= np.maximum(x0, x1) + eps)
+                & (np.minimum(y0, y1) - eps <= y)
+                & (y <= np.maximum(y0, y1) + eps)
+            )
+        if np.all(y0 == y1):
+            continue
+        # The point is left of an upward edge when cross > 0,
+        # of a downward edge when cross < 0
+        crosses = (np.minimum(y0, y1) <= y) & (y < np.maximum(y0, y1))
+        inside ^= crosses & (cross * (y1 - y0) > 0)
+    return inside & ~on_edge
+
+
+class Envelope:
+    """CG envelope polygon with vectorized point containment.
+
+    Points strictly inside the polygon are contained, points on its
+    boundary are not, as with shapely's Polygon.contains.
+
+    Arguments:
+        points (sequence): (cg, auw) vertices of the polygon.
+    """
+
+    def __init__(self, points):
+        """Init."""
+        points = np.array(points, dtype=np.float64)
+        assert points.ndim == 2 and points.shape[1] == 2 and len(points) >= 3
+        if np.array_equal(points[0], points[-1]):
+            points = points[:-1]
+        points.setflags(write=False)
+        self.points = points
+        self.x0, self.y0 = points[:, 0], points[:, 1]
+        self.x1, self.y1 = np.roll(self.x0, -1), np.roll(self.y0, -1)
+        # Tolerance of the on-edge test, relative to the size of the polygon
+        self._eps = 1e-12 * float(np.abs(points).max())
+        # Plain floats for single point checks, faster than NumPy on 5 edges
+        self._edges = [
+            (x0, y0, x1, y1, float(np.hypot(x1 - x0, y1 - y0)))
+            for x0, y0, x1, y1 in zip(
+                self.x0.tolist(), self.y0.tolist(), self.x1.tolist(), self.y1.tolist()
+            )
+        ]
+
+    def __repr__(self):
+        """Repr."""
+        return f"{self.__class__.__name__}({self.points.tolist()})"
+
+    def __reduce__(self):
+        """Pickle as the list of vertices."""
+        return (Envelope, (self.points.tolist(),))
+
+    @property
+    def ring(self):
+        """Closed (x, y) coordinates for plotting."""
+        return (
+            np.append(self.x0, self.x0[0]),
+            np.append(self.y0, self.y0[0]),
+        )
+
+    def contains(self, cg, auw):
+        """Whether loadings are strictly inside the envelope.
+
+        Arguments:
+            cg: center(s) of gravity in meters from the datum.
+            auw: all-up weight(s) in kg.
+
+        Returns:
+            bool or ndarray of bool with the broadcast shape of cg and auw.
+        """
+        if np.isscalar(cg) and np.isscalar(auw):
+            return self._contains_point(float(cg), float(auw))
+        return _contains(cg, auw, self._edges, self._eps)
+
+    def crossings(self, moment, auw, arm):
+        """Masses at which loading a station crosses the envelope's boundary.
+
+        Adding m kg at a given arm to a loading moves its cg along
+        cg = arm + (moment - arm * auw) / (auw + m). Each edge meets this
+        curve where a quadratic in the edge's parameter vanishes, so the
+        crossings are found in closed form, without iterating on m.
+
+        Arguments:
+            moment (float): overall moment of the loading in kg.m.
+            auw (float): all-up weight of the loading in kg.
+            arm (float): arm of the loaded station in meters.
+
+        Returns:
+            ndarray: sorted masses m >= 0 in kg.
+        """
+        offset = moment - arm * auw
+        masses = []
+        for x0, y0, x1, y1, _ in self._edges:
+            dx, dy = x1 - x0, y1 - y0
+            # (x0 - arm + t dx) (y0 + t dy) = offset for t in [0, 1]
+            a = dx * dy
+            b = dx * y0 + (x0 - arm) * dy
+            c = (x0 - arm) * y0 - offset
+            if a == 0:
+                roots = [-c / b] if b != 0 else []
+            else:
+                delta = b * b - 4 * a * c
+                if delta < 0:
+                    continue
+                root = delta**0.5
+                roots = [(-b - root) / (2 * a), (-b + root) / (2 * a)]
+            for t in roots:
+                if -1e-12 <= t <= 1 + 1e-12 and y0 + t * dy - auw >= 0:
+                    masses.append(y0 + t * dy - auw)
+        return np.sort(np.array(masses, dtype=np.float64))
+
+    def _contains_point(self, x, y):
+        """Same as contains for a single point."""
+        eps = self._eps
+        inside = False
+        for x0, y0, x1, y1, length in self._edges:
+            if (
+                abs((x1 - x0) * (y - y0) - (y1 - y0) * (x - x0)) <= eps * length
+                and min(x0, x1) - eps <= x <= max(x0, x1) + eps
+                and min(y0, y1) - eps <= y <= max(y0, y1) + eps
+            ):
+                return False
+            if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                inside = not inside
+        return inside
+
+
+class EnvelopeStack:
+    """Envelopes of several aircraft stacked as (aircraft, edges) arrays.
+
+    Envelopes with fewer vertices are padded by repeating their last
+    vertex: the zero-length edges never cross a ray.
+
+    Arguments:
+        envelopes (sequence): Envelope of every aircraft.
+    """
+
+    def __init__(self, envelopes):
+        """Init."""
+        size = max(len(envelope.points) for envelope in envelopes)
+        points = np.stack(
+            [
+                np.concatenate(
+                    (e.points, np.repeat(e.points[-1:], size - len(e.points), axis=0))
+                )
+                for e in envelopes
+            ]
+        )
+        self.x0, self.y0 = points[..., 0], points[..., 1]
+        self.x1, self.y1 = np.roll(self.x0, -1, axis=1), np.roll(self.y0, -1, axis=1)
+        self._eps = np.array([envelope._eps for envelope in envelopes])
+        length = np.hypot(self.x1 - self.x0, self.y1 - self.y0)
+        # One (x0, y0, x1, y1, length) tuple of (aircraft,) columns per edge
+        self._edges = list(zip(self.x0.T, self.y0.T, self.x1.T, self.y1.T, length.T))
+
+    def __len__(self):
+        """Number of envelopes."""
+        return len(self.x0)
+
+    def take(self, indices):
+        """Stack of a subset of the envelopes."""
+        stack = EnvelopeStack.__new__(EnvelopeStack)
+        stack.x0, stack.y0 = self.x0[indices], self.y0[indices]
+        stack.x1, stack.y1 = self.x1[indices], self.y1[indices]
+        stack._eps = self._eps[indices]
+        stack._edges = [tuple(column[indices] for column in edge) for edge in self._edges]
+        return stack
+
+    def contains(self, cg, auw):
+        """Whether points are strictly inside their envelope.
+
+        Arguments:
+            cg: centers of gravity, the last axis running over the envelopes.
+            auw: all-up weights, the last axis running over the envelopes.
+        """
+        return _contains(cg, auw, self._edges, self._eps)
+
+    def limits(self, auw):
+        """Forward and aft cg limits at given all-up weights.
+
+        Assumes convex envelopes, as cg envelopes are.
+
+        Arguments:
+            auw (ndarray): all-up weight for every envelope.
+
+        Returns:
+            tuple: forward and aft limits in meters, NaN when the weight
+                   is outside of the envelope's range.
+        """
+        y = np.asarray(auw, dtype=np.float64)[..., np.newaxis]
+        x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        crosses = (np.minimum(y0, y1) <= y) & (y <= np.maximum(y0, y1)) & (y0 != y1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(crosses, x0 + (y - y0) * (x1 - x0) / (y1 - y0), np.nan)
+        none = ~crosses.any(axis=-1)
+        forward = np.where(none, np.nan, np.fmin.reduce(x, axis=-1))
+        aft = np.where(none, np.nan, np.fmax.reduce(x, axis=-1))
+        return forward, aft
@@ -1,14 +1,28 @@
 import pkgutil
+from pathlib import Path
 
 import yaml
 
+# Parsed files keyed by file name, along with their modification time
+_parsed = {}
+
 
 class FileReader:
     def __init__(self, filename) -> None:
         self.filename = filename
 
     def readfile(self):
+        """Parse the yaml file, once per process while it is unchanged.
+
+        The result is shared between callers and must be treated as read-only.
+        """
+        mtime = (Path(__file__).parent / self.filename).stat().st_mtime_ns
+        cached = _parsed.get(self.filename)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
         stream = pkgutil.get_data(__name__, self.filename)
         if stream is None:
             raise Exception("YAML File cannot be read")
-        return yaml.safe_load(stream)
\ No newline at end of file
+        data = yaml.safe_load(stream)
+        _parsed[self.filename] = (mtime, data)
+        return data
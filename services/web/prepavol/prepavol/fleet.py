@@ -0,0 +1,356 @@
+# *_* coding: utf-8 *_*
+
+"""Process-wide fleet registry.
+
+The fleet description (data/fleet.yaml) is parsed and validated once per
+process and exposed as immutable per-aircraft records keyed by call sign.
+The file is only parsed again when its modification time changes, in which
+case the whole registry is swapped in one assignment so that readers never
+see a half-loaded fleet.
+
+Values derived from the fleet, such as the form choice lists or the JSON
+embedded in the pages, are cached with the state they were built from,
+and so are built again after a reload. The modification time is exposed
+as a version stamp, and the hash of the file's content as a digest for
+HTTP validators.
+"""
+
+from dataclasses import MISSING, dataclass, field, fields
+from datetime import datetime
+import gzip
+import hashlib
+from io import BytesIO
+import json
+import logging
+from pathlib import Path
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import yaml
+
+from .envelope import Envelope, EnvelopeStack
+from .loading import arm_vector
+from .oils import Avgas
+
+__all__ = [
+    "Aircraft",
+    "Arms",
+    "FleetDataError",
+    "FleetRegistry",
+    "FleetTable",
+    "fleet_registry",
+]
+
+FLEET_FILE = Path(__file__).parent / "data" / "fleet.yaml"
+
+
+class FleetDataError(Exception):
+    """Raised when the fleet file is missing a field or holds an invalid value."""
+
+
+@dataclass(frozen=True)
+class Arms:
+    """Distance from the datum of every loading station, in meters."""
+
+    bew: float
+    front: float
+    rear: float
+    baggage: float
+    baggage2: float
+    mainfuel: float
+    wingfuel: float
+    auxfuel: float
+
+    def __getitem__(self, station):
+        """Dict-like access, as the arms used to be a plain dict."""
+        return getattr(self, station)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Arms as a plain dict."""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass(frozen=True)
+class Aircraft:
+    """Immutable characteristics of one aircraft of the fleet.
+
+    See WeightBalance for the meaning of each field.
+    """
+
+    callsign: str
+    planetype: str
+    bew: float
+    mtow: float
+    bagmax: int
+    bagmax2: int
+    sumbagmax: int
+    maxmainfuel: int
+    unusable_mainfuel: int
+    maxwingfuel: int
+    unusable_wingfuel: int
+    maxauxfuel: int
+    fuelrate: int
+    fuel_name: str
+    last_weigh: str
+    active: bool
+    arms: Arms
+    envelope: Tuple[Tuple[float, float], ...]
+    # Optional in fleet.yaml: cruise true airspeed in kt
+    tas: float = 100
+    geometry: Envelope = field(init=False, repr=False, compare=False)
+    arm_vector: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Prepare the envelope geometry and the arm vector once per aircraft."""
+        object.__setattr__(self, "geometry", Envelope(self.envelope))
+        object.__setattr__(self, "arm_vector", arm_vector(self.arms))
+
+    def is_valid_weight(self) -> bool:
+        """Whether the last weighing is less than 5 years old."""
+        last_weight = datetime.strptime(self.last_weigh, "%Y-%m-%d")
+        return (datetime.today() - last_weight).days < (365 * 5)
+
+    @classmethod
+    def from_dict(cls, callsign, data):
+        """Build and validate a record from a fleet.yaml entry.
+
+        Raises:
+            FleetDataError: a field is missing or the envelope is not a polygon.
+        """
+        scalars = [
+            f.name
+            for f in fields(cls)
+            if f.init and f.default is MISSING and f.name not in ("callsign", "arms", "envelope")
+        ]
+        optional = [f.name for f in fields(cls) if f.init and f.default is not MISSING]
+        missing = [k for k in scalars + ["arms", "envelope"] if k not in data]
+        if missing:
+            raise FleetDataError(f"{callsign}: missing fields {', '.join(missing)}")
+        arm_names = [f.name for f in fields(Arms)]
+        missing = [k for k in arm_names if k not in data["arms"]]
+        if missing:
+            raise FleetDataError(f"{callsign}: missing arms {', '.join(missing)}")
+        envelope = tuple((float(cg), float(mass)) for cg, mass in data["envelope"])
+        if len(envelope) < 3:
+            raise FleetDataError(f"{callsign}: the cg envelope needs at least 3 points")
+        return cls(
+            callsign=str(callsign),
+            arms=Arms(**{k: float(data["arms"][k]) for k in arm_names}),
+            envelope=envelope,
+            **{k: data[k] for k in scalars},
+            **{k: data[k] for k in optional if k in data},
+        )
+
+
+class FleetTable:
+    """Characteristics of several aircraft stacked as arrays, one row each.
+
+    Arguments:
+        aircraft (sequence): Aircraft records.
+    """
+
+    # Per aircraft arrays, sliced together by take
+    columns = (
+        "arms",
+        "bew",
+        "mtow",
+        "bagmax",
+        "bagmax2",
+        "sumbagmax",
+        "capacity",
+        "unusable_mainfuel",
+        "unusable_wingfuel",
+        "unusable_fuel",
+        "density",
+        "fuelrate",
+        "tas",
+        "active",
+    )
+
+    def __init__(self, aircraft):
+        """Init."""
+        aircraft = list(aircraft)
+        self.callsigns = [plane.callsign for plane in aircraft]
+
+        def column(name):
+            return np.array([getattr(plane, name) for plane in aircraft], dtype=np.float64)
+
+        self.arms = np.vstack([plane.arm_vector for plane in aircraft])
+        self.bew = column("bew")
+        self.mtow = column("mtow")
+        self.bagmax = column("bagmax")
+        self.bagmax2 = column("bagmax2")
+        self.sumbagmax = column("sumbagmax")
+        # Litres in the main, left wing, right wing and auxiliary tanks
+        self.capacity = np.column_stack(
+            [column(k) for k in ("maxmainfuel", "maxwingfuel", "maxwingfuel", "maxauxfuel")]
+        )
+        self.unusable_mainfuel = column("unusable_mainfuel")
+        self.unusable_wingfuel = column("unusable_wingfuel")
+        # Unusable fuel of the main tank and of both wing tanks
+        self.unusable_fuel = self.unusable_mainfuel + 2 * self.unusable_wingfuel
+        densities = {name: Avgas(name).density for name in {p.fuel_name for p in aircraft}}
+        self.density = np.array([densities[plane.fuel_name] for plane in aircraft])
+        self.fuelrate = column("fuelrate")
+        self.tas = column("tas")
+        self.active = np.array([plane.active for plane in aircraft], dtype=bool)
+        self.envelopes = EnvelopeStack([plane.geometry for plane in aircraft])
+
+    def __len__(self):
+        """Number of aircraft."""
+        return len(self.callsigns)
+
+    def take(self, callsigns):
+        """Table of a subset of the aircraft, in the given order."""
+        indices = [self.callsigns.index(callsign) for callsign in callsigns]
+        table = FleetTable.__new__(FleetTable)
+        table.callsigns = list(callsigns)
+        for name in FleetTable.columns:
+            setattr(table, name, getattr(self, name)[indices])
+        table.envelopes = self.envelopes.take(indices)
+        return table
+
+
+class FleetRegistry:
+    """Fleet data loaded once and refreshed when the file changes.
+
+    A change that makes the file invalid is logged and the fleet loaded
+    before is kept, until the file changes again.
+
+    Arguments:
+        path (Path): the fleet yaml file.
+    """
+
+    def __init__(self, path=FLEET_FILE):
+        """Init."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # (mtime, raw data, records, table, derived values, digest) swapped
+        # as a whole on reload
+        self._state = (None, {}, {}, None, {}, None)
+        # mtime of an invalid file, not parsed again
+        self._invalid_mtime = None
+
+    def _current(self):
+        """Return the current state, reloading the file if its mtime changed."""
+        mtime = self.path.stat().st_mtime_ns
+        state = self._state
+        if state[0] == mtime or self._invalid_mtime == mtime:
+            return state
+        with self._lock:
+            # Another thread may have reloaded while we were waiting
+            if self._state[0] != mtime and self._invalid_mtime != mtime:
+                try:
+                    self._state = self._load(mtime)
+                except FleetDataError as exception:
+                    # Nothing to fall back on at startup
+                    if self._state[0] is None:
+                        raise
+                    logging.error("%s, keeping the previous fleet", exception)
+                    self._invalid_mtime = mtime
+            return self._state
+
+    def _load(self, mtime):
+        """Parse and validate the fleet file.
+
+        Raises:
+            FleetDataError: invalid yaml, aircraft or value.
+        """
+        content = self.path.read_bytes()
+        try:
+            raw = yaml.safe_load(content)
+        except yaml.YAMLError as exception:
+            raise FleetDataError(f"{self.path} is not valid yaml: {exception}") from exception
+        if not isinstance(raw, dict) or not raw:
+            raise FleetDataError(f"{self.path} does not describe any aircraft")
+        records = {str(k): Aircraft.from_dict(k, v) for k, v in raw.items()}
+        digest = hashlib.sha256(content).hexdigest()
+        return (mtime, raw, records, FleetTable(records.values()), {}, digest)
+
+    @property
+    def data(self) -> dict:
+        """Raw fleet data as parsed from yaml. Must be treated as read-only."""
+        return self._current()[1]
+
+    @property
+    def aircraft(self) -> Dict[str, Aircraft]:
+        """Aircraft records keyed by call sign."""
+        return self._current()[2]
+
+    @property
+    def table(self) -> FleetTable:
+        """The whole fleet stacked as arrays, in file order."""
+        return self._current()[3]
+
+    @property
+    def callsigns(self):
+        """Call signs in file order."""
+        return list(self.aircraft.keys())
+
+    @property
+    def version(self) -> int:
+        """Stamp of the loaded fleet, changing whenever the file is reloaded."""
+        return self._current()[0]
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the loaded file's content, as hexadecimal."""
+        return self._current()[5]
+
+    def derived(self, build):
+        """Value built from the fleet once per version.
+
+        Arguments:
+            build (callable): function of the registry, also the cache key.
+                Its result is shared and must be treated as read-only.
+        """
+        cache = self._current()[4]
+        if build not in cache:
+            # Concurrent first calls may both build: the results are equal
+            cache[build] = build(self)
+        return cache[build]
+
+    @property
+    def json(self) -> str:
+        """Raw fleet data as a JSON document, for the pages' scripts."""
+        return self.derived(_fleet_json)
+
+    @property
+    def json_gzip(self) -> bytes:
+        """The fleet JSON document, gzip compressed."""
+        return self.derived(_fleet_json_gzip)
+
+    def get(self, callsign) -> Aircraft:
+        """Return the record of a call sign.
+
+        Raises:
+            Exception: unknown call sign.
+        """
+        records = self.aircraft
+        if callsign not in records:
+            raise Exception(
+                f"No such call sign. Valid call signs are {', '.join(records.keys())}"
+            )
+        return records[callsign]
+
+    def __contains__(self, callsign):
+        """Membership test on call signs."""
+        return callsign in self.aircraft
+
+
+def _fleet_json(registry):
+    """Raw fleet data as JSON."""
+    return json.dumps(registry.data)
+
+
+def _fleet_json_gzip(registry):
+    """Raw fleet data as gzip compressed JSON, the same bytes for the same data."""
+    # gzip.compress only takes mtime from Python 3.8
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=9, mtime=0) as stream:
+        stream.write(registry.json.encode())
+    return buffer.getvalue()
+
+
+fleet_registry = FleetRegistry()
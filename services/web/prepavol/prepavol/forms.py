@@ -1,57 +1,68 @@
 # *_* coding: utf-8 *_*
 """FlaskForm."""
 
-import json
-import copy
 from flask_wtf import FlaskForm
 from wtforms import SubmitField, SelectField, StringField, SelectMultipleField
-from wtforms.validators import DataRequired, NoneOf, InputRequired, NumberRange, Length, Optional
+from wtforms.validators import DataRequired, NoneOf, InputRequired, NumberRange, Length, Optional, ValidationError
 
-from .planes import WeightBalance
+from .ads import ad_index
+from .fleet import fleet_registry
 from .plane_perf import PlanePerf
 
 
-class PrepflightForm(FlaskForm):
-    """Form."""
-
-    # Get plane list from the planes data
-    # jinja expects a string and not a dict
-    planes_data = WeightBalance.load_fleet_data()
-    planes = json.dumps(planes_data)
-
-    callsigns = list(planes_data.keys())
-
-    # Run through the fleet to pick get the max mainfuel, wingfuel and auxfuel 
-    # so as to build valid select lists for all aircrafts
-    maxmainfuel_list = []
-    maxwingfuel_list = []
-    maxauxfuel_list = []
-    bagmax_list = []
-    bagmax2_list = []
-    for k, v in planes_data.items():
-        maxmainfuel_list.append(v["maxmainfuel"])
-        maxwingfuel_list.append(v["maxwingfuel"])
-        maxauxfuel_list.append(v["maxauxfuel"])
-        bagmax_list.append(v["bagmax"])
-        bagmax2_list.append(v["bagmax2"])
-    maxmainfuel = max(maxmainfuel_list)
-    maxwingfuel = max(maxwingfuel_list)
-    maxauxfuel = max(maxauxfuel_list)
-    maxbagmax = max(bagmax_list)
-    maxbagmax2 = max(bagmax2_list)
-    
-    plane = WeightBalance(callsigns[0])
+def callsign_choices(registry):
+    """Call signs of the fleet, as (value, label) choices."""
+    return [(callsign, callsign) for callsign in registry.callsigns]
+
+
+def _fleet_choices(registry):
+    """Choices of the fleet dependent fields of PrepflightForm.
+
+    The lists run up to the largest tank and baggage capacities of the
+    fleet, so as to be valid for all aircrafts.
+    """
+    table = registry.table
     step_fuel = 1
-    pax_weight_range = range(0, 145, 5)
-    baggage_weight_range = range(0, maxbagmax + 1, 5)
-    baggage2_weight_range = range(0, maxbagmax2 + 1, 5)
+    maxmainfuel, maxwingfuel, _, maxauxfuel = (int(v) for v in table.capacity.max(axis=0))
+    baggage_weight_range = range(0, int(table.bagmax.max()) + 1, 5)
+    baggage2_weight_range = range(0, int(table.bagmax2.max()) + 1, 5)
     mainfuel_range = range(0, maxmainfuel + 1, step_fuel)
     wingfuel_range = range(0, maxwingfuel + 1, step_fuel)
     auxfuel_range = range(0, maxauxfuel + 1, step_fuel)
+    return {
+        "callsign": callsign_choices(registry),
+        "baggage": list(zip(baggage_weight_range, baggage_weight_range)),
+        "baggage2": list(zip(baggage2_weight_range, baggage2_weight_range)),
+        "mainfuel": list(zip(mainfuel_range, mainfuel_range)),
+        "leftwingfuel": list(zip(wingfuel_range, wingfuel_range)),
+        "rightwingfuel": list(zip(wingfuel_range, wingfuel_range)),
+        "auxfuel": list(zip(auxfuel_range, auxfuel_range)),
+    }
+
+
+class PrepflightForm(FlaskForm):
+    """Form.
+
+    The choices depending on the fleet are set on every instance from the
+    fleet registry, so that they follow changes of fleet.yaml.
+    """
+
+    pax_weight_range = range(0, 145, 5)
     altitude_range = range(-100, 8100, 100)
     temperature_range = range(-20, 51, 1)
     qnh_range = range(850, 1051, 1)
 
+    def __init__(self, *args, **kwargs):
+        """Init."""
+        super().__init__(*args, **kwargs)
+        for name, choices in fleet_registry.derived(_fleet_choices).items():
+            self[name].choices = choices
+
+    @property
+    def fleet_digest(self):
+        """Hash of the fleet data, versioning the URL the pages fetch it from."""
+        return fleet_registry.digest
+
     pilot_name = StringField(
         "Nom pilote",
         validators=[InputRequired()]
@@ -60,7 +71,6 @@ class PrepflightForm(FlaskForm):
     callsign = SelectField(
         "Call sign",
         validators=[NoneOf("F-XXXX", message=("Veuillez choisir un appareil"))],
-        choices=list(zip(callsigns, callsigns)),
     )
 
     # Front row
@@ -91,52 +101,40 @@ class PrepflightForm(FlaskForm):
         choices=pax_weight_choices,
     )
     # Baggage
-    baggage_choices = list(zip(baggage_weight_range, baggage_weight_range))
     baggage = SelectField(
         "baggage",
         coerce=int,
         validators=[InputRequired()],
-        choices=baggage_choices,
     )
     # Zone 2 Baggage (Sonaca)
-    baggage2_choices = list(zip(baggage2_weight_range, baggage2_weight_range))
     baggage2 = SelectField(
         "baggage 2",
         coerce=int,
         validators=[InputRequired()],
-        choices=baggage2_choices,
     )
     # Main fuel
-    mainfuel_choices = list(zip(mainfuel_range, mainfuel_range))
     mainfuel = SelectField(
         "fuel pcpl",
         coerce=float,
         validators=[NumberRange(min=1,message="Le carburant ne peut être nul")],
-        choices=mainfuel_choices,
     )
     # Left wing fuel
-    leftwingfuel_choices = list(zip(wingfuel_range, wingfuel_range))
     leftwingfuel = SelectField(
         "fuel aile gauche (L)",
         coerce=float,
         validators=[InputRequired()],
-        choices=leftwingfuel_choices,
     )
     # Right wing fuel
-    rightwingfuel_choices = list(zip(wingfuel_range, wingfuel_range))
     rightwingfuel = SelectField(
         "fuel aile droite (L)",
         coerce=float,
         validators=[InputRequired()],
-        choices=rightwingfuel_choices,
     )
     # Aux fuel
-    auxfuel_choices = list(zip(auxfuel_range, auxfuel_range))
     auxfuel = SelectField(
         "fuel suppl.",
         coerce=float,
         validators=[InputRequired()],
-        choices=auxfuel_choices,
     )
 
     # Performances
@@ -162,6 +160,16 @@ class PrepflightForm(FlaskForm):
         validators=[Length(min=4,max=4),Optional()]
     )
 
+    def validate_tkaltinput(form, field):
+        """Code OACI connu de data/alts.yaml, avec des suggestions sinon"""
+        code = field.data.upper()
+        if code not in ad_index:
+            suggestions = ", ".join(ad_index.search(code, 3))
+            hint = f", voulez-vous dire {suggestions} ?" if suggestions else ""
+            raise ValidationError(f"Aérodrome {code} inconnu{hint}")
+
+    validate_ldaltinput = validate_tkaltinput
+
     temperature_choices = list(zip(temperature_range, temperature_range))
     
     tktemp_metar = StringField(
@@ -0,0 +1,153 @@
+# *_* coding: utf-8 *_*
+
+"""Great-circle distances, courses and spatial queries on aerodrome coordinates.
+
+Points are kept sorted by latitude, so that a radius query only looks at
+the band of latitudes it can reach, found by bisection, before checking
+the exact great-circle distances of that band with NumPy.
+"""
+
+import math
+
+import numpy as np
+
+__all__ = [
+    "EARTH_RADIUS_NM",
+    "great_circle_nm",
+    "initial_course",
+    "wind_triangle",
+    "PointIndex",
+]
+
+# Mean earth radius in nautical miles
+EARTH_RADIUS_NM = 3440.065
+
+
+def great_circle_nm(lat1, lon1, lat2, lon2):
+    """Haversine distance in nautical miles.
+
+    Arguments:
+        lat1, lon1, lat2, lon2: decimal degrees, floats or arrays
+            broadcasting together.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def initial_course(lat1, lon1, lat2, lon2):
+    """True course at departure of the great circle, in degrees from 0 to 360.
+
+    Arguments:
+        lat1, lon1, lat2, lon2: decimal degrees, floats or arrays
+            broadcasting together.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    course = np.arctan2(
+        np.sin(dlon) * np.cos(lat2),
+        np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon),
+    )
+    return np.degrees(course) % 360
+
+
+def wind_triangle(course, tas, wind_from, wind_speed):
+    """Heading and ground speed flying a true course in a wind.
+
+    Arguments:
+        course: true course in degrees.
+        tas: true airspeed in kt.
+        wind_from: direction the wind blows from, in degrees.
+        wind_speed: wind speed in kt.
+
+    Returns:
+        tuple: (heading in degrees, ground speed in kt), NaN where the
+               wind is too strong to hold the course.
+    """
+    angle = np.radians(np.subtract(wind_from, course))
+    with np.errstate(invalid="ignore"):
+        # Wind correction angle, into the wind
+        correction = np.arcsin(wind_speed * np.sin(angle) / tas)
+    heading = (np.asarray(course) + np.degrees(correction)) % 360
+    groundspeed = tas * np.cos(correction) - wind_speed * np.cos(angle)
+    return heading, np.where(groundspeed > 0, groundspeed, np.nan)
+
+
+class PointIndex:
+    """Radius and k-nearest queries over fixed (lat, lon) points.
+
+    Arguments:
+        lat (sequence): latitudes in decimal degrees.
+        lon (sequence): longitudes in decimal degrees.
+    """
+
+    def __init__(self, lat, lon):
+        """Init."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        assert lat.shape == lon.shape and lat.ndim == 1
+        self.order = np.argsort(lat, kind="stable")
+        self.lat = lat[self.order]
+        self.lon = lon[self.order]
+        # Haversine terms that do not depend on the query
+        self._phi = np.radians(self.lat)
+        self._lam = np.radians(self.lon)
+        self._cos_phi = np.cos(self._phi)
+        for array in (self.order, self.lat, self.lon, self._phi, self._lam, self._cos_phi):
+            array.setflags(write=False)
+
+    def __len__(self):
+        """Number of points."""
+        return len(self.lat)
+
+    def within(self, lat, lon, radius_nm):
+        """Points within a great-circle radius, nearest first.
+
+        Arguments:
+            lat, lon (float): center of the query in decimal degrees.
+            radius_nm (float): radius in nautical miles.
+
+        Returns:
+            tuple: (indices, distances) arrays, indices referring to the
+                   order the points were given in.
+        """
+        # A point is at least as far as its difference in latitude, and a
+        # degree of latitude is a little over 60 NM
+        reach = radius_nm / 60.0
+        start = np.searchsorted(self.lat, lat - reach, side="left")
+        stop = np.searchsorted(self.lat, lat + reach, side="right")
+        phi, lam = math.radians(lat), math.radians(lon)
+        # Compare haversines, only converting the matches to distances
+        hav = np.sin((self._phi[start:stop] - phi) / 2) ** 2 + math.cos(
+            phi
+        ) * self._cos_phi[start:stop] * np.sin((self._lam[start:stop] - lam) / 2) ** 2
+        limit = math.sin(min(radius_nm / EARTH_RADIUS_NM, math.pi) / 2) ** 2
+        found = np.flatnonzero(hav <= limit)
+        found = found[np.argsort(hav[found], kind="stable")]
+        distances = 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.minimum(hav[found], 1.0)))
+        return self.order[start + found], distances
+
+    def nearest(self, lat, lon, k=1):
+        """The k points nearest to a location, nearest first.
+
+        The search radius doubles until at least k points are within it,
+        which then contains the k nearest ones.
+
+        Arguments:
+            lat, lon (float): location in decimal degrees.
+            k (int): number of points.
+
+        Returns:
+            tuple: (indices, distances) arrays, as for within.
+        """
+        k = min(k, len(self))
+        radius = 30.0
+        while True:
+            indices, distances = self.within(lat, lon, radius)
+            # Half the circumference reaches any point of the sphere
+            if len(indices) >= k or radius >= np.pi * EARTH_RADIUS_NM:
+                return indices[:k], distances[:k]
+            radius *= 2
@@ -0,0 +1,110 @@
+# *_* coding: utf-8 *_*
+
+"""Compact loading of an aircraft.
+
+A loading is a fixed-order vector of the masses at every loading station,
+the basic empty weight included. Matched with the aircraft's vector of
+arms, the overall moment is a single dot product, and any number of
+loadings can be stacked as the rows of one matrix.
+"""
+
+import numpy as np
+
+__all__ = ["STATIONS", "LoadingState", "arm_vector"]
+
+# Loading stations in vector order
+STATIONS = (
+    "bew",
+    "pax0",
+    "pax1",
+    "pax2",
+    "pax3",
+    "baggage",
+    "baggage2",
+    "mainfuel",
+    "leftwingfuel",
+    "rightwingfuel",
+    "auxfuel",
+)
+
+# Index of each station in the vector
+INDEX = {station: i for i, station in enumerate(STATIONS)}
+
+# Arm of each station, as named in the fleet file
+STATION_ARMS = {
+    "bew": "bew",
+    "pax0": "front",
+    "pax1": "front",
+    "pax2": "rear",
+    "pax3": "rear",
+    "baggage": "baggage",
+    "baggage2": "baggage2",
+    "mainfuel": "mainfuel",
+    "leftwingfuel": "wingfuel",
+    "rightwingfuel": "wingfuel",
+    "auxfuel": "auxfuel",
+}
+
+
+def arm_vector(arms):
+    """Read-only vector of the arm of every station.
+
+    Arguments:
+        arms (Arms or dict): distance of the sectors from the datum in meters.
+    """
+    vector = np.array([arms[STATION_ARMS[s]] for s in STATIONS], dtype=np.float64)
+    vector.setflags(write=False)
+    return vector
+
+
+class LoadingState:
+    """Masses at every loading station of an aircraft.
+
+    Arguments:
+        arms (ndarray): the aircraft's arm vector, see arm_vector.
+        bew (float): basic empty weight in kg.
+    """
+
+    __slots__ = ("masses", "arms")
+
+    def __init__(self, arms, bew=0.0):
+        """Init."""
+        self.arms = arms
+        self.masses = np.zeros(len(STATIONS))
+        self.masses[0] = bew
+
+    def __repr__(self):
+        """Repr."""
+        parameters = ", ".join(f"{s}={self[s]}" for s in STATIONS)
+        return f"{self.__class__.__name__}({parameters})"
+
+    def __getitem__(self, station):
+        """Mass at a station in kg, an int when it is a whole number."""
+        mass = self.masses.item(INDEX[station])
+        return int(mass) if mass.is_integer() else mass
+
+    def __setitem__(self, station, mass):
+        """Set the mass at a station in kg."""
+        self.masses[INDEX[station]] = mass
+
+    @property
+    def auw(self):
+        """All-up weight in kg."""
+        return float(self.masses.sum())
+
+    @property
+    def moment(self):
+        """Overall moment in kg.m."""
+        return float(self.masses @ self.arms)
+
+    @property
+    def cg(self):
+        """Center of gravity in meters from the datum."""
+        return self.moment / self.auw
+
+    def copy(self):
+        """Independent copy sharing the arm vector."""
+        state = LoadingState.__new__(LoadingState)
+        state.arms = self.arms
+        state.masses = self.masses.copy()
+        return state
@@ -5,10 +5,7 @@
 from datetime import datetime
 import getpass
 import json
-import pandas as pd
 import numpy as np
-from bs4 import BeautifulSoup
-import requests
 
 __all__ = ["FlightLog"]
 
@@ -42,6 +39,11 @@ class FlightLog:
         Returns:
             logbook (pandas dataframe): flight log
         """
+        # Deferred: only needed when a pilot connects to aerogest-online
+        import pandas as pd
+        import requests
+        from bs4 import BeautifulSoup
+
         login_url = "https://online.aerogest.fr/Connection/logon"
         logbook_url = "https://online.aerogest.fr/FlightManagement/Flight/indexPilot"
         api_url = "https://online.aerogest.fr/api/FlightManagement/FlightAPI/getPilot"
@@ -152,6 +154,8 @@ class FlightLog:
         if series.empty:
             return "00h00"
 
+        import pandas as pd
+
         # series = series.apply(lambda x: f"0 days {int(x[0]):02}:{x[-2:]}:00.000000")
         flighthours = pd.to_timedelta(series)
         hours = int(np.sum(flighthours) / np.timedelta64(1, "h"))
@@ -175,6 +179,8 @@ class FlightLog:
         Returns:
             [list]: list of pivoted dataframes.
         """
+        import pandas as pd
+
         # Required to kind of deserialize the logbook - used in Flask
         if self.format == "json":
             logbook = pd.read_json(self.logbook, convert_dates=False)
@@ -216,6 +222,8 @@ class FlightLog:
         Returns:
             [dataframe]: last three months of flight log aggregated.
         """
+        import pandas as pd
+
         # Required to kind of deserialize the logbook - used in Flask
         if self.format == "json":
             logbook = pd.read_json(self.logbook, convert_dates=False)
@@ -2,14 +2,12 @@
 
 """Flask views."""
 
+import math
 import os
 import logging
-import urllib
 from datetime import datetime, timezone
-from PythonMETAR.metar import NOAAServError
 import jsonpickle
-import pandas as pd
-import PythonMETAR
+import numpy as np
 
 from flask import (
     abort,
@@ -17,6 +15,7 @@ from flask import (
     current_app,
     render_template,
     flash,
+    make_response,
     session,
     redirect,
     request,
@@ -26,12 +25,15 @@ from flask import (
 
 from .emport_carburant import EmportCarburant
 
-from .emport_carburant_form import EmportCarburantForm
-from .ads import ADs
+from .emport_carburant_form import EmportCarburantForm, TypeVol
+from .ads import ADs, UnknownAerodromeError, ad_index
 from .oils import Avgas
 from .logbook import FlightLog
 from .planes import WeightBalance
 from .plane_perf import PlanePerf
+from .metar_service import MetarError, metar_service
+from .plot_cache import plot_cache
+from .fleet import fleet_registry
 from .forms import PrepflightForm
 from .connexion_form import ConnexionForm
 from .links import Links
@@ -131,6 +133,8 @@ def profile():
 
     # Otherwise display logbook
     flightlog = jsonpickle.decode(session.get("aerogest_data")["flightlog"])
+    import pandas as pd
+
     logbook = pd.read_json(flightlog.logbook, convert_dates=False)
     return render_template(
         "profile.html", name=session["username"], dataframe=logbook.to_html(index=None)
@@ -162,6 +166,84 @@ def fleet():
     return render_template("fleet.html", data=planes, club=club)
 
 
+@main.get("/fleet.json")
+def fleet_json():
+    """Fleet data for the pages' scripts, compressed when the client accepts it.
+
+    The ETag is the hash of fleet.yaml. Pages link to the document with
+    the hash as the v query parameter: such URLs never change content
+    and are cached for a year, others are revalidated on every use.
+    """
+    digest = fleet_registry.digest
+    gzipped = "gzip" in request.accept_encodings
+    # Strong validators differ between encodings of the same document
+    etag = f"{digest}-gzip" if gzipped else digest
+    if gzipped:
+        response = make_response(fleet_registry.json_gzip)
+        response.content_encoding = "gzip"
+    else:
+        response = make_response(fleet_registry.json)
+    response.mimetype = "application/json"
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if request.args.get("v") == digest:
+        response.cache_control.max_age = 365 * 24 * 3600
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@main.get("/fleet/feasibility")
+def fleet_feasibility():
+    """Which aircraft of the fleet can fly a loading.
+
+    The loading is given as query parameters named after
+    WeightBalance.batch_columns: kg for the occupants and baggage,
+    litres for the fuel tanks. Missing ones are 0.
+    """
+    try:
+        loading = {
+            column: float(request.args.get(column, 0))
+            for column in WeightBalance.batch_columns
+        }
+    except ValueError:
+        abort(400)
+    # inf and nan would end up in the JSON, which JSON.parse rejects
+    if not all(math.isfinite(value) and value >= 0 for value in loading.values()):
+        abort(400)
+
+    table, batch = WeightBalance.evaluate_fleet(loading)
+    forward, aft = table.envelopes.limits(batch.auw)
+    aircraft = []
+    for i, callsign in enumerate(table.callsigns):
+        plane = fleet_registry.get(callsign)
+        is_valid_weight = plane.is_valid_weight()
+        margins = {
+            # cg distance to the limits at this weight, negative when beyond
+            "forward": None if np.isnan(forward[i]) else round(float(batch.cg[i] - forward[i]), 3),
+            "aft": None if np.isnan(aft[i]) else round(float(aft[i] - batch.cg[i]), 3),
+        }
+        aircraft.append(
+            {
+                "callsign": callsign,
+                "planetype": plane.planetype,
+                "auw": round(float(batch.auw[i]), 1),
+                "cg": round(float(batch.cg[i]), 3),
+                "cg_margin": margins,
+                "endurance": float(batch.endurance[i]),
+                "over_mtow": bool(batch.over_mtow[i]),
+                "over_baggage": bool(batch.over_baggage[i]),
+                "in_envelope": bool(batch.in_envelope[i]),
+                "active": plane.active,
+                "is_valid_weight": is_valid_weight,
+                "can_fly": bool(batch.ready_to_fly[i]) and plane.active and is_valid_weight,
+            }
+        )
+    return {"loading": loading, "aircraft": aircraft}
+
+
 @main.route("/stats")
 def stats():
     """Aerogest log data aggregated."""
@@ -223,6 +305,20 @@ def prepflight():
 
             if not plane.is_ready_to_fly:
                 flash("Chargement invalide", "danger")
+                # What fits with the rest of the loading unchanged
+                tanks = {
+                    "mainfuel": ("réservoir principal", plane.maxmainfuel),
+                    "leftwingfuel": ("réservoir aile gauche", plane.maxwingfuel),
+                    "rightwingfuel": ("réservoir aile droite", plane.maxwingfuel),
+                    "auxfuel": ("réservoir supplémentaire", plane.maxauxfuel),
+                }
+                for tank, (name, capacity) in tanks.items():
+                    volume = plane.max_fuel(tank) if capacity else None
+                    if volume is not None:
+                        flash(f"Carburant max {name} avec ce chargement : {int(volume)}L", "info")
+                baggage = plane.max_baggage() if plane.bagmax else None
+                if baggage is not None:
+                    flash(f"Bagages max avec ce chargement : {int(baggage)}kg", "info")
                 return render_template("prepflight.html", form=form, plane=plane)
 
             if not plane.active_plane:
@@ -243,16 +339,15 @@ def prepflight():
                 form.data["ldqnh"],
             )
 
-            # Get plot images
-            balance_img = plane.plot_balance(encode=True)
+            # The balance plot is rendered now and served by balance_plot.
+            # Performance plots are rendered when the browser asks for them.
+            _ = plane.balance_png()
             tkoff_data = tkoff.predict("takeoff", form.data.get("rvt")).to_html()
             tkoff_Zp = f"{tkoff.Zp:.0f}"
             tkoff_Zd = f"{tkoff.Zd:.0f}"
-            tkoff_img = tkoff.plot_performance("takeoff", encode=True)
             ldng_data = ldng.predict("landing", form.data.get("rvt")).to_html()
             ldng_Zp = f"{ldng.Zp:.0f}"
             ldng_Zd = f"{ldng.Zd:.0f}"
-            ldng_img = ldng.plot_performance("landing", encode=True)
 
             timestamp = datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M %Z")
 
@@ -277,15 +372,25 @@ def prepflight():
                 form=form,
                 plane=plane,
                 timestamp=timestamp,
-                balance=urllib.parse.quote(balance_img),
+                balance=balance_plot_url(plane),
                 takeoff_data=tkoff_data,
                 tkoff_Zp=tkoff_Zp,
                 tkoff_Zd=tkoff_Zd,
-                takeoff=urllib.parse.quote(tkoff_img),
+                takeoff=url_for(
+                    "main.performance_plot",
+                    planetype=plane.planetype,
+                    operation="takeoff",
+                    auw=round(plane.auw),
+                ),
                 landing_data=ldng_data,
                 ldng_Zp=ldng_Zp,
                 ldng_Zd=ldng_Zd,
-                landing=urllib.parse.quote(ldng_img),
+                landing=url_for(
+                    "main.performance_plot",
+                    planetype=plane.planetype,
+                    operation="landing",
+                    auw=round(plane.auw),
+                ),
                 tkAD=tkAD,
                 ldAD=ldAD,
                 carbu=carbu
@@ -295,6 +400,85 @@ def prepflight():
 
     return render_template("prepflight.html", form=form)
 
+def png_response(png, etag, max_age):
+    """PNG response that browsers and proxies can cache and revalidate."""
+    response = make_response(png)
+    response.mimetype = "image/png"
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+@main.get("/plot/balance/<string:callsign>/<string:key>.png")
+def balance_plot(callsign, key):
+    """Balance plot of the report view, by content-addressed key.
+
+    The loading is in the query string, as WeightBalance.batch_columns,
+    so that any worker renders the plot again when it is not cached.
+    """
+    # The key is the hash of the image inputs: the image never changes
+    max_age = 365 * 24 * 3600
+    if request.if_none_match.contains(key):
+        return png_response(b"", key, max_age)
+    png = plot_cache.get(key)
+    if png is None:
+        if callsign not in fleet_registry:
+            abort(404)
+        try:
+            loading = {
+                column: int(request.args.get(column, 0))
+                for column in WeightBalance.batch_columns
+            }
+        except ValueError:
+            abort(404)
+        if not all(value >= 0 for value in loading.values()):
+            abort(404)
+        plane = WeightBalance(callsign, **loading)
+        if plane.balance_plot_key() != key:
+            abort(404)
+        png = plane.balance_png()
+    return png_response(png, key, max_age)
+
+
+def balance_plot_url(plane):
+    """URL of the balance plot of a loading, see balance_plot."""
+    return url_for(
+        "main.balance_plot",
+        callsign=plane.callsign,
+        key=plane.balance_plot_key(),
+        **{column: int(getattr(plane, column)) for column in WeightBalance.batch_columns},
+    )
+
+
+@main.get("/plot/perf/<string:planetype>/<string:operation>/<string:auw>.png")
+def performance_plot(planetype, operation, auw):
+    """Takeoff or landing performance plot of a plane type at a given auw.
+
+    The auw is rounded to the kg and must be within the masses of the
+    plane type, so that the plots cached are bounded.
+    """
+    masses = [
+        (plane.bew, plane.mtow)
+        for plane in fleet_registry.aircraft.values()
+        if plane.planetype == planetype
+    ]
+    if not masses or operation not in ["takeoff", "landing"]:
+        abort(404)
+    try:
+        auw = round(float(auw))
+    except (ValueError, OverflowError):
+        abort(404)
+    if not min(bew for bew, _ in masses) <= auw <= max(mtow for _, mtow in masses):
+        abort(404)
+    # Altitude, temperature and QNH are not part of the plot
+    perf = PlanePerf(planetype, auw, 0, 15, 1013)
+    key = perf.performance_plot_key(operation)
+    if request.if_none_match.contains(key):
+        return png_response(b"", key, 24 * 3600)
+    return png_response(perf.performance_png(operation), key, 24 * 3600)
+
+
 @main.route("/carburant", methods=["GET","POST"])
 def emport_carburant():
     form = EmportCarburantForm(**session)
@@ -337,6 +521,68 @@ def emport_carburant():
         flash(metar, "info")
     return render_template("carburant.html", form=form)
 
+@main.get("/carburant/fleet")
+def fleet_minimum_fuel():
+    """Minimum fuel of a route for every aircraft of the fleet.
+
+    Query parameters: route (ICAO codes separated by spaces or dashes),
+    type_vol (TypeVol name, NAV by default), marge in minutes, optional
+    alternate, degagement_distance and degagement_vent, wind_direction
+    and wind_speed.
+
+    Aircraft the wind is too strong for are not flyable, without time,
+    fuel nor tanks.
+    """
+    args = request.args
+    type_vol = args.get("type_vol", "NAV").upper()
+    if type_vol not in TypeVol.__members__:
+        abort(400)
+    try:
+        numbers = {
+            name: float(args.get(name, 0))
+            for name in (
+                "degagement_distance", "degagement_vent", "wind_direction", "wind_speed"
+            )
+        }
+        if not all(math.isfinite(value) for value in numbers.values()):
+            abort(400)
+        sweep = EmportCarburant.fleet_minimum_fuel(
+            args.get("route", ""),
+            type_vol,
+            int(args.get("marge", 10)),
+            alternate=args.get("alternate") or None,
+            degagement={
+                "distance": numbers["degagement_distance"],
+                "vent": numbers["degagement_vent"],
+            },
+            wind_direction=numbers["wind_direction"],
+            wind_speed=numbers["wind_speed"],
+        )
+    except (ValueError, UnknownAerodromeError):
+        abort(400)
+
+    tanks = ("mainfuel", "leftwingfuel", "rightwingfuel", "auxfuel")
+    aircraft = []
+    for i, callsign in enumerate(sweep.callsigns):
+        plane = fleet_registry.get(callsign)
+        flyable = bool(sweep.flyable[i])
+        aircraft.append(
+            {
+                "callsign": callsign,
+                "planetype": plane.planetype,
+                "flyable": flyable,
+                "time": round(float(sweep.time[i]), 1) if flyable else None,
+                "required": round(float(sweep.required[i]), 1) if flyable else None,
+                "tanks": {k: round(float(v), 1) for k, v in zip(tanks, sweep.tanks[i])}
+                if flyable
+                else None,
+                "percent": {k: int(v) for k, v in zip(tanks, sweep.percent[i])},
+                "fits": bool(sweep.fits[i]),
+                "active": plane.active,
+            }
+        )
+    return {"route": args.get("route", ""), "type_vol": type_vol, "aircraft": aircraft}
+
 @main.post("/validate")
 def validateForm():
     form = PrepflightForm()
@@ -369,21 +615,88 @@ def aerodrome():
         'statut': terrain.statut
         }
 
+@main.get("/ad/search")
+def aerodromes_search():
+    """Typeahead over aerodrome codes and names: ?q=...&n=10."""
+    query = request.args.get("q", "")
+    limit = request.args.get("n", default=10, type=int)
+    if not 1 <= limit <= 50:
+        abort(400)
+    records = ad_index.aerodromes
+    return {
+        "query": query,
+        "aerodromes": [
+            {
+                "code": code,
+                "nom": records[code].nom,
+                "alt": records[code].alt,
+                "statut": records[code].statut,
+            }
+            for code in ad_index.search(query, limit)
+        ],
+    }
+
+@main.get("/ad/near")
+def aerodromes_near():
+    """Aerodromes near an ICAO code or a lat/lon location.
+
+    Query parameters: code or lat and lon, then radius (NM) and/or k.
+    Without radius, the k (default 5) nearest aerodromes are returned.
+    """
+    code = request.args.get("code", "").upper()
+    if code and code not in ad_index:
+        abort(404)
+    try:
+        radius = request.args.get("radius", type=float)
+        k = request.args.get("k", default=5, type=int)
+        if code:
+            origin = ad_index.get(code)
+            lat, lon = origin.lat, origin.lon
+        else:
+            lat, lon = float(request.args["lat"]), float(request.args["lon"])
+    except (KeyError, ValueError):
+        abort(400)
+    if k < 1 or (radius is not None and not (math.isfinite(radius) and radius > 0)):
+        abort(400)
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        abort(400)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        abort(400)
+
+    if code:
+        found = ad_index.alternates(code, k, radius)
+    elif radius is None:
+        found = ad_index.nearest(lat, lon, k)
+    else:
+        found = ad_index.within(lat, lon, radius)[:k]
+    return {
+        "origin": {"code": code or None, "geo": [lat, lon]},
+        "aerodromes": [
+            {"code": ad.code, "nom": ad.nom, "geo": ad.point, "distance": distance}
+            for ad, distance in found
+        ],
+    }
+
+@main.before_app_request
+def start_metar_refresher():
+    """Start the METAR threads of this worker, a no-op once started."""
+    metar_service.start()
+
+
 @main.get("/metar/<string:station>")
 def metar(station):
+    """Decoded METAR of a station, from the METAR cache."""
     if not station or not station.upper().startswith("LF"):
         abort(403)
     try:
-        metar = PythonMETAR.Metar(station.upper())
-        if metar:
-            session["tktemp_metar"] = station
-            session["tktemp"] = metar.temperatures["temperature"]
-            session["tkqnh"] = metar.qnh
-            session["metar"] = metar.metar
-            return metar.getAll()
-    except NOAAServError:
+        metar = metar_service.get(station)
+    except MetarError:
         abort(404)
-    abort(400)
+    session["tktemp_metar"] = station
+    session["tktemp"] = metar.temperatures["temperature"]
+    session["tkqnh"] = metar.qnh
+    session["metar"] = metar.metar
+    return metar.getAll()
 
 @main.get("/kiosk")
 def kiosk():
@@ -0,0 +1,250 @@
+# *_* coding: utf-8 *_*
+
+"""METAR of the aerodromes, fetched from NOAA and cached per station.
+
+Stations issue a METAR every 30 minutes, so a decoded report is kept for
+a time to live and shared by all the requests for its station. When it
+expires, the first request fetches it again while concurrent requests
+for the same station wait for that single fetch rather than all calling
+NOAA. A request finding an expired report that is still recent enough is
+answered with it right away, and the new report is fetched in the
+background.
+
+The home stations of the clubs can also be refreshed by a background
+thread, so that their requests never wait on NOAA. Threads do not
+survive a fork: they are started by the first request of every worker.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
+import os
+import threading
+from time import monotonic
+from typing import Dict, Tuple
+
+__all__ = ["MetarError", "MetarService", "metar_service"]
+
+NOAA_URL = "https://tgftp.nws.noaa.gov/data/observations/metar/stations"
+
+
+class MetarError(Exception):
+    """No METAR could be fetched or decoded for a station."""
+
+
+class MetarService:
+    """Cached and coalesced METAR fetches.
+
+    Arguments:
+        url (str): base URL of the <STATION>.TXT reports.
+        ttl (float): seconds a report is served without fetching it again.
+        max_stale (float): seconds an expired report is still served while
+            a new one is fetched in the background.
+        error_ttl (float): seconds a failed fetch is remembered, so that an
+            unknown station does not call NOAA on every request.
+        timeout (float): HTTP timeout in seconds.
+        stations (iterable): stations refreshed in the background, if any.
+    """
+
+    def __init__(
+        self,
+        url=NOAA_URL,
+        ttl=600,
+        max_stale=1800,
+        error_ttl=60,
+        timeout=5,
+        stations=(),
+    ):
+        """Init."""
+        self._lock = threading.Lock()
+        # station -> (expiry, fetch time, Metar or MetarError)
+        self._entries: Dict[str, Tuple[float, float, object]] = {}
+        # station -> Future of the fetch in progress
+        self._flights: Dict[str, Future] = {}
+        self._pid = None
+        self._executor = None
+        self._refresher = None
+        self._stop = threading.Event()
+        self.fetches = 0
+        self.hits = 0
+        self.configure(url, ttl, max_stale, error_ttl, timeout, stations)
+
+    def configure(
+        self,
+        url=NOAA_URL,
+        ttl=600,
+        max_stale=1800,
+        error_ttl=60,
+        timeout=5,
+        stations=(),
+    ):
+        """Set the source, the lifetimes and the refreshed stations."""
+        with self._lock:
+            self.url = url.rstrip("/")
+            self.ttl = float(ttl)
+            self.max_stale = float(max_stale)
+            self.error_ttl = float(error_ttl)
+            self.timeout = float(timeout)
+            self.stations = tuple(station.upper() for station in stations)
+
+    @property
+    def stats(self):
+        """Counters of the cache."""
+        with self._lock:
+            return {"hits": self.hits, "fetches": self.fetches, "stations": len(self._entries)}
+
+    def clear(self):
+        """Forget every report."""
+        with self._lock:
+            self._entries.clear()
+
+    def _fetch(self, station):
+        """Download and decode the latest METAR of a station.
+
+        Raises:
+            MetarError: the report could not be downloaded or decoded.
+        """
+        with self._lock:
+            self.fetches += 1
+        try:
+            # Deferred: only the METAR views need an HTTP client and the decoder
+            import requests
+            import PythonMETAR
+
+            response = requests.get(f"{self.url}/{station}.TXT", timeout=self.timeout)
+            response.raise_for_status()
+            # A date line, then the report
+            lines = [line.strip() for line in response.text.splitlines() if line.strip()]
+            if not lines or not lines[-1].startswith(station):
+                raise MetarError(f"No METAR for station {station}")
+            return PythonMETAR.Metar(station, lines[-1])
+        except MetarError:
+            raise
+        except Exception as exception:
+            raise MetarError(f"No METAR for station {station}: {exception}") from exception
+
+    def _run(self, station, future):
+        """Fetch a report, store it and resolve the future of the flight."""
+        result = MetarError(f"No METAR for station {station}: fetch interrupted")
+        try:
+            try:
+                result = self._fetch(station)
+                lifetime = self.ttl
+            except Exception as exception:
+                logging.warning("%s", exception)
+                if not isinstance(exception, MetarError):
+                    exception = MetarError(f"No METAR for station {station}: {exception}")
+                result = exception
+                lifetime = self.error_ttl
+            now = monotonic()
+            with self._lock:
+                previous = self._entries.get(station)
+                if (
+                    isinstance(result, MetarError)
+                    and previous is not None
+                    and not isinstance(previous[2], MetarError)
+                    and now + lifetime < previous[1] + self.max_stale
+                ):
+                    # Keep serving the last report while it is recent enough
+                    self._entries[station] = (now + lifetime, previous[1], previous[2])
+                    result = previous[2]
+                else:
+                    self._entries[station] = (now + lifetime, now, result)
+        finally:
+            # Never leave a flight the other requests would wait on forever
+            with self._lock:
+                self._flights.pop(station, None)
+            if isinstance(result, MetarError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def start(self):
+        """Start the threads of this process, once and again after a fork."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._flights = {}
+            self._executor = ThreadPoolExecutor(2, thread_name_prefix="metar")
+            self._stop = threading.Event()
+            self._refresher = None
+            if self.stations:
+                self._refresher = threading.Thread(
+                    target=self._refresh, name="metar-refresher", daemon=True
+                )
+                self._refresher.start()
+
+    def _refresh(self):
+        """Fetch the reports of the home stations before they expire."""
+        while not self._stop.is_set():
+            for station in self.stations:
+                try:
+                    self.get(station, max_age=self.ttl / 2)
+                except MetarError:
+                    pass
+            self._stop.wait(self.ttl / 2)
+
+    def stop(self):
+        """Stop the background refresher of this process."""
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+
+    def get(self, station, max_age=None):
+        """Decoded METAR of a station.
+
+        Arguments:
+            station (str): ICAO code.
+            max_age (float): fetch again reports older than this, in
+                seconds. Defaults to the time to live.
+
+        Returns:
+            PythonMETAR.Metar: shared, must be treated as read-only.
+
+        Raises:
+            MetarError: no report could be fetched.
+        """
+        self.start()
+        station = station.upper()
+        now = monotonic()
+        entry = self._entries.get(station)
+        if entry is not None:
+            expiry, fetched, result = entry
+            if max_age is not None:
+                expiry = min(expiry, fetched + max_age)
+            if now < expiry:
+                with self._lock:
+                    self.hits += 1
+                if isinstance(result, MetarError):
+                    raise result
+                return result
+        # An expired report, still recent: serve it and refresh it meanwhile
+        stale = (
+            entry is not None
+            and not isinstance(entry[2], MetarError)
+            and now < entry[1] + self.max_stale
+            and max_age is None
+        )
+        with self._lock:
+            future = self._flights.get(station)
+            leader = future is None
+            if leader:
+                future = self._flights[station] = Future()
+            if stale:
+                self.hits += 1
+        if stale:
+            if leader:
+                self._executor.submit(self._run, station, future)
+            return entry[2]
+        if leader:
+            self._run(station, future)
+        try:
+            return future.result(timeout=2 * self.timeout)
+        except FutureTimeoutError as exception:
+            raise MetarError(f"No METAR for station {station}: timeout") from exception
+
+
+metar_service = MetarService()
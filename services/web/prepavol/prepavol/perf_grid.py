@@ -0,0 +1,173 @@
+# *_* coding: utf-8 *_*
+
+"""Performance surfaces precomputed on a regular grid.
+
+Each plane type's takeoff and landing polynomial is evaluated offline on a
+(Zp, temperature, auw) grid and saved as a .npy file next to the POH csv
+files, with a .json file holding the axes and the hash of the csv file.
+Grids are memory-mapped, so that all the workers of a host share the same
+pages through the OS page cache.
+
+Build the grids after any change of the csv files:
+    python -m prepavol.perf_grid
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+__all__ = ["PerfGrid"]
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+class PerfGrid:
+    """Takeoff or landing distances sampled on a (Zp, K, auw) grid.
+
+    Arguments:
+        values (ndarray): distances in meters of shape (alt, temp, mass).
+        alt (ndarray): pressure altitudes in feet.
+        temp (ndarray): temperatures in K.
+        mass (ndarray): all-up weights in kg.
+        digest (str): sha256 of the csv file the model was fitted on.
+    """
+
+    # (start, stop, number of points) of each axis.
+    # Zp covers the form's altitudes for QNH from 850 to 1050 mbar.
+    axes = {
+        "alt": (-2000.0, 14000.0, 33),
+        "temp": (243.0, 323.0, 33),
+        "mass": (400.0, 1300.0, 37),
+    }
+
+    def __init__(self, values, alt, temp, mass, digest):
+        """Init."""
+        self.values = values
+        self.alt = np.asarray(alt, dtype=np.float64)
+        self.temp = np.asarray(temp, dtype=np.float64)
+        self.mass = np.asarray(mass, dtype=np.float64)
+        self.digest = digest
+
+    def __repr__(self):
+        """Repr."""
+        return f"{self.__class__.__name__}(shape={self.values.shape}, digest='{self.digest[:12]}')"
+
+    @staticmethod
+    def paths(planetype, operation, directory=DATA_DIR):
+        """Paths of the .npy grid and of its .json description."""
+        stem = Path(directory) / f"{planetype}_{operation}_grid"
+        return stem.with_suffix(".npy"), stem.with_suffix(".json")
+
+    @classmethod
+    def build(cls, planetype, operation, model, digest, directory=DATA_DIR):
+        """Evaluate a model on the grid and save it.
+
+        Arguments:
+            planetype (str): "DR400-120", "DR400-140B", "S201" ...
+            operation (str): "takeoff" or "landing"
+            model (PerfPolynomial): the fitted model.
+            digest (str): sha256 of the csv file the model was fitted on.
+        """
+        alt, temp, mass = (np.linspace(*cls.axes[k]) for k in ("alt", "temp", "mass"))
+        grid_alt, grid_temp, grid_mass = np.meshgrid(alt, temp, mass, indexing="ij")
+        values = model(grid_alt, grid_temp, grid_mass)
+        npy_path, json_path = cls.paths(planetype, operation, directory)
+        np.save(npy_path, values)
+        json_path.write_text(json.dumps({"axes": cls.axes, "csv_sha256": digest}, indent=2))
+        return cls(values, alt, temp, mass, digest)
+
+    @classmethod
+    def load(cls, planetype, operation, directory=DATA_DIR):
+        """Memory-map a grid built by PerfGrid.build.
+
+        Returns:
+            PerfGrid or None if the grid was not built.
+        """
+        npy_path, json_path = cls.paths(planetype, operation, directory)
+        try:
+            description = json.loads(json_path.read_text())
+            values = np.load(npy_path, mmap_mode="r")
+        except (OSError, ValueError) as exception:
+            logging.info("no performance grid for %s %s: %s", planetype, operation, exception)
+            return None
+        axes = description["axes"]
+        alt, temp, mass = (np.linspace(*axes[k]) for k in ("alt", "temp", "mass"))
+        if values.shape != (len(alt), len(temp), len(mass)):
+            logging.warning("performance grid %s does not match its axes", npy_path)
+            return None
+        return cls(values, alt, temp, mass, description["csv_sha256"])
+
+    @staticmethod
+    def _locate(axis, points):
+        """Lower cell index and fractional position of points on a regular axis."""
+        step = axis[1] - axis[0]
+        position = (points - axis[0]) / step
+        index = np.clip(np.floor(position).astype(np.intp), 0, len(axis) - 2)
+        return index, position - index
+
+    def contains(self, alt, temp, mass):
+        """Whether conditions are inside the grid."""
+        return (
+            (self.alt[0] <= alt) & (alt <= self.alt[-1])
+            & (self.temp[0] <= temp) & (temp <= self.temp[-1])
+            & (self.mass[0] <= mass) & (mass <= self.mass[-1])
+        )
+
+    def interpolate(self, alt, temp, mass):
+        """Trilinear interpolation of distances.
+
+        Arguments:
+            alt: pressure altitudes in feet.
+            temp: temperatures in K.
+            mass: all-up weights in kg.
+
+        Returns:
+            ndarray: distances in meters, NaN outside of the grid.
+        """
+        alt, temp, mass = np.broadcast_arrays(
+            np.asarray(alt, dtype=np.float64),
+            np.asarray(temp, dtype=np.float64),
+            np.asarray(mass, dtype=np.float64),
+        )
+        i, u = PerfGrid._locate(self.alt, alt)
+        j, v = PerfGrid._locate(self.temp, temp)
+        k, w = PerfGrid._locate(self.mass, mass)
+        values = self.values
+        result = np.zeros(alt.shape)
+        for di, fi in ((0, 1 - u), (1, u)):
+            for dj, fj in ((0, 1 - v), (1, v)):
+                for dk, fk in ((0, 1 - w), (1, w)):
+                    result += fi * fj * fk * values[i + di, j + dj, k + dk]
+        return np.where(self.contains(alt, temp, mass), result, np.nan)
+
+    def contour(self, mass, alt_min=0, alt_max=10000):
+        """Distances over (Zp, K) at a given auw, for contour plots.
+
+        Returns:
+            tuple: Zp and K mesh grids and the distances, all of the same shape.
+        """
+        k, w = PerfGrid._locate(self.mass, np.float64(mass))
+        slab = (1 - w) * self.values[:, :, k] + w * self.values[:, :, k + 1]
+        rows = (alt_min <= self.alt) & (self.alt <= alt_max)
+        grid_alt, grid_temp = np.meshgrid(self.alt[rows], self.temp, indexing="ij")
+        return grid_alt, grid_temp, np.asarray(slab[rows])
+
+
+def build_all(directory=DATA_DIR):
+    """Build the grids of every plane type with POH data."""
+    # Deferred: plane_perf reads the grids built here
+    from .plane_perf import PlanePerf
+
+    for csv_file in sorted(Path(directory).glob("*_*.csv")):
+        planetype, operation = csv_file.stem.rsplit("_", 1)
+        if operation not in ["takeoff", "landing"]:
+            continue
+        digest, model = PlanePerf._model_entry(planetype, operation)
+        PerfGrid.build(planetype, operation, model, digest, directory)
+        print(f"{planetype} {operation}: {PerfGrid.paths(planetype, operation, directory)[0].name}")
+
+
+if __name__ == "__main__":
+    build_all()
@@ -1,22 +1,119 @@
 from typing import List
-import pandas as pd
 from pathlib import Path
 import logging
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 from io import BytesIO
 from base64 import b64encode
-from math import pow
+from hashlib import sha256
+import threading
 
-from matplotlib import cm
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from .perf_grid import PerfGrid
+from .plot_cache import PlotCache, plot_cache, figure_to_png
 
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import make_pipeline
+__all__ = ["PlanePerf", "PerfPolynomial"]
+
+# Fitted models keyed by (planetype, operation), along with the hash
+# of the csv file they were trained on, and its mtime and size
+_models = {}
+_models_lock = threading.Lock()
+# Memory-mapped grids keyed by (planetype, operation)
+_grids = {}
+
+class PerfPolynomial:
+    """Degree 2 polynomial of the pressure altitude, temperature and all-up weight.
+
+    Holds the 10 coefficients of a least squares fit of the POH data, in the
+    order of sklearn's PolynomialFeatures(2):
+    1, Zp, K, auw, Zp², Zp.K, Zp.auw, K², K.auw, auw².
+
+    Arguments:
+        coefficients (array-like): the 10 coefficients, intercept first.
+    """
+
+    n_coefficients = 10
+
+    def __init__(self, coefficients):
+        """Init."""
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        assert self.coefficients.shape == (PerfPolynomial.n_coefficients,)
+
+    def __repr__(self):
+        """Repr."""
+        return f"{self.__class__.__name__}({self.coefficients.tolist()})"
+
+    @staticmethod
+    def features(conditions):
+        """Expand (Zp, K, auw) conditions into the 10 polynomial terms.
+
+        Arguments:
+            conditions (array-like): shape (..., 3).
+
+        Returns:
+            ndarray: shape (..., 10).
+        """
+        conditions = np.asarray(conditions, dtype=np.float64)
+        alt, temp, mass = conditions[..., 0], conditions[..., 1], conditions[..., 2]
+        return np.stack(
+            (
+                np.ones_like(alt),
+                alt,
+                temp,
+                mass,
+                alt * alt,
+                alt * temp,
+                alt * mass,
+                temp * temp,
+                temp * mass,
+                mass * mass,
+            ),
+            axis=-1,
+        )
+
+    @classmethod
+    def fit(cls, conditions, distances):
+        """Least squares fit of the polynomial.
+
+        Same method as sklearn's LinearRegression:
+        centered terms, then intercept from the means.
+
+        Arguments:
+            conditions (array-like): shape (n, 3) of Zp, K, auw.
+            distances (array-like): shape (n,).
+        """
+        terms = cls.features(conditions)[:, 1:]
+        distances = np.asarray(distances, dtype=np.float64)
+        terms_mean = terms.mean(axis=0)
+        distances_mean = distances.mean()
+        coef, *_ = np.linalg.lstsq(terms - terms_mean, distances - distances_mean, rcond=None)
+        intercept = distances_mean - terms_mean @ coef
+        return cls(np.concatenate(([intercept], coef)))
+
+    def predict(self, conditions):
+        """Evaluate the polynomial on an array of conditions.
+
+        Arguments:
+            conditions (array-like): shape (n, 3) or (3,) of Zp, K, auw.
+
+        Returns:
+            ndarray: distances in meters.
+        """
+        return PerfPolynomial.features(conditions) @ self.coefficients
+
+    def __call__(self, alt, temp, mass):
+        """Evaluate the polynomial on scalars or broadcastable arrays.
+
+        Arguments:
+            alt: pressure altitude in feet.
+            temp: temperature in K.
+            mass: all-up weight in kg.
+        """
+        alt, temp, mass = np.broadcast_arrays(
+            np.asarray(alt, dtype=np.float64),
+            np.asarray(temp, dtype=np.float64),
+            np.asarray(mass, dtype=np.float64),
+        )
+        return self.predict(np.stack((alt, temp, mass), axis=-1))
 
-__all__ = ["WeightBalance"]
 
 class PlanePerf:
     """Predict how planes takeoff and landing distances (50ft).
@@ -56,6 +153,24 @@ class PlanePerf:
     def revetements() -> List[str]:
         return ["dur", "herbe", "dur mouillée", "herbe mouillée", "pente 2%", "contaminée", "multiple"]
 
+    @staticmethod
+    def head_winds() -> List[str]:
+        return ["0kts", "10kts", "20kts", "30kts"]
+
+    @staticmethod
+    def wind_factors(operation):
+        """Distance factors for each head wind of PlanePerf.head_winds()."""
+        if operation == "takeoff":
+            return np.array([1, 0.85, 0.65, 0.55])
+        return np.array([1, 0.78, 0.63, 0.52])
+
+    @staticmethod
+    def surface_factors(operation):
+        """Distance factors for each surface of PlanePerf.revetements()."""
+        if operation == "takeoff":
+            return np.array([1, 1.2, 1, 1.3, 1.1, 1.2, 1.33])
+        return np.array([1, 1.15, 1.15, 1.35, 1.1, 1.2, 1.43])
+
     @staticmethod
     def pressure_altitude(elevation, qnh):
         """Compute the pressure altitude from a ground elevation and the QNH.
@@ -69,7 +184,7 @@ class PlanePerf:
         Returns:
             float: pressure altitude.
         """
-        return elevation + (145442.26627 * (1 - pow((qnh / 1013.25),0.19035)))
+        return elevation + (145442.26627 * (1 - np.power((qnh / 1013.25),0.19035)))
         # return elevation + (27.5 * (1013.25-qnh))
 
     @property
@@ -103,25 +218,42 @@ class PlanePerf:
         """Density altitude in feet."""
         return PlanePerf.density_altitude(self.altitude, self.temperature, self.qnh)
 
-    def takeoff_data(self):
-        """
-        Raw takeoff performance data.
+    @staticmethod
+    def data_file(planetype, operation):
+        """Path of the POH csv file of a plane type and operation."""
+        return Path(__file__).parent / "data" / f"{planetype}_{operation}.csv"
 
-        Data source is the POH (pilot operating handbook.
-        Data is loaded from a csv file stored in ./data.
-        """
-        input_file = Path(__file__).parent / "data" / (self.planetype + "_takeoff.csv")
+    @staticmethod
+    def _read_data(planetype, operation):
+        """Read the raw bytes of the POH csv file."""
+        input_file = PlanePerf.data_file(planetype, operation)
         try:
-            tkoff = pd.read_csv(input_file, sep="\t", header=0)
+            return input_file.read_bytes()
         except Exception as exception:
             logging.error("file %s does not exist or is not readable.", input_file)
             logging.error(exception)
             raise
 
-        tkoff = tkoff.melt(id_vars=["alt", "temp"], var_name="mass", value_name="m")
-        tkoff["temp"] = tkoff["temp"] + 273
-        tkoff["mass"] = tkoff["mass"].astype("int")
-        return tkoff
+    @staticmethod
+    def _parse_data(raw):
+        """Melt a POH csv table into (alt, temp in K, mass, distance) rows."""
+        # Deferred: pandas is only needed to parse the POH tables
+        import pandas as pd
+
+        data_df = pd.read_csv(BytesIO(raw), sep="\t", header=0)
+        data_df = data_df.melt(id_vars=["alt", "temp"], var_name="mass", value_name="m")
+        data_df["temp"] = data_df["temp"] + 273
+        data_df["mass"] = data_df["mass"].astype("int")
+        return data_df
+
+    def takeoff_data(self):
+        """
+        Raw takeoff performance data.
+
+        Data source is the POH (pilot operating handbook.
+        Data is loaded from a csv file stored in ./data.
+        """
+        return PlanePerf._parse_data(PlanePerf._read_data(self.planetype, "takeoff"))
 
     def landing_data(self):
         """
@@ -130,19 +262,7 @@ class PlanePerf:
         Data source is the POH (pilot operating handbook.
         Data is loaded from a csv file stored in ./data.
         """
-        input_file = Path(__file__).parent / "data" / (self.planetype + "_landing.csv")
-        try:
-            ldng = pd.read_csv(input_file, sep="\t", header=0)
-        except Exception as exception:
-            logging.error("file %s does not exist or is not readable.", input_file)
-            logging.error(exception)
-            raise
-
-        ldng = pd.read_csv(input_file, sep="\t", header=0)
-        ldng = ldng.melt(id_vars=["alt", "temp"], var_name="mass", value_name="m")
-        ldng["temp"] = ldng["temp"] + 273
-        ldng["mass"] = ldng["mass"].astype("int")
-        return ldng
+        return PlanePerf._parse_data(PlanePerf._read_data(self.planetype, "landing"))
 
     def make_model(self, operation):
         """Return a trained model of takeoff or landing performance.
@@ -151,19 +271,73 @@ class PlanePerf:
             operation (str): "takeoff" or "landing"
 
         Returns:
-            sklearn linear regression model.
+            PerfPolynomial: the fitted polynomial.
         """
+        return PlanePerf.model(self.planetype, operation)
+
+    @staticmethod
+    def model(planetype, operation):
+        """Return the trained model of a plane type.
+
+        Models are fitted once per process and per plane type, and fitted
+        again only if the content of the csv file changes.
+
+        Arguments:
+            planetype (str): "DR400-120", "DR400-140B", "S201" ...
+            operation (str): "takeoff" or "landing"
+
+        Returns:
+            PerfPolynomial: the fitted polynomial.
+        """
+        return PlanePerf._model_entry(planetype, operation)[1]
+
+    @staticmethod
+    def _model_entry(planetype, operation):
+        """Return the hash of the csv file and the model fitted on it."""
         assert operation in ["takeoff", "landing"]
 
-        if operation == "takeoff":
-            data_df = self.takeoff_data()
-        elif operation == "landing":
-            data_df = self.landing_data()
+        # Only read and hash the file again when its mtime or size change
+        stat = PlanePerf.data_file(planetype, operation).stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = (planetype, operation)
+        cached = _models.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1:]
+
+        with _models_lock:
+            cached = _models.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1:]
+            raw = PlanePerf._read_data(planetype, operation)
+            digest = sha256(raw).hexdigest()
+            if cached is not None and cached[1] == digest:
+                # Touched, not modified
+                model = cached[2]
+            else:
+                data_df = PlanePerf._parse_data(raw)
+                model = PerfPolynomial.fit(
+                    data_df.iloc[:, :3].values, data_df.iloc[:, 3].values
+                )
+            _models[key] = (stamp, digest, model)
+            return _models[key][1:]
 
-        model = make_pipeline(PolynomialFeatures(2), LinearRegression())
-        _ = model.fit(data_df.iloc[:, :3].values, data_df.iloc[:, 3].values)
+    @staticmethod
+    def grid(planetype, operation):
+        """Return the precomputed grid of a plane type, if it is up to date.
+
+        See prepavol.perf_grid to build the grids.
 
-        return model
+        Returns:
+            PerfGrid or None.
+        """
+        digest = PlanePerf._model_entry(planetype, operation)[0]
+        key = (planetype, operation)
+        if key not in _grids:
+            _grids[key] = PerfGrid.load(planetype, operation)
+        grid = _grids[key]
+        if grid is None or grid.digest != digest:
+            return None
+        return grid
 
     def predict(self, operation, revetements = ["dur", "herbe"]):
         """Predict takeoff or landing distance.
@@ -184,72 +358,69 @@ class PlanePerf:
         """
         assert operation in ["takeoff", "landing"]
 
-        model = self.make_model(operation)
-
-        # A little engineering
-        # Convert temperature in K
-        Ktemp = self.temperature + 273
-        # Convert altitude in Zp
-        Zp = self.pressure_altitude(self.altitude, self.qnh)
-        # Zd = self.density_altitude(self.altitude, self.temperature, self.qnh)
-
-        distance = model.predict([[Zp, Ktemp, self.auw]])
-        # Applying coefficient for head wind
-        if operation == "takeoff":
-            asphalt = np.around(distance * np.array([[1, 0.85, 0.65, 0.55]]))
-        else:
-            asphalt = np.around(distance * np.array([[1, 0.78, 0.63, 0.52]]))
-        columns = ["0kts", "10kts", "20kts", "30kts"]
-        df_distance = pd.DataFrame(asphalt, columns=columns)
-        # Series for grass runway
-        s_grass = pd.Series(
-            df_distance.iloc[0].apply(lambda x: round(x * (1.2,1.15)[operation == "landing"])),
-            index=columns
-        )
-        # Series for wet runway
-        s_wet = pd.Series(
-            df_distance.iloc[0].apply(lambda x: round(x * (1,1.15)[operation == "landing"])),
-            index=columns
-        )
-        # Series for wet grass runway
-        s_wet_grass = pd.Series(
-            df_distance.iloc[0].apply(lambda x: round(x * (1.3,1.35)[operation == "landing"])),
-            index=columns
-        )
-        # Series for inclined runway
-        s_inclined = pd.Series(
-            df_distance.iloc[0].apply(lambda x: round(x * 1.1)),
-            index=columns
+        distances = PlanePerf.predict_many(
+            self.planetype,
+            operation,
+            self.auw,
+            self.altitude,
+            self.temperature,
+            self.qnh,
         )
-        # Series for contaminated runway
-        s_snow = pd.Series(
-            df_distance.iloc[0].apply(lambda x: round(x * 1.2)),
-            index=columns
-        )
-        # Series for contaminated runway
-        s_multiple = pd.Series(
-            df_distance.iloc[0].apply(lambda x: round(x * (1.33,1.43)[operation == "landing"])),
-            index=columns
-        )
-        df_retour = pd.concat([
-            df_distance, 
-            s_grass.to_frame().T,
-            s_wet.to_frame().T,
-            s_wet_grass.to_frame().T,
-            s_inclined.to_frame().T,
-            s_snow.to_frame().T,
-            s_multiple.to_frame().T
-            ]).astype("int")
-        df_retour.index = PlanePerf.revetements()
+        import pandas as pd
+
+        df_retour = pd.DataFrame(
+            distances[0], index=PlanePerf.revetements(), columns=PlanePerf.head_winds()
+        ).astype("int")
         df_retour.columns.name = "Ve"
-        # title = {"takeoff": "de décollage", "landing": "d'atterrissage"}
-        # print(
-        # f"\nDistance {title[operation]} (15m)\nZp {Zp}ft\nZd {Zd} ft
-        # \n{self.temperature}°C\n{self.auw}kg\n"
-        # )
 
         return df_retour[df_retour.index.isin(revetements)]
 
+    @staticmethod
+    def predict_many(planetype, operation, auw, altitude=None, temperature=None, qnh=None):
+        """Predict takeoff or landing distances for many conditions at once.
+
+        Conditions are given either as broadcastable arrays or as a dataframe
+        with columns auw, altitude, temperature and qnh.
+
+        Arguments:
+            planetype (str): "DR400-120", "DR400-140B", "S201" ...
+            operation (str): "takeoff" or "landing"
+            auw (array-like or dataframe): all-up weights in kg.
+            altitude (array-like): altitudes in feet.
+            temperature (array-like): temperatures in Celsius degrees.
+            qnh (array-like): QNH in mbar.
+
+        Returns:
+            ndarray: distances in meters of shape (n, surfaces, head winds),
+            ordered as PlanePerf.revetements() and PlanePerf.head_winds().
+        """
+        if hasattr(auw, "columns"):
+            conditions = auw
+            auw, altitude, temperature, qnh = (
+                conditions[k].to_numpy() for k in ("auw", "altitude", "temperature", "qnh")
+            )
+        auw, altitude, temperature, qnh = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(k, dtype=np.float64)) for k in (auw, altitude, temperature, qnh))
+        )
+        Zp = PlanePerf.pressure_altitude(altitude, qnh)
+        Ktemp = temperature + 273
+        grid = PlanePerf.grid(planetype, operation)
+        if grid is None:
+            distance = PlanePerf.model(planetype, operation)(Zp, Ktemp, auw)
+        else:
+            distance = grid.interpolate(Zp, Ktemp, auw)
+            outside = np.isnan(distance)
+            if outside.any():
+                model = PlanePerf.model(planetype, operation)
+                distance[outside] = model(Zp[outside], Ktemp[outside], auw[outside])
+        distance = distance.reshape(-1)
+        # Head wind on hard runway, then every surface from the rounded values
+        asphalt = np.rint(distance[:, np.newaxis] * PlanePerf.wind_factors(operation))
+        surfaces = np.rint(
+            asphalt[:, np.newaxis, :] * PlanePerf.surface_factors(operation)[:, np.newaxis]
+        )
+        return surfaces.astype(np.int32)
+
     def plot_performance(self, operation, encode=False):
         """Plot takeoff or landing peformance.
 
@@ -265,28 +436,57 @@ class PlanePerf:
         """
         assert operation in ["takeoff", "landing"]
 
-        model = self.make_model(operation)
+        if encode:
+            return b64encode(self.performance_png(operation)).decode("ascii")
+
+        import matplotlib
+        import matplotlib.pyplot as plt
 
-        # Number of zones in the contour graph
-        n_zones = 10
+        backend = plt.get_backend()
+        self._performance_figure(operation)
+        # Restore original matplotlib backend
+        matplotlib.use(backend)
+        _ = plt.show()
 
-        # Make a mesh grid of altitudes and temperatures
-        predict_a, predict_t = np.meshgrid(
-            np.linspace(0, 10000, n_zones), np.linspace(243, 323, n_zones)
+    def performance_plot_key(self, operation):
+        """Cache key of the performance plot: everything that is drawn."""
+        model = self.make_model(operation)
+        return PlotCache.make_key(
+            "performance", self.planetype, operation, self.auw,
+            model.coefficients.tobytes(),
+            PlanePerf.grid(self.planetype, operation) is not None,
         )
-        predict_x = np.concatenate(
-            (
-                predict_a.reshape(-1, 1),
-                predict_t.reshape(-1, 1),
-                np.array(100 * [self.auw]).reshape(-1, 1),
-            ),
-            axis=1,
+
+    def performance_png(self, operation):
+        """PNG bytes of the performance plot, from the plot cache if available."""
+        return plot_cache.get_or_render(
+            self.performance_plot_key(operation),
+            lambda: figure_to_png(self._performance_figure(operation)),
         )
-        predict_x_ = model.steps[0][1].fit_transform(predict_x)
-        predict_y = model.steps[1][1].predict(predict_x_)
+
+    def _performance_figure(self, operation):
+        """Draw the contour graph of the performance at the plane's auw."""
+        grid = PlanePerf.grid(self.planetype, operation)
+        if grid is not None and grid.mass[0] <= self.auw <= grid.mass[-1]:
+            predict_a, predict_t, predict_y = grid.contour(self.auw, 0, 10000)
+        else:
+            model = self.make_model(operation)
+
+            # Number of zones in the contour graph
+            n_zones = 10
+
+            # Make a mesh grid of altitudes and temperatures
+            predict_a, predict_t = np.meshgrid(
+                np.linspace(0, 10000, n_zones), np.linspace(243, 323, n_zones)
+            )
+            predict_y = model(predict_a, predict_t, self.auw)
+
+        # Deferred: matplotlib is only needed to draw
+        import matplotlib
+        import matplotlib.pyplot as plt
+        from matplotlib import cm
 
         # Get rid of matplotlib thread warning
-        backend = plt.get_backend()
         matplotlib.use("Agg")
         fig = plt.figure(figsize=(12, 10))
         axis = plt.gca()
@@ -312,14 +512,5 @@ class PlanePerf:
         fig.patch.set_alpha(1)
         fig.tight_layout()
 
-        if encode:
-            canvas = FigureCanvas(fig)
-            png = BytesIO()
-            canvas.print_png(png)
-            figdata = b64encode(png.getvalue()).decode("ascii")
-            plt.close(fig)
-            return figdata
+        return fig
 
-        # Restore original matplotlib backend
-        matplotlib.use(backend)
-        _ = plt.show()
@@ -9,26 +9,19 @@ and a class for performance predictions.
 
 from pathlib import Path
 from base64 import b64encode
+from dataclasses import dataclass
 import logging
-import copy
 from io import BytesIO
 
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib import cm
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 from prepavol.oils import Avgas
-from shapely.geometry import Point
-from shapely.geometry.polygon import Polygon
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import make_pipeline
 from humanize import naturaldelta, i18n
 
-from .file_reader import FileReader
+from .delegate import DelegatedField
+from .fleet import fleet_registry
+from .loading import INDEX, STATIONS, LoadingState
+from .plot_cache import PlotCache, plot_cache, figure_to_png
 
 __all__ = ["PlanePerf"]
 
@@ -41,6 +34,84 @@ class FlightValidationError(Error):
     """Raised when a value is not set within acceptable boundaries. Flight is forbidden."""
 
 
+@dataclass(frozen=True)
+class FuelBurn:
+    """Loading of a plane as its fuel burns down to empty tanks.
+
+    All tanks burn in proportion to their content. Row 0 is the current
+    loading and the last row is the loading with empty tanks.
+
+    Attributes:
+        tanks (ndarray): litres in the main, left wing, right wing
+                         and auxiliary tanks, shape (steps + 1, 4).
+        auw (ndarray): all-up weights in kg.
+        moment (ndarray): overall moments in kg.m.
+        cg (ndarray): centers of gravity in meters from the datum.
+        in_envelope (ndarray): whether each cg is inside the envelope.
+    """
+
+    tanks: np.ndarray
+    auw: np.ndarray
+    moment: np.ndarray
+    cg: np.ndarray
+    in_envelope: np.ndarray
+
+    tank_names = ("mainfuel", "leftwingfuel", "rightwingfuel", "auxfuel")
+
+    @property
+    def fuel(self):
+        """Total litres of fuel at each step."""
+        return self.tanks.sum(axis=1)
+
+    @property
+    def first_out_index(self):
+        """Index of the first step out of the envelope, or None."""
+        out = np.flatnonzero(~self.in_envelope)
+        return int(out[0]) if out.size else None
+
+    @property
+    def first_out_of_envelope(self):
+        """Litres per tank at the first step out of the envelope, or None."""
+        index = self.first_out_index
+        if index is None:
+            return None
+        return dict(zip(FuelBurn.tank_names, self.tanks[index].tolist()))
+
+
+@dataclass(frozen=True)
+class BalanceBatch:
+    """Weight and balance of many loadings of one aircraft.
+
+    Row i of every array is the result of row i of the loadings.
+
+    Attributes:
+        auw (ndarray): all-up weights in kg.
+        moment (ndarray): overall moments in kg.m.
+        cg (ndarray): centers of gravity in meters from the datum.
+        over_mtow (ndarray): whether the all-up weight is above MTOW.
+        over_baggage (ndarray): whether a baggage limit is exceeded.
+        in_envelope (ndarray): whether the cg is inside the envelope.
+        endurance (ndarray): endurance in hours, rounded down to 5 minutes.
+    """
+
+    auw: np.ndarray
+    moment: np.ndarray
+    cg: np.ndarray
+    over_mtow: np.ndarray
+    over_baggage: np.ndarray
+    in_envelope: np.ndarray
+    endurance: np.ndarray
+
+    def __len__(self):
+        """Number of loadings."""
+        return len(self.auw)
+
+    @property
+    def ready_to_fly(self):
+        """Loadings without any weight and balance violation."""
+        return ~self.over_mtow & ~self.over_baggage & self.in_envelope
+
+
 class WeightBalance:
     """
     Aircraft weight and balance planification.
@@ -56,6 +127,7 @@ class WeightBalance:
     - maxauxfuel: auxiliary fuel tank capacity
     - unusable_mainfuel: unusable fuel
     - fuelrate: fuel flow rate at cruise speed
+    - tas: true airspeed at cruise, 100 kt when not given
     - mtow: MTOW
     - bagmax: max baggage compartment weight
     - bagmax2: max zone 2 baggage compartment weight (Sonaca)
@@ -92,6 +164,8 @@ class WeightBalance:
         in one another.
 
     Attributes:
+        aircraft (Aircraft): the aircraft's record in the fleet registry.
+        loading (LoadingState): the masses at every loading station.
         callsign (str): aircraft's call sign.
         planetype (str): the aircraft model.
         bew (float): the basic empty weight.
@@ -106,11 +180,56 @@ class WeightBalance:
         unusable_wingfuel (int): the unusable wing tank fuel in litres.
         maxauxfuel (int): the auxiliary tank's capacity in litres.
         fuelrate (int): the fuel flow rate in litres per hour.
+        tas (float): the cruise true airspeed in kt.
         arms (list): the distance of the from the sectors of the plane to the datum.
         envelope (list of lists): the aircraft's center of gravity envelope.
         is_ready_to_fly (boolean): airworthiness with regards to the all-up weight and balance.
     """
 
+    # Number of fuel burn steps drawn by plot_balance
+    plot_steps = 50
+
+    # Masses live in the loading vector, the characteristics in the shared
+    # aircraft record: an instance only holds what the pilot entered.
+    __slots__ = (
+        "aircraft",
+        "avgas",
+        "loading",
+        "_mainfuel",
+        "_mainfuel_gauge",
+        "_leftwingfuel",
+        "_leftwingfuel_gauge",
+        "_rightwingfuel",
+        "_rightwingfuel_gauge",
+        "_auxfuel",
+        "_auxfuel_gauge",
+        "_reasons",
+        "_dirty",
+        "_auw",
+        "_moment",
+        "_cg",
+    )
+
+    callsign = DelegatedField("aircraft", "callsign")
+    planetype = DelegatedField("aircraft", "planetype")
+    bew = DelegatedField("aircraft", "bew")
+    mtow = DelegatedField("aircraft", "mtow")
+    bagmax = DelegatedField("aircraft", "bagmax")
+    bagmax2 = DelegatedField("aircraft", "bagmax2")
+    sumbagmax = DelegatedField("aircraft", "sumbagmax")
+    maxmainfuel = DelegatedField("aircraft", "maxmainfuel")
+    unusable_mainfuel = DelegatedField("aircraft", "unusable_mainfuel")
+    maxwingfuel = DelegatedField("aircraft", "maxwingfuel")
+    unusable_wingfuel = DelegatedField("aircraft", "unusable_wingfuel")
+    maxauxfuel = DelegatedField("aircraft", "maxauxfuel")
+    fuelrate = DelegatedField("aircraft", "fuelrate")
+    tas = DelegatedField("aircraft", "tas")
+    arms = DelegatedField("aircraft", "arms")
+    envelope = DelegatedField("aircraft", "envelope")
+    geometry = DelegatedField("aircraft", "geometry")
+    active_plane = DelegatedField("aircraft", "active")
+    _last_weight = DelegatedField("aircraft", "last_weigh")
+
     def __init__(
         self,
         callsign,
@@ -135,40 +254,22 @@ class WeightBalance:
         **_kwargs,
     ):
         """Init."""
-        self.is_ready_to_fly = True
-        self.reasons = []
-
-        planes = WeightBalance.load_fleet_data()
-        if callsign not in planes.keys():
-            raise Exception(
-                f"No such call sign. Valid call signs are {', '.join(planes.keys())}"
-            )
-        self.callsign = str(callsign)
-        plane = planes[self.callsign]
-        self.avgas = Avgas(plane["fuel_name"])
-        self.planetype = plane["planetype"]
-        self.bew = plane["bew"]
-        self.bagmax = plane["bagmax"]
-        self.bagmax2 = plane["bagmax2"]
-        self.sumbagmax = plane["sumbagmax"]
-        self.mtow = plane["mtow"]
-        self.maxmainfuel = plane["maxmainfuel"]
-        self.unusable_mainfuel = plane["unusable_mainfuel"]
-        self.maxwingfuel = plane["maxwingfuel"]
-        self.unusable_wingfuel = plane["unusable_wingfuel"]
-        self.maxauxfuel = plane["maxauxfuel"]
-        self.arms = plane["arms"]
-        self.envelope = plane["envelope"]
-        self.fuelrate = plane["fuelrate"]
+        # Validation reasons as an insertion-ordered set
+        self._reasons = {}
+        self._dirty = True
+
+        # Immutable record from the process-wide registry: no yaml parsing here
+        plane = fleet_registry.get(callsign)
+        self.aircraft = plane
+        self.avgas = Avgas(plane.fuel_name)
+        self.loading = LoadingState(plane.arm_vector, plane.bew)
         self.pax0 = int(pax0)
         self.pax1 = int(pax1)
         self.pax2 = int(pax2)
         self.pax3 = int(pax3)
         self.baggage = int(baggage)
         self.baggage2 = int(baggage2)
-        self._last_weight = plane["last_weigh"]
-        self.active_plane = plane["active"]
-        
+
         self.mainfuel = int(mainfuel)
         # if mainfuel:
         #     self._mainfuel = int(mainfuel)
@@ -269,12 +370,8 @@ class WeightBalance:
         #     self._auxfuel_mass = 0
         #     self._auxfuel_gauge = 0
 
-        # Initialize computed properties
-        self._auw = 0
-        self._moment = 0
-        self._cg = 0
         # Need to have attributes instantiated right away
-        _ = self.auw, self.moment, self.cg, self.sumbag
+        self._update()
 
     def __repr__(self):
         """Repr."""
@@ -308,14 +405,118 @@ class WeightBalance:
         parameters = ", ".join([f"{a}={b}" for a, b in zip(keylist, valuelist)])
         return f"{self.__class__.__name__}({parameters})"
 
+    # Columns of the loadings of evaluate_batch, in kg for the occupants
+    # and baggage and in litres for the fuel tanks
+    batch_columns = STATIONS[1:]
+
+    @classmethod
+    def _loading_array(cls, loadings):
+        """Loadings as a 2-D float array of batch_columns."""
+        if hasattr(loadings, "columns"):
+            loadings = loadings.reindex(columns=cls.batch_columns, fill_value=0).to_numpy()
+        elif isinstance(loadings, dict):
+            loadings = [[loadings.get(column, 0) for column in cls.batch_columns]]
+        loadings = np.asarray(loadings, dtype=np.float64)
+        assert loadings.ndim == 2 and loadings.shape[1] == len(cls.batch_columns)
+        return loadings
+
+    @staticmethod
+    def _evaluate(table, loadings):
+        """Weight and balance of loadings on the aircraft of a FleetTable.
+
+        Either the table has one aircraft and the loadings any number of
+        rows, or the loadings have one row and the table any number of
+        aircraft: the two broadcast against each other.
+
+        Fuel above a tank's capacity is capped as the fuel setters do.
+        """
+        fuel = slice(INDEX["mainfuel"] - 1, INDEX["auxfuel"])
+        # Fuel above capacity is capped, occupants and baggage are not
+        capacity = np.full((len(table), loadings.shape[1]), np.inf)
+        capacity[:, fuel] = table.capacity
+        loadings = np.minimum(loadings, capacity)
+        # Litres to kg of the fuel columns
+        to_mass = np.ones_like(capacity)
+        to_mass[:, fuel] = table.density[:, np.newaxis]
+        is_fuel = np.zeros(loadings.shape[1])
+        is_fuel[fuel] = 1
+
+        # Row-wise dot products only: no (rows, stations) temporary
+        arms = table.arms
+        auw = table.bew + np.einsum("...j,...j->...", loadings, to_mass)
+        moment = table.bew * arms[:, 0] + np.einsum(
+            "...j,...j->...", loadings, to_mass * arms[:, 1:]
+        )
+        cg = moment / auw
+        litres = loadings @ is_fuel
+
+        baggage = loadings[:, INDEX["baggage"] - 1]
+        baggage2 = loadings[:, INDEX["baggage2"] - 1]
+        over_baggage = (
+            (baggage > table.bagmax)
+            | (baggage2 > table.bagmax2)
+            | ((table.sumbagmax > 0) & (baggage + baggage2 > table.sumbagmax))
+        )
+
+        usable = np.maximum(litres - table.unusable_fuel, 0)
+        # Round down to multiples of 5 mn, as the endurance property
+        endurance = 5 * np.floor(60 * (usable / table.fuelrate) / 5) / 60
+
+        return BalanceBatch(
+            auw=auw,
+            moment=moment,
+            cg=cg,
+            over_mtow=auw > table.mtow,
+            over_baggage=over_baggage,
+            in_envelope=table.envelopes.contains(cg, auw),
+            endurance=endurance,
+        )
+
+    @classmethod
+    def evaluate_batch(cls, callsign, loadings):
+        """Weight and balance of many loadings in one vectorized pass.
+
+        Arguments:
+            callsign (str): the aircraft's call sign.
+            loadings (ndarray or DataFrame): one loading per row, with the
+                batch_columns in order, or a DataFrame with some of them
+                as column names, the missing ones being 0.
+
+        Returns:
+            BalanceBatch: one result per loading.
+        """
+        # Raises on unknown call signs
+        fleet_registry.get(callsign)
+        table = fleet_registry.table.take([callsign])
+        return cls._evaluate(table, cls._loading_array(loadings))
+
+    @classmethod
+    def evaluate_fleet(cls, loading, callsigns=None):
+        """Weight and balance of one loading on every aircraft of the fleet.
+
+        Arguments:
+            loading (dict): some of the batch_columns, the missing ones being 0.
+            callsigns (list, optional): the aircraft, defaults to the whole fleet.
+
+        Returns:
+            tuple: the FleetTable and the BalanceBatch, with one row per aircraft.
+        """
+        table = fleet_registry.table
+        if callsigns is not None:
+            table = table.take(callsigns)
+        return table, cls._evaluate(table, cls._loading_array(loading))
+
     @staticmethod
     def load_fleet_data():
-        """Load planes.yaml data into a variable.
+        """Fleet data as loaded from fleet.yaml.
+
+        The data is parsed once per process by the fleet registry
+        and must be treated as read-only.
 
         Returns:
             json: planes data from yaml
         """
-        return FileReader("data/fleet.yaml").readfile()
+        return fleet_registry.data
 
     def _volume_to_mass(self,volume):
         """Convert a volume of fuel to mass (litres to kg)."""
@@ -385,6 +586,36 @@ class WeightBalance:
         assert 0 <= gauge <= 4
         return gauge * tank / 4 * self.avgas.density
 
+    def _flag(self, reason, violated):
+        """Add or remove a validation reason."""
+        if not violated:
+            self._reasons.pop(reason, None)
+        elif reason not in self._reasons:
+            logging.error(reason)
+            self._reasons[reason] = None
+
+    def _update(self):
+        """Compute the all-up weight, moment and cg once per loading change.
+
+        Setters of the loading only mark it dirty, the derived values and
+        the weight and balance checks are refreshed on the next read.
+        """
+        if not self._dirty:
+            return
+        self._auw = self.loading.auw
+        self._moment = self.loading.moment
+        self._cg = self._moment / self._auw
+        self._dirty = False
+        self._flag("All-up weight above MTOW", self._auw > self.mtow)
+        self._flag(
+            "Balance out of cg envelope",
+            not self.geometry.contains(self._cg, self._auw),
+        )
+        self._flag(
+            f"Baggage + baggage2 over {self.sumbagmax}kg for type {self.planetype}",
+            bool(self.sumbagmax) and self.baggage + self.baggage2 > self.sumbagmax,
+        )
+
     @property
     def auw(self):
         """All-up weight. Sum of all the parts.
@@ -392,27 +623,7 @@ class WeightBalance:
         Returns:
             (float): all-up weight in kg.
         """
-        reason = "All-up weight above MTOW"
-        self._auw = (
-            self.bew  # BEW
-            + self.pax0
-            + self.pax1  # Front row
-            + self.pax2
-            + self.pax3  # Back row
-            + self.baggage  # Baggage row
-            + self.baggage2 # zone 2 baggage in Sonaca
-            + self.mainfuel_mass  # Main fuel tank
-            + self.leftwingfuel_mass  # Left wing fuel tank
-            + self.rightwingfuel_mass  # Right wing fuel tank
-            + self.auxfuel_mass  # Auxiliary fuel tank
-        )
-        if self._auw > self.mtow:
-            self.is_ready_to_fly = False
-            logging.error(reason)
-            if reason not in self.reasons:
-                self.reasons.append(reason)
-        else:
-            self.reasons = [k for k in self.reasons if k != reason]
+        self._update()
         return self._auw
 
     @property
@@ -422,17 +633,7 @@ class WeightBalance:
         Returns:
             (float): overall moment in kg.m.
         """
-        self._moment = (
-            self.bew * self.arms["bew"]
-            + (self.pax0 + self.pax1) * self.arms["front"]
-            + (self.pax2 + self.pax3) * self.arms["rear"]
-            + self.baggage * self.arms["baggage"]
-            + self.baggage2 * self.arms["baggage2"]
-            + self.mainfuel_mass * self.arms["mainfuel"]
-            + self.leftwingfuel_mass * self.arms["wingfuel"]
-            + self.rightwingfuel_mass * self.arms["wingfuel"]
-            + self.auxfuel_mass * self.arms["auxfuel"]
-        )
+        self._update()
         return self._moment
 
     @property
@@ -444,53 +645,60 @@ class WeightBalance:
         Returns:
             (float): center of gravity in meters from the datum.
         """
-        reason = "Balance out of cg envelope"
-        self._cg = self.moment / self.auw
-        polygon = Polygon(tuple(k) for k in self.envelope)
-        point = Point(self._cg, self.auw)
-        if not polygon.contains(point):
-            self.is_ready_to_fly = False
-            if reason not in self.reasons:
-                self.reasons.append(reason)
-        else:
-            self.reasons = [k for k in self.reasons if k != reason]
+        self._update()
         return self._cg
 
+    @property
+    def reasons(self):
+        """Violations of the load and balance, in the order they were found."""
+        self._update()
+        return list(self._reasons)
+
+    @property
+    def is_ready_to_fly(self):
+        """Airworthiness with regards to the all-up weight and balance."""
+        self._update()
+        return not self._reasons
+
     @property
     def pax0(self):
         """Mass of pax in kg."""
-        return self._pax0
+        return self.loading["pax0"]
 
     @pax0.setter
     def pax0(self, value):
-        self._pax0 = value
+        self._dirty = True
+        self.loading["pax0"] = value
 
     @property
     def pax1(self):
         """Mass of pax in kg."""
-        return self._pax1
+        return self.loading["pax1"]
 
     @pax1.setter
     def pax1(self, value):
-        self._pax1 = value
+        self._dirty = True
+        self.loading["pax1"] = value
 
     @property
     def pax2(self):
         """Mass of pax in kg."""
-        return self._pax2
+        return self.loading["pax2"]
 
     @pax2.setter
     def pax2(self, value):
-        self._pax2 = value
+        self._dirty = True
+        self.loading["pax2"] = value
 
     @property
     def pax3(self):
         """Mass of pax in kg."""
-        return self._pax3
+        return self.loading["pax3"]
 
     @pax3.setter
     def pax3(self, value):
-        self._pax3 = value
+        self._dirty = True
+        self.loading["pax3"] = value
 
     @property
     def frontweight(self):
@@ -515,7 +723,7 @@ class WeightBalance:
     @property
     def baggage(self):
         """Mass of baggage in kg."""
-        return self._baggage
+        return self.loading["baggage"]
 
     @baggage.setter
     def baggage(self, value):
@@ -527,15 +735,9 @@ class WeightBalance:
         Args:
             value (int): baggage weight in kg.
         """
-        reason = "Baggage weight over max weight"
-        if value > self.bagmax:
-            self.is_ready_to_fly = False
-            if reason not in self.reasons:
-                logging.error(reason)
-                self.reasons.append(reason)
-        else:
-            self.reasons = [k for k in self.reasons if k != reason]
-        self._baggage = value
+        self._flag("Baggage weight over max weight", value > self.bagmax)
+        self.loading["baggage"] = value
+        self._dirty = True
 
     @property
     def bagmoment(self):
@@ -545,7 +747,7 @@ class WeightBalance:
     @property
     def baggage2(self):
         """Mass of zone2 baggage in kg."""
-        return self._baggage2
+        return self.loading["baggage2"]
 
     @baggage2.setter
     def baggage2(self, value):
@@ -556,15 +758,9 @@ class WeightBalance:
         Args:
             value (int): zone 2 baggage weight in kg.
         """
-        reason = "Zone 2 baggage weight over max weight"
-        if value > self.bagmax2:
-            self.is_ready_to_fly = False
-            if reason not in self.reasons:
-                logging.error(reason)
-                self.reasons.append(reason)
-        else:
-            self.reasons = [k for k in self.reasons if k != reason]
-        self._baggage2 = value
+        self._flag("Zone 2 baggage weight over max weight", value > self.bagmax2)
+        self.loading["baggage2"] = value
+        self._dirty = True
 
     @property
     def bagmoment2(self):
@@ -577,14 +773,7 @@ class WeightBalance:
         
         Checked against sumbagmax parameter.
         """
-        reason = f"Baggage + baggage2 over {self.sumbagmax}kg for type {self.planetype}"
-        if self.sumbagmax and self.baggage + self.baggage2 > self.sumbagmax:
-            self.is_ready_to_fly = False
-            if reason not in self.reasons:
-                logging.error(reason)
-                self.reasons.append(reason)
-        else:
-            self.reasons = [k for k in self.reasons if k != reason]
+        self._update()
         return self.baggage + self.baggage2
 
     @property
@@ -594,6 +783,7 @@ class WeightBalance:
 
     @mainfuel.setter
     def mainfuel(self, value):
+        self._dirty = True
         self._mainfuel = value
         if self.maxmainfuel == 0 and value > 0:
             msg = f"{self.callsign} has no main fuel tank. Setting volume to 0."
@@ -603,19 +793,20 @@ class WeightBalance:
             msg = f"Main tank max volume is {self.maxauxfuel}"
             logging.error(msg)
             self._mainfuel = self.maxmainfuel
-        self._mainfuel_mass = self._volume_to_mass(self._mainfuel)
+        self.loading["mainfuel"] = self._volume_to_mass(self._mainfuel)
         self._mainfuel_gauge = self._volume_to_gauge(self._mainfuel, self.maxmainfuel)
 
     @property
     def mainfuel_mass(self):
         """Fuel quantity in kg."""
-        return self._mainfuel_mass
+        return self.loading["mainfuel"]
 
     @mainfuel_mass.setter
     def mainfuel_mass(self, value):
+        self._dirty = True
         assert 0 <= value <= self._volume_to_mass(self.maxmainfuel)
-        self._mainfuel_mass = value
-        self._mainfuel = self._mass_to_volume(self._mainfuel_mass)
+        self.loading["mainfuel"] = value
+        self._mainfuel = self._mass_to_volume(self.loading["mainfuel"])
         self._mainfuel_gauge = self._volume_to_gauge(self._mainfuel, self.maxmainfuel)
 
     @property
@@ -625,10 +816,11 @@ class WeightBalance:
 
     @mainfuel_gauge.setter
     def mainfuel_gauge(self, value):
+        self._dirty = True
         assert 0 <= value <= 4  # 4 fourths of a tank
         self._mainfuel_gauge = value
         self._mainfuel = self._gauge_to_volume(self._mainfuel_gauge, self.maxmainfuel)
-        self._mainfuel_mass = self._gauge_to_mass(
+        self.loading["mainfuel"] = self._gauge_to_mass(
             self._mainfuel_gauge, self.maxmainfuel
         )
 
@@ -644,6 +836,7 @@ class WeightBalance:
 
     @leftwingfuel.setter
     def leftwingfuel(self, value):
+        self._dirty = True
         self._leftwingfuel = value
         if self.maxwingfuel == 0 and value > 0:
             msg = f"{self.callsign} has no wing fuel tank. Setting volume to 0."
@@ -653,7 +846,7 @@ class WeightBalance:
             msg = f"Wing tank max volume is {self.maxwingfuel}"
             logging.error(msg)
             self._leftwingfuel = self.maxwingfuel
-        self._leftwingfuel_mass = self._volume_to_mass(self._leftwingfuel)
+        self.loading["leftwingfuel"] = self._volume_to_mass(self._leftwingfuel)
         self._leftwingfuel_gauge = self._volume_to_gauge(
             self._leftwingfuel, self.maxwingfuel
         )
@@ -661,13 +854,14 @@ class WeightBalance:
     @property
     def leftwingfuel_mass(self):
         """Left wing fuel quantity in kg."""
-        return self._leftwingfuel_mass
+        return self.loading["leftwingfuel"]
 
     @leftwingfuel_mass.setter
     def leftwingfuel_mass(self, value):
+        self._dirty = True
         assert 0 <= value <= self._volume_to_mass(self.maxwingfuel)
-        self._leftwingfuel_mass = value
-        self._leftwingfuel = self._mass_to_volume(self._leftwingfuel_mass)
+        self.loading["leftwingfuel"] = value
+        self._leftwingfuel = self._mass_to_volume(self.loading["leftwingfuel"])
         self._leftwingfuel_gauge = self._volume_to_gauge(
             self._leftwingfuel, self.maxwingfuel
         )
@@ -679,12 +873,13 @@ class WeightBalance:
 
     @leftwingfuel_gauge.setter
     def leftwingfuel_gauge(self, value):
+        self._dirty = True
         assert 0 <= value <= 4  # 4 fourths of a tank
         self._leftwingfuel_gauge = value
         self._leftwingfuel = self._gauge_to_volume(
             self._leftwingfuel_gauge, self.maxwingfuel
         )
-        self._leftwingfuel_mass = self._gauge_to_mass(
+        self.loading["leftwingfuel"] = self._gauge_to_mass(
             self._leftwingfuel_gauge, self.maxwingfuel
         )
 
@@ -695,6 +890,7 @@ class WeightBalance:
 
     @rightwingfuel.setter
     def rightwingfuel(self, value):
+        self._dirty = True
         self._rightwingfuel = value
         if self.maxwingfuel == 0 and value > 0:
             msg = f"{self.callsign} has no wing fuel tank. Setting volume to 0."
@@ -704,7 +900,7 @@ class WeightBalance:
             msg = f"Wing tank max volume is {self.maxwingfuel}"
             logging.error(msg)
             self._rightwingfuel = self.maxwingfuel
-        self._rightwingfuel_mass = self._volume_to_mass(self._rightwingfuel)
+        self.loading["rightwingfuel"] = self._volume_to_mass(self._rightwingfuel)
         self._rightwingfuel_gauge = self._volume_to_gauge(
             self._rightwingfuel, self.maxwingfuel
         )
@@ -712,13 +908,14 @@ class WeightBalance:
     @property
     def rightwingfuel_mass(self):
         """Right wing fuel quantity in kg."""
-        return self._rightwingfuel_mass
+        return self.loading["rightwingfuel"]
 
     @rightwingfuel_mass.setter
     def rightwingfuel_mass(self, value):
+        self._dirty = True
         assert 0 <= value <= self._volume_to_mass(self.maxwingfuel)
-        self._rightwingfuel_mass = value
-        self._rightwingfuel = self._mass_to_volume(self._rightwingfuel_mass)
+        self.loading["rightwingfuel"] = value
+        self._rightwingfuel = self._mass_to_volume(self.loading["rightwingfuel"])
         self._rightwingfuel_gauge = self._volume_to_gauge(
             self._rightwingfuel, self.maxwingfuel
         )
@@ -730,12 +927,13 @@ class WeightBalance:
 
     @rightwingfuel_gauge.setter
     def rightwingfuel_gauge(self, value):
+        self._dirty = True
         assert 0 <= value <= 4  # 4 fourths of a tank
         self._rightwingfuel_gauge = value
         self._rightwingfuel = self._gauge_to_volume(
             self._rightwingfuel_gauge, self.maxwingfuel
         )
-        self._rightwingfuel_mass = self._gauge_to_mass(
+        self.loading["rightwingfuel"] = self._gauge_to_mass(
             self._rightwingfuel_gauge, self.maxwingfuel
         )
 
@@ -758,6 +956,7 @@ class WeightBalance:
 
     @auxfuel.setter
     def auxfuel(self, value):
+        self._dirty = True
         assert value >= 0
         self._auxfuel = value
         if self.maxauxfuel == 0 and value > 0:
@@ -768,27 +967,28 @@ class WeightBalance:
             msg = f"Auxiliary tank max volume is {self.maxauxfuel}"
             logging.error(msg)
             self._auxfuel = self.maxauxfuel
-        self._auxfuel_mass = self._volume_to_mass(self._auxfuel)
+        self.loading["auxfuel"] = self._volume_to_mass(self._auxfuel)
 
     @property
     def auxfuel_mass(self):
         """Auxiliary fuel in kg."""
-        return self._auxfuel_mass
+        return self.loading["auxfuel"]
 
     @auxfuel_mass.setter
     def auxfuel_mass(self, value):
+        self._dirty = True
         assert value >= 0
-        self._auxfuel_mass = value
+        self.loading["auxfuel"] = value
         max_auxfuel_mass = self._volume_to_mass(self.maxauxfuel)
         if max_auxfuel_mass == 0 and value > 0:
             msg = f"{self.callsign} has no auxiliary fuel tank. Setting mass to 0."
             logging.warning(msg)
-            self._auxfuel_mass = 0
+            self.loading["auxfuel"] = 0
         elif value > max_auxfuel_mass:
             msg = f"Auxiliary tank max weight is {max_auxfuel_mass}"
             logging.error(msg)
-            self._auxfuel_mass = max_auxfuel_mass
-        self._auxfuel = self._mass_to_volume(self._auxfuel_mass)
+            self.loading["auxfuel"] = max_auxfuel_mass
+        self._auxfuel = self._mass_to_volume(self.loading["auxfuel"])
 
     @property
     def auxfuel_gauge(self):
@@ -797,10 +997,11 @@ class WeightBalance:
 
     @auxfuel_gauge.setter
     def auxfuel_gauge(self, value):
+        self._dirty = True
         assert 0 <= value <= 4  # 4 fourths of a tank
         self._auxfuel_gauge = value
         self._auxfuel = self._gauge_to_volume(self._auxfuel_gauge, self.maxauxfuel)
-        self._auxfuel_mass = self._gauge_to_mass(self._auxfuel_gauge, self.maxauxfuel)
+        self.loading["auxfuel"] = self._gauge_to_mass(self._auxfuel_gauge, self.maxauxfuel)
 
     @property
     def auxfuelmoment(self):
@@ -845,6 +1046,115 @@ class WeightBalance:
         """Flight time given the 45 minutes ICAO regulation for night VFR"""
         return max(0, self.endurance - 0.75)
 
+    def _max_station_mass(self, station, limit):
+        """Largest mass at a station keeping the weight and balance valid.
+
+        The rest of the loading is unchanged. The mass is bounded by the
+        limit and by MTOW, and the cg must stay in the envelope: the
+        crossings of the envelope's boundary split [0, bound] into
+        segments that are each fully inside or outside.
+
+        Arguments:
+            station (str): one of loading.STATIONS.
+            limit (float): max mass of the station in kg.
+
+        Returns:
+            float or None: mass in kg, None if no mass is valid.
+        """
+        index = INDEX[station]
+        arm = self.loading.arms[index]
+        auw = self.auw - self.loading.masses[index]
+        moment = self.moment - self.loading.masses[index] * arm
+        bound = min(limit, self.mtow - auw)
+        if bound < 0:
+            return None
+        crossings = self.geometry.crossings(moment, auw, arm)
+        bounds = np.unique(
+            np.concatenate(([0.0, bound], crossings[(crossings > 0) & (crossings < bound)]))
+        )
+        if len(bounds) == 1:
+            ends = middle = bounds
+        else:
+            ends, middle = bounds[1:], (bounds[:-1] + bounds[1:]) / 2
+        inside = self.geometry.contains((moment + arm * middle) / (auw + middle), auw + middle)
+        if not inside.any():
+            return None
+        return float(ends[inside][-1])
+
+    def max_fuel(self, tank):
+        """Max fuel in a tank, the rest of the loading being unchanged.
+
+        The fuel is limited by the tank's capacity, by MTOW and by the
+        envelope. At the limit itself the cg may lie on the envelope's
+        boundary.
+
+        Arguments:
+            tank (str): "mainfuel", "leftwingfuel", "rightwingfuel" or "auxfuel".
+
+        Returns:
+            float or None: volume in litres, None if no volume is valid.
+        """
+        capacity = {
+            "mainfuel": self.maxmainfuel,
+            "leftwingfuel": self.maxwingfuel,
+            "rightwingfuel": self.maxwingfuel,
+            "auxfuel": self.maxauxfuel,
+        }[tank]
+        mass = self._max_station_mass(tank, self._volume_to_mass(capacity))
+        return None if mass is None else min(mass / self.avgas.density, capacity)
+
+    def max_baggage(self, zone="baggage"):
+        """Max baggage in a zone, the rest of the loading being unchanged.
+
+        The baggage is limited by bagmax or bagmax2, by sumbagmax with the
+        other zone's baggage, by MTOW and by the envelope.
+
+        Arguments:
+            zone (str): "baggage" or "baggage2".
+
+        Returns:
+            float or None: mass in kg, None if no mass is valid.
+        """
+        if zone == "baggage":
+            limit, other = self.bagmax, self.baggage2
+        else:
+            limit, other = self.bagmax2, self.baggage
+        if self.sumbagmax:
+            limit = min(limit, self.sumbagmax - other)
+        return self._max_station_mass(zone, limit)
+
+    def fuel_burn(self, steps=100):
+        """Compute the cg and all-up weight as the fuel burns down.
+
+        Every point is checked against the envelope in one vectorized call.
+
+        Arguments:
+            steps (int): number of steps from the current fuel to empty tanks.
+
+        Returns:
+            FuelBurn: the trajectory.
+        """
+        assert steps >= 1
+        tanks = np.array(
+            [self.mainfuel, self.leftwingfuel, self.rightwingfuel, self.auxfuel],
+            dtype=np.float64,
+        )
+        # Fuel tanks are contiguous in the loading vector
+        fuel = slice(INDEX["mainfuel"], INDEX["auxfuel"] + 1)
+        fuel_masses = self.loading.masses[fuel]
+        remaining = np.linspace(1, 0, steps + 1)[:, np.newaxis]
+        auw = self.auw - fuel_masses.sum() + remaining[:, 0] * fuel_masses.sum()
+        fuel_moment = fuel_masses @ self.loading.arms[fuel]
+        moment = self.moment - fuel_moment + remaining[:, 0] * fuel_moment
+        cg = moment / auw
+        return FuelBurn(
+            tanks=remaining * tanks,
+            auw=auw,
+            moment=moment,
+            cg=cg,
+            in_envelope=self.geometry.contains(cg, auw),
+        )
+
     def plot_balance(self, encode=False):
         """Plot the envelope with the evolution of the cg.
 
@@ -854,49 +1164,67 @@ class WeightBalance:
         Returns:
             image or image bytes.
         """
-        # Envelope
-        polygon = Polygon(tuple(k) for k in self.envelope)
+        if encode:
+            return b64encode(self.balance_png()).decode("ascii")
 
-        # Get cg and auw with no fuel
-        no_fuel_plane = copy.copy(self)
-        no_fuel_plane.mainfuel = 0
-        no_fuel_plane.leftwingfuel = 0
-        no_fuel_plane.rightwingfuel = 0
-        no_fuel_plane.auxfuel = 0
+        import matplotlib
+        import matplotlib.pyplot as plt
 
-        # Get rid of matplotlib thread warning
         backend = plt.get_backend()
+        self._balance_figure()
+        # Restore original matplotlib backend
+        matplotlib.use(backend)
+        _ = plt.show()
+
+    def balance_plot_key(self):
+        """Cache key of the balance plot: everything that is drawn."""
+        burn = self.fuel_burn(WeightBalance.plot_steps)
+        return PlotCache.make_key(
+            "balance", self.callsign, self.envelope,
+            burn.cg.tobytes(), burn.auw.tobytes(),
+        )
+
+    def balance_png(self):
+        """PNG bytes of the balance plot, from the plot cache if available."""
+        return plot_cache.get_or_render(
+            self.balance_plot_key(),
+            lambda: figure_to_png(self._balance_figure()),
+        )
+
+    def _balance_figure(self):
+        """Draw the envelope and the cg from the current loading to empty tanks.
+
+        The plot holds no date, so that the same loading is the same image.
+        """
+        burn = self.fuel_burn(WeightBalance.plot_steps)
+        # Deferred: matplotlib is only needed to draw
+        import matplotlib
+        import matplotlib.pyplot as plt
+
+        # Get rid of matplotlib thread warning
         matplotlib.use("Agg")
         fig = plt.figure()
         axis = plt.gca()
-        axis.plot(*polygon.exterior.xy, c="b")
-        date = datetime.now().strftime("%Y-%m-%d %H:%M")
-        axis.set_title(f"Centrage de {self.callsign} - {date}")
-        # Start and no fuel points
-        axis.plot([self.cg, no_fuel_plane.cg], [self.auw, no_fuel_plane.auw], "r")
-        axis.plot([self.cg], [self.auw], "ro", markerfacecolor="w", markersize=12)
+        axis.plot(*self.geometry.ring, c="b")
+        axis.set_title(f"Centrage de {self.callsign}")
+        # Fuel burn from start to no fuel points
+        axis.plot(burn.cg, burn.auw, "r")
+        axis.plot(burn.cg[:1], burn.auw[:1], "ro", markerfacecolor="w", markersize=12)
         axis.plot(
-            [no_fuel_plane.cg],
-            [no_fuel_plane.auw],
+            burn.cg[-1:],
+            burn.auw[-1:],
             "r^",
             markerfacecolor="w",
             markersize=12,
         )
+        first_out = burn.first_out_index
+        if first_out is not None:
+            axis.plot(burn.cg[first_out], burn.auw[first_out], "rx", markersize=12)
         axis.set_xlabel("m", fontsize=12)
         axis.set_ylabel("Kg", fontsize=12)
         plt.tight_layout()
 
-        if encode:
-            canvas = FigureCanvas(fig)
-            png = BytesIO()
-            canvas.print_png(png)
-            figdata = b64encode(png.getvalue()).decode("ascii")
-            plt.close(fig)
-            return figdata
-
-        # Restore original matplotlib backend
-        matplotlib.use(backend)
-        _ = plt.show()
+        return fig
     
     @property
     def last_weight(self):
@@ -916,4 +1244,4 @@ class WeightBalance:
         return naturaldelta(self.last_bad_weight_difference)
 
     def is_valid_weight(self) -> bool:
-        return  self.last_weight_difference.days < (365 * 5)
+        return self.aircraft.is_valid_weight()
@@ -0,0 +1,226 @@
+# *_* coding: utf-8 *_*
+
+"""Cache of rendered PNG plots.
+
+Plots are stored under a content-addressed key: the hash of everything
+that is drawn. A size-bounded LRU keeps the recent images in memory and
+an optional directory keeps them on disk across workers and restarts.
+
+The disk budget applies to the folder as a whole, whichever worker wrote
+the files. Reads touch the files, so that their mtime orders them from
+the least recently used. Rather than on every write, a process scans the
+folder and deletes the oldest files once it has written a sixteenth of
+the budget since its last scan, so that the folder exceeds its budget by
+at most a sixteenth per worker.
+"""
+
+from collections import OrderedDict
+from hashlib import sha256
+from io import BytesIO
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+
+__all__ = ["PlotCache", "plot_cache", "figure_to_png"]
+
+
+def figure_to_png(fig):
+    """Render a matplotlib figure to PNG bytes and close it."""
+    # Deferred so that the cache can be imported without matplotlib
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+
+    canvas = FigureCanvas(fig)
+    png = BytesIO()
+    canvas.print_png(png)
+    plt.close(fig)
+    return png.getvalue()
+
+
+class PlotCache:
+    """LRU cache of PNG images with an optional on-disk store.
+
+    Arguments:
+        max_bytes (int): memory budget of the LRU in bytes.
+        directory (str, optional): folder of the on-disk store.
+        max_disk_bytes (int): disk budget of the on-disk store in bytes.
+    """
+
+    def __init__(self, max_bytes=32 * 2**20, directory=None, max_disk_bytes=256 * 2**20):
+        """Init."""
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+        self._size = 0
+        # Bytes written on disk by this process since the folder was trimmed
+        self._disk_written = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.configure(max_bytes, directory, max_disk_bytes)
+
+    def configure(self, max_bytes=32 * 2**20, directory=None, max_disk_bytes=256 * 2**20):
+        """Set the memory and disk budgets, and the on-disk folder."""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self.max_disk_bytes = int(max_disk_bytes)
+            self.directory = Path(directory) if directory else None
+            self._disk_written = 0
+            self._evict()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._trim_disk()
+
+    @staticmethod
+    def make_key(*parts):
+        """Content-addressed key of the plot inputs."""
+        digest = sha256()
+        for part in parts:
+            if isinstance(part, bytes):
+                digest.update(part)
+            else:
+                digest.update(repr(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def __len__(self):
+        """Number of images in memory."""
+        return len(self._images)
+
+    def __contains__(self, key):
+        """Whether an image is cached in memory or on disk."""
+        return key in self._images or (
+            self.directory is not None and self._disk_path(key).exists()
+        )
+
+    @property
+    def stats(self):
+        """Counters of the cache."""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "images": len(self._images),
+            "bytes": self._size,
+        }
+
+    def _disk_path(self, key):
+        return self.directory / f"{key}.png"
+
+    def _evict(self):
+        """Drop the least recently used images until under the memory budget."""
+        while self._images and self._size > self.max_bytes:
+            _, png = self._images.popitem(last=False)
+            self._size -= len(png)
+
+    def _remember(self, key, png):
+        """Store an image in memory. Expects the lock to be held."""
+        if key in self._images:
+            self._size -= len(self._images.pop(key))
+        if len(png) > self.max_bytes:
+            return
+        self._images[key] = png
+        self._size += len(png)
+        self._evict()
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            png = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            # Most recently used, for the workers trimming the folder
+            os.utime(path)
+        except OSError:
+            pass
+        return png
+
+    def _trim_disk(self):
+        """Delete the least recently used files until the folder is under budget."""
+        files = []
+        for path in self.directory.glob("*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, path.name, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, _, size, _ in files)
+        # Keep at least the newest file
+        for _, _, size, path in files[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _write_disk(self, key, png):
+        """Atomically write an image on disk, trimming the folder now and then."""
+        if self.directory is None:
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as stream:
+                stream.write(png)
+            os.replace(tmp, self._disk_path(key))
+            with self._lock:
+                self._disk_written += len(png)
+                trim = self._disk_written >= self.max_disk_bytes // 16
+                if trim:
+                    self._disk_written = 0
+            if trim:
+                self._trim_disk()
+        except OSError as exception:
+            logging.warning("plot cache: cannot write %s: %s", key, exception)
+
+    def get(self, key):
+        """Return the cached PNG bytes of a key, or None."""
+        with self._lock:
+            png = self._images.get(key)
+            if png is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return png
+        png = self._read_disk(key)
+        with self._lock:
+            if png is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, png)
+        return png
+
+    def put(self, key, png):
+        """Cache the PNG bytes of a key."""
+        with self._lock:
+            self._remember(key, png)
+        self._write_disk(key, png)
+
+    def get_or_render(self, key, render):
+        """Return the cached PNG of a key, rendering and caching it on a miss.
+
+        Arguments:
+            key (str): see make_key.
+            render (callable): returns the PNG bytes.
+        """
+        png = self.get(key)
+        if png is None:
+            png = render()
+            self.put(key, png)
+        return png
+
+    def clear(self):
+        """Empty the memory cache and reset the counters."""
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+            self.hits = self.misses = self.disk_hits = 0
+
+
+plot_cache = PlotCache()
@@ -0,0 +1,95 @@
+# *_* coding: utf-8 *_*
+
+"""Legs of a route between aerodromes.
+
+A route is an ordered list of ICAO codes. All its legs are computed at
+once as NumPy arrays: great-circle distance, true course, then heading
+and ground speed from the wind triangle at the aircraft's cruise TAS.
+"""
+
+from dataclasses import dataclass
+import re
+from typing import Tuple
+
+import numpy as np
+
+from .ads import ad_index
+from .geo import great_circle_nm, initial_course, wind_triangle
+
+__all__ = ["Legs", "parse_route", "plan_legs"]
+
+
+def parse_route(route):
+    """ICAO codes of a route given as "LFPN LFAB-LFPO" or as a sequence."""
+    if isinstance(route, str):
+        route = re.split(r"[\s,;/-]+", route)
+    return tuple(code.upper() for code in route if code)
+
+
+@dataclass(frozen=True)
+class Legs:
+    """Legs of a route, one array item per leg.
+
+    Planned for several airspeeds at once, the arrays depending on the
+    airspeed have one row per airspeed and one column per leg.
+
+    Attributes:
+        codes (tuple): ICAO codes of the route, one more than the legs.
+        distance (ndarray): great-circle distance in NM.
+        course (ndarray): true course at departure in degrees.
+        heading (ndarray): true heading in degrees.
+        headwind (ndarray): head wind component in kt, negative for a
+            tail wind.
+        groundspeed (ndarray): ground speed in kt, NaN when the wind
+            is too strong to hold the course.
+        time (ndarray): flight time in minutes.
+    """
+
+    codes: Tuple[str, ...]
+    distance: np.ndarray
+    course: np.ndarray
+    heading: np.ndarray
+    headwind: np.ndarray
+    groundspeed: np.ndarray
+    time: np.ndarray
+
+    def __len__(self):
+        """Number of legs."""
+        return len(self.distance)
+
+    def fuel(self, fuelrate) -> np.ndarray:
+        """Fuel of every leg in litres at a fuel flow in litres per hour."""
+        return fuelrate / 60 * self.time
+
+
+def plan_legs(route, tas=100, wind_from=0, wind_speed=0) -> Legs:
+    """Compute the legs of a route.
+
+    Arguments:
+        route (str or sequence): ICAO codes of the aerodromes, in order.
+        tas (float or ndarray): cruise true airspeed in kt, or a column
+            of airspeeds to plan the route for several aircraft.
+        wind_from (float or sequence): direction the wind blows from, in
+            degrees, one for the route or one per leg.
+        wind_speed (float or sequence): wind speed in kt, one for the
+            route or one per leg.
+
+    Raises:
+        UnknownAerodromeError: unknown code.
+        ValueError: fewer than two aerodromes.
+    """
+    codes = parse_route(route)
+    if len(codes) < 2:
+        raise ValueError("A route needs at least two aerodromes")
+    aerodromes = [ad_index.get(code) for code in codes]
+    lat = np.array([aerodrome.lat for aerodrome in aerodromes])
+    lon = np.array([aerodrome.lon for aerodrome in aerodromes])
+    distance = great_circle_nm(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    course = initial_course(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    heading, groundspeed = wind_triangle(course, tas, wind_from, wind_speed)
+    headwind = np.broadcast_to(
+        wind_speed * np.cos(np.radians(np.subtract(wind_from, course))), course.shape
+    )
+    # No flight time between two occurrences of the same aerodrome
+    time = np.where(distance > 0, 60 * distance / groundspeed, 0.0)
+    return Legs(codes, distance, course, heading, headwind, groundspeed, time)
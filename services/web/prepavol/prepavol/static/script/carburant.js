@@ -1,5 +1,12 @@
 let avion = null
 let params = null
+// Fleet data, fetched from a versioned URL the browser caches
+let planes = null
+
+async function load_planes() {
+  const req = await fetch(fleet_url)
+  planes = await req.json()
+}
 
 function update_plane() {
   let callsign = document.querySelector("#callsign").value;
@@ -22,12 +29,35 @@ function update_branches() {
   })
 }
 
+// Suggest the aerodromes nearest to the destination as alternates
+async function update_alternates() {
+  const destination = document.querySelector("#destination").value.toUpperCase()
+  const list = document.querySelector("#alternates-list")
+  if (destination.length != 4) {
+    return
+  }
+  const req = await fetch(`/ad/near?code=${destination}&k=8`)
+  if (!req.ok) {
+    return
+  }
+  const rep = await req.json()
+  list.innerHTML = ""
+  rep.aerodromes.forEach(ad => {
+    const option = document.createElement("option")
+    option.value = ad.code
+    option.label = `${ad.nom} - ${ad.distance} NM`
+    list.appendChild(option)
+  })
+}
+
 // Event callbacks
 const elem = new Map()
 elem.set("#callsign", update_plane);
 elem.set("#nb_branches", update_branches)
+elem.set("#destination", update_alternates)
 
-window.addEventListener("DOMContentLoaded", e => {
+window.addEventListener("DOMContentLoaded", async e => {
+  await load_planes()
   elem.forEach((val, key) => {
     document.querySelector(key).addEventListener("change", val)
   })
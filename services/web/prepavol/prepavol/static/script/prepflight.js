@@ -131,6 +131,14 @@ function update_element_HTML(elementId, value, unit = "") {
   document.querySelector(elementId).innerHTML = `${value} ${unit}`.trim()
 }
 
+// Fleet data, fetched from a versioned URL the browser caches
+let planes = null
+
+async function load_planes() {
+  const req = await fetch(fleet_url)
+  planes = await req.json()
+}
+
 async function update_plane() {
   avion = new ACFT()
   params = new ACFTParams()
@@ -270,13 +278,35 @@ function helper_perf(event) {
     update_ad_alt(event)
   }
 }
+// Autocomplete of the aerodrome fields from codes and names
+async function suggest_ads(elem) {
+  const list = document.getElementById(`${elem.id}-list`)
+  if (!elem.value) {
+    return
+  }
+  const req = await fetch(`/ad/search?q=${encodeURIComponent(elem.value)}&n=8`)
+  const res = await req.json()
+  list.innerHTML = ""
+  res.aerodromes.forEach(ad => {
+    const option = document.createElement("option")
+    option.value = ad.code
+    option.label = ad.nom
+    list.appendChild(option)
+  })
+}
+
 async function update_ad_alt(event) {
   event.preventDefault()
   event.stopPropagation()
   const elem = event.target
   const title = document.getElementById(`${elem.id.slice(0, 2)}title`)
+  suggest_ads(elem)
   if (elem.value.length === 4) {
     const req = await fetch(`/ad?code=${elem.value.toUpperCase()}`)
+    if (!req.ok) {
+      title.innerHTML = "?"
+      return
+    }
     const res = await req.json()
     const l = res.alt.toString().length
     const alt = Math.pow(10, l - 1) * Math.round((res.alt * Math.pow(10, -(l))) * 10)
@@ -354,7 +384,8 @@ elem.set("#mainfuel", update_mainfuel);
 elem.set("#leftwingfuel", update_wingfuel);
 elem.set("#rightwingfuel", update_wingfuel)
 elem.set("#auxfuel", update_auxfuel);
-window.addEventListener("DOMContentLoaded", e => {
+window.addEventListener("DOMContentLoaded", async e => {
+  await load_planes()
   elem.forEach((val, key) => {
     document.querySelector(key).addEventListener("change", val)
   })
@@ -0,0 +1,109 @@
+# *_* coding: utf-8 *_*
+
+"""Build the static caches of the application ahead of the first request.
+
+Parsing the yaml files, fitting the performance models and importing the
+modules the views defer take a few seconds, otherwise paid by the first
+requests of every worker. Run in the gunicorn master before it forks,
+with --preload, the caches are built once and the workers share their
+memory pages copy-on-write. The objects are then moved out of the
+garbage collector's reach, so that collections in the workers do not
+write to, and thus copy, those pages.
+
+The caches are still checked against their files on use, and rebuilt in
+a worker if a file changes.
+"""
+
+import gc
+import logging
+from time import perf_counter
+
+from .ads import ad_index
+from .emport_carburant_form import EmportCarburantForm
+from .fleet import fleet_registry
+from .forms import PrepflightForm
+from .links import Links
+from .oils import Avgas
+from .plane_perf import PlanePerf
+from .plot_cache import figure_to_png
+
+__all__ = ["preload"]
+
+
+def _fleet():
+    """Fleet records, table, JSON payloads and form choices."""
+    fleet_registry.table
+    fleet_registry.json_gzip
+    # The forms read the fleet dependent choices on construction
+    for form in (PrepflightForm, EmportCarburantForm):
+        form(meta={"csrf": False})
+
+
+def _aerodromes():
+    """Aerodrome records, spatial index and search keys."""
+    len(ad_index)
+
+
+def _data_files():
+    """Oils and kiosk links."""
+    for plane in fleet_registry.aircraft.values():
+        Avgas(plane.fuel_name)
+    Links()
+
+
+def _performances():
+    """Fitted models and memory-mapped grids of every plane type."""
+    for planetype in sorted({plane.planetype for plane in fleet_registry.aircraft.values()}):
+        for operation in ("takeoff", "landing"):
+            PlanePerf.grid(planetype, operation)
+
+
+def _modules():
+    """Modules the views and plots import on first use, and the fonts."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas  # noqa: F401
+    import PythonMETAR  # noqa: F401
+    import requests  # noqa: F401
+
+    # The first text drawn loads the fonts
+    fig = plt.figure()
+    plt.title("warm-up")
+    plt.tight_layout()
+    figure_to_png(fig)
+
+
+STEPS = {
+    "fleet": _fleet,
+    "aerodromes": _aerodromes,
+    "data files": _data_files,
+    "performances": _performances,
+    "modules": _modules,
+}
+
+
+def preload(freeze=True):
+    """Build all the static caches of the application.
+
+    The forms need an application and request context, which
+    create_app provides.
+
+    Arguments:
+        freeze (bool): move the objects allocated so far to the permanent
+            generation of the garbage collector, see gc.freeze.
+
+    Returns:
+        dict: seconds spent by every step.
+    """
+    timings = {}
+    for name, step in STEPS.items():
+        start = perf_counter()
+        step()
+        timings[name] = perf_counter() - start
+        logging.info("preloaded %s in %.3f s", name, timings[name])
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return timings
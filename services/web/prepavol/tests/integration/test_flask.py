@@ -3,13 +3,19 @@
 """End to end tests.
 """
 
+import gzip
+import html
+import json
 import os
+import re
 import unittest
 
-from PythonMETAR.metar import NOAAServError
 import prepavol
 import prepavol.planes as planes
+from prepavol.metar_service import metar_service
+from prepavol.plot_cache import plot_cache
 from pytest import raises
+from tests.stub_noaa import StubNOAA
 
 class WebAppTestCase(unittest.TestCase):
     """ "Testing the web pages."""
@@ -42,6 +48,36 @@ class WebAppTestCase(unittest.TestCase):
         result = self.app.get("/fleet")
         self.assertEqual(result.status_code, 200)
 
+    def test_fleet_json(self):
+        """Fleet data is served compressed and revalidated by ETag"""
+        digest = planes.fleet_registry.digest
+        result = self.app.get("/fleet.json", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.headers["Content-Encoding"], "gzip")
+        self.assertIn("no-cache", result.headers["Cache-Control"])
+        data = json.loads(gzip.decompress(result.data))
+        self.assertEqual(data, planes.fleet_registry.data)
+        etag = result.headers["ETag"]
+        self.assertEqual(etag, f'"{digest}-gzip"')
+        result = self.app.get(
+            "/fleet.json", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result.data, b"")
+        result = self.app.get(f"/fleet.json?v={digest}")
+        self.assertIsNone(result.headers.get("Content-Encoding"))
+        self.assertEqual(result.headers["ETag"], f'"{digest}"')
+        self.assertIn("max-age=31536000", result.headers["Cache-Control"])
+        self.assertEqual(result.json, data)
+
+    def test_form_pages_link_fleet_json(self):
+        """Form pages link the versioned fleet data instead of embedding it"""
+        digest = planes.fleet_registry.digest
+        for url in ("/devis", "/carburant"):
+            result = self.app.get(url)
+            self.assertIn(f"/fleet.json?v={digest}", result.text)
+            self.assertNotIn("maxmainfuel", result.text)
+
     def test_fuel_page(self):
         result = self.app.get("/carburant")
         self.assertEqual(result.status_code, 200)
@@ -72,6 +108,37 @@ class WebAppTestCase(unittest.TestCase):
             self.app.get("/ad?code=abcdef")
         assert "No such AD name" in str(excinfo.value)
         
+    def test_ad_search(self):
+        result = self.app.get("/ad/search?q=toussus")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json["aerodromes"][0]["code"], "LFPN")
+        self.assertEqual(len(self.app.get("/ad/search?q=L&n=5").json["aerodromes"]), 5)
+        self.assertEqual(self.app.get("/ad/search?q=").json["aerodromes"], [])
+        self.assertEqual(self.app.get("/ad/search?q=L&n=0").status_code, 400)
+    def test_ad_near(self):
+        result = self.app.get("/ad/near?code=lfpo&k=2")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(
+            [ad["code"] for ad in result.json["aerodromes"]], ["LFPV", "LFPN"]
+        )
+        result = self.app.get("/ad/near?lat=48.7233&lon=2.3794&radius=12")
+        codes = [ad["code"] for ad in result.json["aerodromes"]]
+        self.assertEqual(codes, ["LFPO", "LFPV", "LFPN", "LFPL"])
+    def test_ad_near_bad_query(self):
+        self.assertEqual(self.app.get("/ad/near?code=XXXX").status_code, 404)
+        self.assertEqual(self.app.get("/ad/near?lat=48").status_code, 400)
+        self.assertEqual(self.app.get("/ad/near?code=LFPO&k=0").status_code, 400)
+        for query in (
+            "lat=nan&lon=2",
+            "lat=200&lon=2",
+            "lat=48&lon=-181",
+            "lat=48&lon=inf",
+            "lat=48&lon=2&radius=nan",
+            "lat=48&lon=2&radius=-5",
+            "lat=48&lon=2&k=-1",
+        ):
+            self.assertEqual(self.app.get(f"/ad/near?{query}").status_code, 400)
+
     def test_form_missing_pax0(self):
         """Generate an error when pax0 weight is missing"""
 
@@ -121,6 +188,14 @@ class WebAppTestCase(unittest.TestCase):
         result = self.app.post("/validate", data=data)
         self.assertEqual(result.status_code, 422)
 
+    def test_api_unknown_aerodrome(self):
+        """Unknown aerodrome codes are reported with suggestions"""
+        data = {"callsign": self.plane.callsign, "tkaltinput": "LFPW", "ldaltinput": "LFPO"}
+        result = self.app.post("/validate", data=data)
+        self.assertEqual(result.status_code, 422)
+        self.assertIn("voulez-vous dire", result.json["tkaltinput"][0])
+        self.assertNotIn("ldaltinput", result.json)
+
     def test_cg_out_of_envelope(self):
         """Generate a balance error when cg is out the envelope.
         Full tank and weight at the back seats.
@@ -151,6 +226,7 @@ class WebAppTestCase(unittest.TestCase):
         }
         result = self.app.post("/devis", data=data)
         self.assertIn(b"Chargement invalide", result.data)
+        self.assertIn("réservoir principal avec ce chargement : 78L".encode(), result.data)
 
     def test_form_ok(self):
         """Generate a balance report when the form is valid."""
@@ -182,6 +258,56 @@ class WebAppTestCase(unittest.TestCase):
         }
         result = self.app.post("/devis", data=data)
         self.assertIn(b"Autonomie", result.data)
+        self.assertNotIn(b"base64", result.data)
+        urls = [
+            html.unescape(url.decode())
+            for url in re.findall(rb'src="(/plot/[^"]+)"', result.data)
+        ]
+        self.assertEqual(len(urls), 3)
+        for url in urls:
+            image = self.app.get(url)
+            self.assertEqual(image.status_code, 200)
+            self.assertEqual(image.mimetype, "image/png")
+            cached = self.app.get(url, headers={"If-None-Match": image.headers["ETag"]})
+            self.assertEqual(cached.status_code, 304)
+        # Another worker, or a restart, renders the plots again
+        plot_cache.clear()
+        for url in urls:
+            self.assertEqual(self.app.get(url).status_code, 200)
+
+    def test_fleet_feasibility(self):
+        """Every aircraft is evaluated against one loading"""
+        result = self.app.get("/fleet/feasibility?pax0=80&pax1=80&mainfuel=100")
+        self.assertEqual(result.status_code, 200)
+        aircraft = {plane["callsign"]: plane for plane in result.json["aircraft"]}
+        self.assertEqual(set(aircraft), set(planes.fleet_registry.callsigns))
+        plane = planes.WeightBalance(self.callsign, pax0=80, pax1=80, mainfuel=100)
+        report = aircraft[self.callsign]
+        self.assertAlmostEqual(report["auw"], plane.auw, places=1)
+        self.assertAlmostEqual(report["cg"], plane.cg, places=3)
+        self.assertEqual(report["in_envelope"], plane.is_ready_to_fly)
+        self.assertGreater(report["cg_margin"]["forward"], 0)
+        self.assertGreater(report["cg_margin"]["aft"], 0)
+
+    def test_fleet_feasibility_bad_loading(self):
+        """Loadings must be positive numbers"""
+        self.assertEqual(self.app.get("/fleet/feasibility?pax0=abc").status_code, 400)
+        self.assertEqual(self.app.get("/fleet/feasibility?pax0=-80").status_code, 400)
+        self.assertEqual(self.app.get("/fleet/feasibility?pax0=inf").status_code, 400)
+        self.assertEqual(self.app.get("/fleet/feasibility?mainfuel=nan").status_code, 400)
+
+    def test_plot_not_found(self):
+        """Unknown plots are 404"""
+        self.assertEqual(self.app.get("/plot/balance/F-GTZR/abc.png").status_code, 404)
+        self.assertEqual(self.app.get("/plot/balance/F-XXXX/abc.png").status_code, 404)
+        self.assertEqual(
+            self.app.get("/plot/balance/F-GTZR/abc.png?pax0=x").status_code, 404
+        )
+        self.assertEqual(self.app.get("/plot/perf/XX/takeoff/900.png").status_code, 404)
+        self.assertEqual(self.app.get("/plot/perf/S201/cruise/900.png").status_code, 404)
+        for auw in ("nan", "inf", "1e308", "5000", "10"):
+            url = f"/plot/perf/DR400-140B/takeoff/{auw}.png"
+            self.assertEqual(self.app.get(url).status_code, 404)
 
     def test_logout(self):
         """Cover the logout view"""
@@ -205,8 +331,20 @@ class WebAppTestCase(unittest.TestCase):
         result = self.app.get("/metar")
         self.assertEqual(result.status_code, 404)
     def test_metar_ok(self):
-        result = self.app.get("/metar/lfpo")
-        self.assertEqual(result.status_code, 200)
+        with StubNOAA() as stub:
+            metar_service.configure(url=stub.url)
+            metar_service.clear()
+            result = self.app.get("/metar/lfpo")
+            self.assertEqual(result.status_code, 200)
+            result = self.app.get("/metar/lfpo")
+            self.assertEqual(result.status_code, 200)
+            self.assertEqual(stub.hits["LFPO"], 1)
+    def test_metar_unknown(self):
+        with StubNOAA() as stub:
+            metar_service.configure(url=stub.url)
+            metar_service.clear()
+            result = self.app.get("/metar/lfxx")
+            self.assertEqual(result.status_code, 404)
     def test_metar_nok(self):
         result = self.app.get("/metar/abcdef")
         self.assertEqual(result.status_code, 403)
@@ -303,6 +441,102 @@ class WebAppTestCase(unittest.TestCase):
         result = self.app.post("/carburant", data=data)
         self.assertIn(b"compl\xc3\xa9ment de carburant", result.data)
 
+    def test_form_carburant_alternate(self):
+        data = {
+            "pilot_name": self.pilotname,
+            "callsign": "F-GGHJ",
+            "type_vol": "NAV",
+            "nb_branches": 1,
+            "branches-0-distance": 5,
+            "branches-0-vent": 0,
+            "branches-1-distance": 5,
+            "branches-1-vent": 0,
+            "branches-2-distance": 5,
+            "branches-2-vent": 0,
+            "branches-3-distance": 5,
+            "branches-3-vent": 0,
+            "branches-4-distance": 5,
+            "branches-4-vent": 0,
+            "branches-5-distance": 5,
+            "branches-5-vent": 0,
+            "degagement-distance": 5,
+            "degagement-vent": 0,
+            "destination": "lfpo",
+            "alternate": "LFPG",
+            "marge": 10,
+            "mainfuel": 50,
+            "leftwingfuel": 0,
+            "rightwingfuel": 0,
+            "auxfuel": 50,
+            "submit": "Valider"
+        }
+        result = self.app.post("/carburant", data=data)
+        self.assertIn("LFPO → LFPG (18.4 NM)".encode(), result.data)
+        data["alternate"] = "XXXX"
+        result = self.app.post("/carburant", data=data)
+        self.assertIn(b"XXXX inconnu", result.data)
+
+    def test_form_carburant_route(self):
+        data = {
+            "pilot_name": self.pilotname,
+            "callsign": "F-GGHJ",
+            "type_vol": "NAV",
+            "nb_branches": 1,
+            "route": "LFPN LFAB",
+            "wind_direction": 270,
+            "wind_speed": 20,
+            "degagement-distance": 5,
+            "degagement-vent": 0,
+            "marge": 10,
+            "mainfuel": 100,
+            "leftwingfuel": 0,
+            "rightwingfuel": 0,
+            "auxfuel": 50,
+            "submit": "Valider"
+        }
+        for i in range(6):
+            data[f"branches-{i}-distance"] = 5
+            data[f"branches-{i}-vent"] = 0
+        result = self.app.post("/carburant", data=data)
+        self.assertIn("LFPN → LFAB (79.0 NM, cap 320°, Vs 88 kt)".encode(), result.data)
+        # The legs of the route, not the first branch, make a local flight
+        data["type_vol"] = "TDP"
+        result = self.app.post("/carburant", data=data)
+        self.assertIn("ne peut pas dépasser la CTR ou 6,5NM".encode(), result.data)
+        data["type_vol"] = "NAV"
+        data["route"] = "LFPN"
+        result = self.app.post("/carburant", data=data)
+        self.assertIn("au moins deux aérodromes".encode(), result.data)
+
+    def test_fleet_minimum_fuel(self):
+        result = self.app.get("/carburant/fleet?route=LFPN+LFMN&type_vol=nav&marge=10")
+        self.assertEqual(result.status_code, 200)
+        aircraft = {plane["callsign"]: plane for plane in result.json["aircraft"]}
+        self.assertEqual(aircraft["F-GTZR"]["percent"]["auxfuel"], 80)
+        self.assertTrue(aircraft["F-GTZR"]["fits"])
+        result = self.app.get("/carburant/fleet?route=LFPN+LFKJ")
+        self.assertFalse(result.json["aircraft"][0]["fits"])
+
+    def test_fleet_minimum_fuel_strong_wind(self):
+        """Aircraft slower than the wind are not flyable"""
+        for query in ("wind_speed=200", "degagement_vent=120&degagement_distance=10"):
+            result = self.app.get(f"/carburant/fleet?route=LFPN+LFAB&{query}")
+            self.assertEqual(result.status_code, 200)
+            for plane in result.json["aircraft"]:
+                self.assertFalse(plane["flyable"])
+                self.assertFalse(plane["fits"])
+                self.assertIsNone(plane["time"])
+
+    def test_fleet_minimum_fuel_bad_query(self):
+        self.assertEqual(self.app.get("/carburant/fleet?route=LFPN").status_code, 400)
+        self.assertEqual(self.app.get("/carburant/fleet?route=LFPN+LFPW").status_code, 400)
+        self.assertEqual(
+            self.app.get("/carburant/fleet?route=LFPN+LFAB&type_vol=XX").status_code, 400
+        )
+        for query in ("wind_speed=nan", "wind_direction=inf", "degagement_vent=nan"):
+            result = self.app.get(f"/carburant/fleet?route=LFPN+LFAB&{query}")
+            self.assertEqual(result.status_code, 400)
+
     def test_connexion_not_test(self):
         data = {
             "pilot_name": "test",
@@ -0,0 +1,56 @@
+"""Local stand-in for the NOAA METAR server, for the tests
+"""
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+REPORTS = {
+    "LFPO": "2024/05/01 12:00\nLFPO 011200Z 24008KT CAVOK 18/09 Q1016 NOSIG\n",
+    "LFPN": "2024/05/01 12:00\nLFPN 011200Z AUTO 25010KT 9999 BKN030 16/08 Q1015\n",
+}
+
+
+class StubNOAA:
+    """HTTP server answering /<STATION>.TXT from REPORTS, 404 otherwise.
+
+    Arguments:
+        delay (float): seconds to wait before answering.
+
+    Attributes:
+        hits (Counter): requests per station.
+    """
+
+    def __init__(self, delay=0.0):
+        """Init."""
+        self.delay = delay
+        self.hits = Counter()
+        self.reports = dict(REPORTS)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                station = self.path.rsplit("/", 1)[-1].replace(".TXT", "")
+                stub.hits[station] += 1
+                time.sleep(stub.delay)
+                report = stub.reports.get(station)
+                self.send_response(200 if report else 404)
+                self.end_headers()
+                if report:
+                    self.wfile.write(report.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,115 @@
+"""Unit tests of the aerodromes index
+"""
+
+import dataclasses
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from prepavol.ads import (
+    AD_FILE,
+    ADs,
+    Aerodrome,
+    AerodromeIndex,
+    UnknownAerodromeError,
+    dms_to_decimal,
+    normalize,
+)
+
+
+class AerodromeIndexTestCase(unittest.TestCase):
+    """Unit tests of AerodromeIndex"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = Path(self.tmpdir) / "alts.yaml"
+        shutil.copy(AD_FILE, self.path)
+        self.index = AerodromeIndex(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_decoded(self):
+        """Coordinates are decoded once to decimal degrees"""
+        aerodrome = self.index.get("LFAB")
+        self.assertIsInstance(aerodrome, Aerodrome)
+        self.assertEqual(aerodrome.point, [49.8825, 1.08528])
+        self.assertEqual(dms_to_decimal("001°05'07\"W"), -1.08528)
+
+    def test_frozen(self):
+        """Records cannot be modified"""
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            self.index.get("LFAB").alt = 0
+
+    def test_loaded_once(self):
+        """The file is not parsed again while it is unchanged"""
+        self.assertIs(self.index.aerodromes, self.index.aerodromes)
+        self.assertIn("LFPO", self.index)
+
+    def test_reload_on_change(self):
+        """A new mtime triggers a reload"""
+        text = self.path.read_text().replace("nom: DIEPPE SAINT AUBIN", "nom: DIEPPE")
+        self.path.write_text(text)
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.index.get("LFAB").nom, "DIEPPE")
+
+    def test_unknown_code(self):
+        """Unknown codes raise an exception with a few suggestions"""
+        with self.assertRaises(UnknownAerodromeError) as context:
+            self.index.get("LFPW")
+        self.assertIn("No such AD name 'LFPW'. Did you mean", str(context.exception))
+        self.assertLess(len(str(context.exception)), 100)
+
+    def test_normalize(self):
+        """Search keys are uppercase ASCII words"""
+        self.assertEqual(normalize("Saint-Cyr l'École"), "SAINT CYR L ECOLE")
+
+    def test_search_prefix(self):
+        """Codes, names and words of the names are searched by prefix"""
+        self.assertEqual(self.index.search("lfpo"), ["LFPO"])
+        self.assertEqual(self.index.search("LFP", 3), ["LFPA", "LFPB", "LFPD"])
+        self.assertEqual(self.index.search("dieppe"), ["LFAB"])
+        self.assertEqual(self.index.search("aubin"), ["LFAB"])
+        self.assertIn("LFPO", self.index.search("orly"))
+        self.assertEqual(len(self.index.search("L", 10)), 10)
+
+    def test_search_ranking(self):
+        """An exact code comes first, then code prefixes, then names"""
+        results = self.index.search("LF", 500)
+        self.assertEqual(len(results), len(self.index))
+        self.assertEqual(results, sorted(results))
+
+    def test_search_typos(self):
+        """Without any prefix match, one typing error is tolerated"""
+        self.assertEqual(self.index.search("tousus"), ["LFPN"])  # missing letter
+        self.assertEqual(self.index.search("tuossus"), ["LFPN"])  # transposition
+        self.assertEqual(self.index.search("lognse"), ["LFPL"])
+        self.assertEqual(self.index.search("dieppe saint aubn"), ["LFAB"])
+        self.assertEqual(self.index.search("xx"), [])
+        self.assertEqual(self.index.search(""), [])
+
+    def test_alternates(self):
+        """Nearest aerodromes exclude the destination"""
+        alternates = self.index.alternates("LFPO", k=3)
+        self.assertEqual([ad.code for ad, _ in alternates], ["LFPV", "LFPN", "LFPL"])
+        self.assertEqual(alternates[0][1], 8.0)
+        within = self.index.alternates("LFPO", k=50, radius_nm=12)
+        self.assertTrue(all(distance <= 12 for _, distance in within))
+
+    def test_distance(self):
+        """Great-circle distance between two codes"""
+        self.assertAlmostEqual(self.index.distance("LFPO", "LFPG"), 18.4, places=1)
+        self.assertEqual(self.index.distance("LFPO", "LFPO"), 0)
+
+    def test_ads(self):
+        """ADs reads the process-wide index"""
+        terrain = ADs("LFPO")
+        self.assertEqual(terrain.code, "LFPO")
+        self.assertEqual(terrain.get_dict()["geo"], terrain.point)
+
+
+if __name__ == "__main__":
+    unittest.main()
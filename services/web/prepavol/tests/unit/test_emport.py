@@ -2,9 +2,13 @@
 """
 
 from ntpath import join
+import dataclasses
 import unittest
 
-from prepavol.emport_carburant import EmportCarburant
+import numpy as np
+
+from prepavol.emport_carburant import EmportCarburant, FleetFuelPlan, FuelPlan
+from prepavol.fleet import fleet_registry
 from prepavol.emport_carburant_form import TypeVol
 
 class EmportCarburantTest(unittest.TestCase):
@@ -38,6 +42,117 @@ class EmportCarburantTest(unittest.TestCase):
             )
 
 
+    def test_degagement_distance(self):
+        """The alternate's great-circle distance replaces the chosen one"""
+        self.assertEqual(self.bad_emport.degagement_distance, 35)
+        self.assertEqual(self.bad_emport.alternates, [])
+        emport = EmportCarburant(
+            self.callsign,
+            [{"vent":+20, "distance":150}],
+            "NAV",
+            1,
+            {"vent":0, "distance":35},
+            20,
+            100,
+            0,
+            0,
+            100,
+            destination="lfpo",
+            alternate="LFPG",
+            )
+        self.assertEqual(emport.degagement_distance, 18.4)
+        self.assertAlmostEqual(emport.degagement_time, 0.6 * 18.4)
+        self.assertEqual(emport.alternates[0][0].code, "LFPV")
+
+    def test_route(self):
+        """Legs between aerodromes replace the branches"""
+        emport = EmportCarburant(
+            self.callsign,
+            [{"vent":+20, "distance":150}],
+            "NAV",
+            1,
+            {"vent":0, "distance":35},
+            20,
+            100,
+            0,
+            0,
+            100,
+            route="LFPN LFAB LFPN",
+            wind_direction=270,
+            wind_speed=20,
+            )
+        self.assertEqual(emport.nb_branches, 2)
+        self.assertEqual(emport.branches[0]["distance"], 79.0)
+        self.assertEqual(emport.branches_time, tuple(emport.legs.time.tolist()))
+        self.assertAlmostEqual(sum(emport.branches_fuel), sum(emport.branches_time) / 2)
+        self.assertEqual(emport.destination, "LFPN")
+        self.assertEqual(emport.roulage_time, 10)
+
+    def test_tas(self):
+        """Hand-entered branches use the tas"""
+        self.assertEqual(EmportCarburant.calculate_tps_vol_corrige(20, 100, 120), 60)
+        self.assertEqual(self.bad_emport.branches_time, (180 * 60 / 80,))
+
+    def test_plan_computed_once(self):
+        """Totals are read from an immutable plan built from the fleet record"""
+        plan = self.good_emport.plan
+        self.assertIsInstance(plan, FuelPlan)
+        self.assertIs(self.good_emport.plane, fleet_registry.get(self.callsign))
+        self.assertEqual(self.good_emport.sum_fuel, plan.sum_fuel)
+        self.assertEqual(
+            self.good_emport.max_flight_time,
+            plan.sum_carburant_emporte_time - plan.reserve_time,
+        )
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            plan.sum_fuel = 0
+
+    def test_fleet_minimum_fuel(self):
+        """The sweep agrees with the plan of every aircraft"""
+        degagement = {"vent":5, "distance":35}
+        sweep = EmportCarburant.fleet_minimum_fuel(
+            "LFPN LFAB LFPO", "NAV", 10, alternate="LFPG", degagement=degagement,
+            wind_direction=250, wind_speed=15,
+        )
+        self.assertIsInstance(sweep, FleetFuelPlan)
+        self.assertEqual(sweep.callsigns, fleet_registry.callsigns)
+        for i, callsign in enumerate(sweep.callsigns):
+            levels = [int(level) for level in sweep.percent[i]]
+            emport = EmportCarburant(
+                callsign, [], "NAV", 1, degagement, 10, *levels, alternate="LFPG",
+                route="LFPN LFAB LFPO", wind_direction=250, wind_speed=15,
+            )
+            self.assertAlmostEqual(sweep.required[i], emport.sum_fuel)
+            self.assertAlmostEqual(sweep.tanks[i].sum(), emport.sum_fuel)
+            self.assertTrue(emport.authorized())
+
+    def test_fleet_minimum_fuel_tanks(self):
+        """Tanks are filled in order and flagged when too small"""
+        sweep = EmportCarburant.fleet_minimum_fuel("LFPN LFMN", "NAV", 10, callsigns=["F-GTZR"])
+        self.assertEqual(sweep.tanks[0, 0], 110)
+        self.assertGreater(sweep.tanks[0, 3], 0)
+        self.assertEqual(sweep.percent[0].tolist(), [100, 0, 0, 80])
+        self.assertTrue(sweep.fits[0])
+        sweep = EmportCarburant.fleet_minimum_fuel("LFPN LFKJ", "NAV", 10, callsigns=["F-GTZR"])
+        self.assertFalse(sweep.fits[0])
+        self.assertEqual(sweep.tanks[0].tolist(), [110, 0, 0, 50])
+
+    def test_fleet_minimum_fuel_strong_wind(self):
+        """Aircraft slower than the wind are not flyable and do not fit"""
+        sweep = EmportCarburant.fleet_minimum_fuel(
+            "LFPN LFAB", "NAV", 10, wind_direction=0, wind_speed=200
+        )
+        self.assertFalse(sweep.flyable.any())
+        self.assertFalse(sweep.fits.any())
+        self.assertTrue(np.isnan(sweep.time).all())
+        sweep = EmportCarburant.fleet_minimum_fuel(
+            "LFPN LFAB", "NAV", 10, degagement={"distance": 10, "vent": 120}
+        )
+        self.assertFalse(sweep.flyable.any())
+        self.assertTrue(np.isnan(sweep.time).all())
+        sweep = EmportCarburant.fleet_minimum_fuel("LFPN LFAB", "NAV", 10)
+        self.assertTrue(sweep.flyable.all())
+        self.assertTrue((sweep.time > 0).all())
+
     def emport_carburant_classinitiation(self):
         self.assertIsInstance(self.bad_emport, EmportCarburant)
         self.assertIsInstance(self.good_emport, EmportCarburant)
@@ -0,0 +1,114 @@
+"""Unit tests of the cg envelope
+"""
+
+import pickle
+import unittest
+
+import numpy as np
+
+from prepavol.envelope import Envelope, EnvelopeStack
+from prepavol.fleet import fleet_registry
+
+
+class EnvelopeTestCase(unittest.TestCase):
+    """Unit tests of Envelope"""
+
+    def setUp(self):
+        self.envelope = fleet_registry.get("F-GTZR").geometry
+
+    def test_prepared_once(self):
+        """The geometry is held by the fleet record"""
+        self.assertIs(self.envelope, fleet_registry.get("F-GTZR").geometry)
+
+    def test_scalar(self):
+        """Scalar checks return booleans"""
+        self.assertIs(self.envelope.contains(0.4, 800), True)
+        self.assertIs(self.envelope.contains(0.1, 800), False)
+        self.assertIs(self.envelope.contains(0.4, 1100), False)
+
+    def test_boundary(self):
+        """Vertices and edges are not contained"""
+        self.assertFalse(self.envelope.contains(0.205, 601))
+        self.assertFalse(self.envelope.contains(0.205, 700))
+        self.assertFalse(self.envelope.contains(0.5, 1000))
+
+    def test_boundary_array(self):
+        """Vectorized checks exclude vertices and edges too"""
+        cg = np.array([0.205, 0.205, 0.5, 0.4])
+        auw = np.array([601, 700, 1000, 800])
+        np.testing.assert_array_equal(
+            self.envelope.contains(cg, auw), [False, False, False, True]
+        )
+
+    def test_crossings(self):
+        """Crossings are on the boundary of the envelope"""
+        moment, auw, arm = 0.328 * 599 + 80 * 0.41, 679.0, 1.12
+        masses = self.envelope.crossings(moment, auw, arm)
+        self.assertGreater(len(masses), 0)
+        def contains(mass):
+            return self.envelope.contains((moment + arm * mass) / (auw + mass), auw + mass)
+
+        for mass in masses:
+            self.assertFalse(contains(mass))
+            self.assertNotEqual(contains(mass - 0.01), contains(mass + 0.01))
+
+    def test_matches_shapely(self):
+        """Vectorized checks agree with shapely"""
+        from shapely.geometry import Point
+        from shapely.geometry.polygon import Polygon
+
+        polygon = Polygon(self.envelope.points)
+        rng = np.random.default_rng(0)
+        cg = rng.uniform(0.15, 0.6, 2000)
+        auw = rng.uniform(550, 1050, 2000)
+        expected = [polygon.contains(Point(x, y)) for x, y in zip(cg, auw)]
+        np.testing.assert_array_equal(self.envelope.contains(cg, auw), expected)
+        self.assertEqual(
+            [self.envelope.contains(x, y) for x, y in zip(cg.tolist(), auw.tolist())],
+            expected,
+        )
+
+    def test_pickle(self):
+        """Envelopes survive pickling, as sessions are pickled"""
+        clone = pickle.loads(pickle.dumps(self.envelope))
+        np.testing.assert_array_equal(clone.points, self.envelope.points)
+
+
+class EnvelopeStackTestCase(unittest.TestCase):
+    """Unit tests of EnvelopeStack"""
+
+    def setUp(self):
+        self.envelopes = [
+            fleet_registry.get("F-GTZR").geometry,
+            Envelope([(0.2, 600), (0.5, 600), (0.35, 1000)]),
+        ]
+        self.stack = EnvelopeStack(self.envelopes)
+
+    def test_contains(self):
+        """Each point is checked against its own envelope"""
+        rng = np.random.default_rng(0)
+        cg = rng.uniform(0.15, 0.6, (500, 2))
+        auw = rng.uniform(550, 1050, (500, 2))
+        expected = np.column_stack(
+            [envelope.contains(cg[:, i], auw[:, i]) for i, envelope in enumerate(self.envelopes)]
+        )
+        np.testing.assert_array_equal(self.stack.contains(cg, auw), expected)
+
+    def test_limits(self):
+        """Forward and aft limits at a given weight"""
+        forward, aft = self.stack.limits(np.array([700, 800]))
+        np.testing.assert_allclose(forward, [0.205, 0.275])
+        np.testing.assert_allclose(aft, [0.564, 0.425])
+        forward, _ = self.stack.limits(np.array([500, 1100]))
+        self.assertTrue(np.isnan(forward).all())
+
+    def test_take(self):
+        """Subsets keep their envelopes"""
+        subset = self.stack.take([1])
+        self.assertEqual(len(subset), 1)
+        self.assertTrue(subset.contains(np.array([0.35]), np.array([800]))[0])
+        self.assertFalse(subset.contains(np.array([0.55]), np.array([800]))[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
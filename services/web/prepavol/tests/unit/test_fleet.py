@@ -0,0 +1,131 @@
+"""Unit tests of the fleet registry
+"""
+
+import dataclasses
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from prepavol.fleet import FLEET_FILE, Aircraft, FleetDataError, FleetRegistry
+
+
+class FleetRegistryTestCase(unittest.TestCase):
+    """Unit tests of FleetRegistry"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = Path(self.tmpdir) / "fleet.yaml"
+        shutil.copy(FLEET_FILE, self.path)
+        self.registry = FleetRegistry(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_records(self):
+        """Records are keyed by call sign"""
+        plane = self.registry.get("F-GTZR")
+        self.assertIsInstance(plane, Aircraft)
+        self.assertEqual(plane.callsign, "F-GTZR")
+        self.assertEqual(plane.arms["front"], plane.arms.front)
+        self.assertEqual(len(plane.envelope), 5)
+
+    def test_frozen(self):
+        """Records cannot be modified"""
+        plane = self.registry.get("F-GTZR")
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            plane.mtow = 2000
+
+    def test_unknown_callsign(self):
+        """Unknown call sign should raise an exception"""
+        self.assertRaises(Exception, self.registry.get, "FXXX")
+
+    def test_loaded_once(self):
+        """The file is not parsed again while it is unchanged"""
+        self.assertIs(self.registry.data, self.registry.data)
+        self.assertIs(self.registry.get("F-GTZR"), self.registry.get("F-GTZR"))
+
+    def test_reload_on_change(self):
+        """A new mtime triggers a reload"""
+        before = self.registry.get("F-GTZR")
+        text = self.path.read_text().replace("mtow: 1000", "mtow: 1100")
+        self.path.write_text(text)
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        after = self.registry.get("F-GTZR")
+        self.assertIsNot(before, after)
+        self.assertEqual(after.mtow, 1100)
+
+    def test_derived(self):
+        """Derived values are built once per version of the file"""
+        calls = []
+
+        def build(registry):
+            calls.append(registry.version)
+            return list(registry.callsigns)
+
+        version = self.registry.version
+        self.assertIs(self.registry.derived(build), self.registry.derived(build))
+        self.assertEqual(calls, [version])
+        self.assertIs(self.registry.json, self.registry.json)
+        self.assertIn('"F-GTZR"', self.registry.json)
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertNotEqual(self.registry.version, version)
+        self.registry.derived(build)
+        self.assertEqual(calls, [version, self.registry.version])
+
+    def test_table(self):
+        """The fleet is stacked in file order"""
+        table = self.registry.table
+        self.assertEqual(table.callsigns, self.registry.callsigns)
+        row = table.callsigns.index("F-GTZR")
+        plane = self.registry.get("F-GTZR")
+        self.assertEqual(table.mtow[row], plane.mtow)
+        self.assertEqual(table.arms[row].tolist(), plane.arm_vector.tolist())
+        subset = table.take(["F-GTZR"])
+        self.assertEqual(len(subset), 1)
+        self.assertEqual(subset.bew[0], plane.bew)
+
+    def test_optional_tas(self):
+        """The cruise TAS defaults to 100 kt"""
+        self.assertEqual(self.registry.get("F-GTZR").tas, 100)
+        text = self.path.read_text().replace("  mtow: 1000\n", "  mtow: 1000\n  tas: 110\n", 1)
+        self.path.write_text(text)
+        registry = FleetRegistry(self.path)
+        first = registry.callsigns[0]
+        self.assertEqual(registry.get(first).tas, 110)
+        self.assertEqual(registry.table.tas[0], 110)
+
+    def test_missing_field(self):
+        """Incomplete aircraft are rejected"""
+        text = self.path.read_text().replace("  mtow: 1000\n", "", 1)
+        self.path.write_text(text)
+        self.assertRaises(FleetDataError, FleetRegistry(self.path).get, "F-GTZR")
+
+    def test_invalid_reload(self):
+        """An invalid change keeps the previous fleet until the file is fixed"""
+        before = self.registry.get("F-GTZR")
+        version = self.registry.version
+        text = self.path.read_text()
+        stat = self.path.stat()
+        for step, invalid in enumerate(
+            ("F-GTZR: [unclosed\n", text.replace("  mtow: 1000\n", "", 1)), start=1
+        ):
+            self.path.write_text(invalid)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 10**9))
+            with self.assertLogs(level="ERROR"):
+                self.assertIs(self.registry.get("F-GTZR"), before)
+            # The invalid file is not parsed again
+            with patch.object(FleetRegistry, "_load", side_effect=AssertionError):
+                self.assertIs(self.registry.get("F-GTZR"), before)
+            self.assertEqual(self.registry.version, version)
+        self.path.write_text(text.replace("mtow: 1000", "mtow: 1100"))
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 * 10**9))
+        self.assertEqual(self.registry.get("F-GTZR").mtow, 1100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Unit tests of the geo module
+"""
+
+import unittest
+
+import numpy as np
+
+from prepavol.geo import PointIndex, great_circle_nm, initial_course, wind_triangle
+
+
+class GreatCircleTestCase(unittest.TestCase):
+    """Unit tests of great_circle_nm"""
+
+    def test_meridian(self):
+        """A degree of latitude is about 60 NM"""
+        self.assertAlmostEqual(great_circle_nm(45, 2, 46, 2), 60.04, places=2)
+
+    def test_broadcast(self):
+        """Distances broadcast over arrays"""
+        distances = great_circle_nm(0, 0, np.zeros(3), np.array([0, 1, 180]))
+        np.testing.assert_allclose(distances, [0, 60.04, 10807.3], atol=0.1)
+
+
+class CourseTestCase(unittest.TestCase):
+    """Unit tests of initial_course and wind_triangle"""
+
+    def test_cardinal_courses(self):
+        """North, east, south and west along the equator and a meridian"""
+        courses = initial_course(0, 0, np.array([1, 0, -1, 0]), np.array([0, 1, 0, -1]))
+        np.testing.assert_allclose(courses, [0, 90, 180, 270], atol=1e-9)
+
+    def test_head_and_tail_wind(self):
+        """Wind along the course only changes the ground speed"""
+        heading, groundspeed = wind_triangle(np.array([90, 270]), 100, 90, 20)
+        np.testing.assert_allclose(heading, [90, 270])
+        np.testing.assert_allclose(groundspeed, [80, 120])
+
+    def test_crosswind(self):
+        """The heading turns into a crosswind"""
+        heading, groundspeed = wind_triangle(0, 100, 270, 20)
+        self.assertAlmostEqual(float(heading), 360 - np.degrees(np.arcsin(0.2)))
+        self.assertAlmostEqual(float(groundspeed), 100 * np.cos(np.arcsin(0.2)))
+
+    def test_wind_too_strong(self):
+        """No ground speed when the course cannot be held"""
+        _, groundspeed = wind_triangle(np.array([0, 0]), 100, np.array([90, 0]), 120)
+        self.assertTrue(np.isnan(groundspeed).all())
+
+
+class PointIndexTestCase(unittest.TestCase):
+    """Unit tests of PointIndex"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.lat = rng.uniform(41, 51, 500)
+        self.lon = rng.uniform(-5, 9, 500)
+        self.index = PointIndex(self.lat, self.lon)
+
+    def test_within(self):
+        """Radius queries match a brute force scan, nearest first"""
+        for lat, lon, radius in ((46, 2, 50), (48.7, 2.3, 120), (41, -5, 80)):
+            distances = great_circle_nm(lat, lon, self.lat, self.lon)
+            indices, found = self.index.within(lat, lon, radius)
+            self.assertEqual(set(indices), set(np.flatnonzero(distances <= radius)))
+            self.assertTrue(np.all(np.diff(found) >= 0))
+            np.testing.assert_allclose(found, distances[indices])
+
+    def test_nearest(self):
+        """k-NN queries match a brute force scan"""
+        distances = great_circle_nm(44.5, 3.1, self.lat, self.lon)
+        indices, found = self.index.nearest(44.5, 3.1, 7)
+        np.testing.assert_array_equal(indices, np.argsort(distances)[:7])
+
+    def test_nearest_far_away(self):
+        """The search radius grows until enough points are found"""
+        indices, _ = self.index.nearest(-45, 170, 3)
+        self.assertEqual(len(indices), 3)
+        indices, _ = self.index.nearest(46, 2, 1000)
+        self.assertEqual(len(indices), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Startup cost of the prepavol package
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Loaded by the views and plots that need them, never at startup
+DEFERRED = ("pandas", "matplotlib", "sklearn", "shapely", "bs4", "requests", "PythonMETAR")
+
+# Cumulative import time of prepavol, in microseconds: about 0.4 s once
+# the heavy modules are deferred, against 1 s before
+BUDGET_US = 2_000_000
+
+
+def import_times(module):
+    """Cumulative import times in µs of a fresh interpreter importing module."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(ROOT), env.get("PYTHONPATH"))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    """Unit tests of the import time of prepavol"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.times = import_times("prepavol")
+
+    def test_deferred(self):
+        """Heavy dependencies are not imported with the package"""
+        loaded = [name for name in DEFERRED if name in self.times]
+        self.assertEqual(loaded, [])
+
+    def test_fleet_not_loaded(self):
+        """The forms do not read the fleet at import"""
+        code = (
+            "import prepavol.main;"
+            "from prepavol.fleet import fleet_registry;"
+            "assert fleet_registry._state[0] is None"
+        )
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(ROOT), env.get("PYTHONPATH"))))
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env)
+        self.assertEqual(result.returncode, 0)
+
+    def test_budget(self):
+        """The package imports within its time budget"""
+        self.assertLess(self.times["prepavol"], BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Unit tests of the loading module
+"""
+
+import pickle
+import unittest
+
+import numpy as np
+
+from prepavol.fleet import fleet_registry
+from prepavol.loading import STATIONS, LoadingState, arm_vector
+from prepavol.planes import WeightBalance
+
+
+class LoadingStateTestCase(unittest.TestCase):
+    """Unit tests of LoadingState"""
+
+    def setUp(self):
+        self.aircraft = fleet_registry.get("F-GTZR")
+        self.loading = LoadingState(self.aircraft.arm_vector, self.aircraft.bew)
+
+    def test_arm_vector(self):
+        """Arms follow the station order"""
+        arms = arm_vector(self.aircraft.arms)
+        self.assertEqual(arms.shape, (len(STATIONS),))
+        self.assertEqual(arms[STATIONS.index("pax3")], self.aircraft.arms.rear)
+        self.assertEqual(arms[STATIONS.index("rightwingfuel")], self.aircraft.arms.wingfuel)
+        self.assertFalse(arms.flags.writeable)
+
+    def test_moment(self):
+        """Moment is the dot product of masses and arms"""
+        self.loading["pax0"] = 80
+        self.loading["mainfuel"] = 72.5
+        expected = (
+            self.aircraft.bew * self.aircraft.arms.bew
+            + 80 * self.aircraft.arms.front
+            + 72.5 * self.aircraft.arms.mainfuel
+        )
+        self.assertAlmostEqual(self.loading.moment, expected)
+        self.assertEqual(self.loading.auw, self.aircraft.bew + 80 + 72.5)
+        self.assertAlmostEqual(self.loading.cg, expected / self.loading.auw)
+
+    def test_whole_masses(self):
+        """Whole masses read back as int"""
+        self.loading["pax1"] = 75
+        self.assertIsInstance(self.loading["pax1"], int)
+        self.loading["pax1"] = 75.5
+        self.assertEqual(self.loading["pax1"], 75.5)
+
+    def test_copy(self):
+        """Copies do not share masses"""
+        other = self.loading.copy()
+        other["baggage"] = 20
+        self.assertEqual(self.loading["baggage"], 0)
+        self.assertIs(other.arms, self.loading.arms)
+
+    def test_matrix(self):
+        """Loadings stack as the rows of a matrix"""
+        loadings = [
+            WeightBalance("F-GTZR", pax0=pax, mainfuel=50).loading for pax in (60, 80, 100)
+        ]
+        matrix = np.vstack([loading.masses for loading in loadings])
+        np.testing.assert_allclose(
+            matrix @ self.aircraft.arm_vector, [loading.moment for loading in loadings]
+        )
+
+    def test_weight_balance_pickle(self):
+        """WeightBalance still pickles for the sessions"""
+        plane = WeightBalance("F-GTZR", pax0=80, mainfuel=50)
+        copy = pickle.loads(pickle.dumps(plane))
+        self.assertEqual(copy.cg, plane.cg)
+        self.assertEqual(copy.mainfuel, plane.mainfuel)
+        self.assertFalse(hasattr(plane, "__dict__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
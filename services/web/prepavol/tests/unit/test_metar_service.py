@@ -0,0 +1,130 @@
+"""Unit tests of the METAR cache, against a local stub server
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+from prepavol.metar_service import MetarError, MetarService
+from tests.stub_noaa import StubNOAA
+
+
+class MetarServiceTestCase(unittest.TestCase):
+    """Unit tests of MetarService"""
+
+    def setUp(self):
+        self.stub = StubNOAA(delay=0.2).__enter__()
+        self.service = MetarService(url=self.stub.url, ttl=600, timeout=2)
+
+    def tearDown(self):
+        self.service.stop()
+        self.stub.__exit__(None, None, None)
+
+    def test_decoded(self):
+        """The report line is decoded, the date line skipped"""
+        metar = self.service.get("lfpo")
+        self.assertTrue(metar.metar.startswith("LFPO 011200Z"))
+
+    def test_decoder_arguments(self):
+        """The decoder gets the station and the report line, whatever is installed"""
+        decoder = types.ModuleType("PythonMETAR")
+        decoder.Metar = MagicMock(name="Metar")
+        with patch.dict(sys.modules, {"PythonMETAR": decoder}):
+            metar = self.service.get("LFPN")
+            self.assertIs(self.service.get("LFPN"), metar)
+        decoder.Metar.assert_called_once_with(
+            "LFPN", "LFPN 011200Z AUTO 25010KT 9999 BKN030 16/08 Q1015"
+        )
+        self.assertIs(metar, decoder.Metar.return_value)
+        self.assertEqual(self.service.stats, {"hits": 1, "fetches": 1, "stations": 1})
+
+    def test_ttl(self):
+        """A station is fetched once per time to live"""
+        self.service.configure(url=self.stub.url, ttl=0.5, max_stale=0, timeout=2)
+        first = self.service.get("LFPO")
+        self.assertIs(self.service.get("LFPO"), first)
+        self.assertEqual(self.stub.hits["LFPO"], 1)
+        time.sleep(0.5)
+        self.assertIsNot(self.service.get("LFPO"), first)
+        self.assertEqual(self.stub.hits["LFPO"], 2)
+
+    def test_coalescing(self):
+        """Concurrent misses of a station share one fetch"""
+        with ThreadPoolExecutor(10) as pool:
+            metars = list(pool.map(self.service.get, ["LFPO"] * 10))
+        self.assertEqual(self.stub.hits["LFPO"], 1)
+        self.assertTrue(all(metar is metars[0] for metar in metars))
+
+    def test_stale_while_revalidate(self):
+        """An expired report is served while the new one is fetched"""
+        self.service.configure(url=self.stub.url, ttl=0.5, max_stale=600, timeout=2)
+        first = self.service.get("LFPO")
+        time.sleep(0.5)
+        start = time.monotonic()
+        self.assertIs(self.service.get("LFPO"), first)
+        self.assertLess(time.monotonic() - start, self.stub.delay)
+        time.sleep(3 * self.stub.delay)
+        self.assertEqual(self.stub.hits["LFPO"], 2)
+
+    def test_unknown_station(self):
+        """Failures raise MetarError and are remembered for a while"""
+        for _ in range(3):
+            with self.assertRaises(MetarError):
+                self.service.get("LFXX")
+        self.assertEqual(self.stub.hits["LFXX"], 1)
+
+    def test_error_keeps_report(self):
+        """A failed refresh keeps serving the last report, retried later"""
+        self.service.configure(url=self.stub.url, ttl=0.5, max_stale=600, timeout=2)
+        first = self.service.get("LFPO")
+        del self.stub.reports["LFPO"]
+        time.sleep(0.5)
+        self.assertIs(self.service.get("LFPO"), first)
+        time.sleep(3 * self.stub.delay)
+        self.assertIs(self.service.get("LFPO"), first)
+        self.assertEqual(self.stub.hits["LFPO"], 2)
+
+    def test_error_beyond_max_stale(self):
+        """A report failing to refresh for longer than max_stale is dropped"""
+        self.service.configure(
+            url=self.stub.url, ttl=0.3, max_stale=0.8, error_ttl=0.3, timeout=2
+        )
+        first = self.service.get("LFPO")
+        del self.stub.reports["LFPO"]
+        deadline = time.monotonic() + 5
+        with self.assertRaises(MetarError):
+            while time.monotonic() < deadline:
+                self.assertIs(self.service.get("LFPO"), first)
+                time.sleep(0.05)
+
+    def test_unexpected_error(self):
+        """Any failure of a fetch resolves the waiting requests"""
+
+        def fail(station):
+            raise ImportError("no decoder")
+
+        self.service._fetch = fail
+        for _ in range(2):
+            with self.assertRaises(MetarError):
+                self.service.get("LFPO")
+        self.assertEqual(self.service._flights, {})
+
+    def test_refresher(self):
+        """Home stations are fetched in the background"""
+        service = MetarService(url=self.stub.url, ttl=600, timeout=2, stations=["lfpn"])
+        service.start()
+        deadline = time.monotonic() + 5
+        while not self.stub.hits["LFPN"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        service.stop()
+        self.assertEqual(self.stub.hits["LFPN"], 1)
+        self.assertEqual(service.stats["fetches"], 1)
+        service.get("LFPN")
+        self.assertEqual(self.stub.hits["LFPN"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Unit tests of the precomputed performance grids
+"""
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from prepavol.perf_grid import PerfGrid
+from prepavol.plane_perf import PlanePerf
+
+
+class PerfGridTestCase(unittest.TestCase):
+    """Unit tests of PerfGrid"""
+
+    def setUp(self):
+        self.planetype = "DR400-140B"
+        self.digest, self.model = PlanePerf._model_entry(self.planetype, "takeoff")
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_shipped_grids_up_to_date(self):
+        """Grids in ./data match the csv files"""
+        for planetype in ["DR400-120", "DR400-140B", "DR400-160", "S201"]:
+            for operation in ["takeoff", "landing"]:
+                self.assertIsNotNone(PlanePerf.grid(planetype, operation))
+
+    def test_build_and_load(self):
+        """A built grid is memory-mapped back"""
+        PerfGrid.build(self.planetype, "takeoff", self.model, self.digest, self.tmpdir)
+        grid = PerfGrid.load(self.planetype, "takeoff", self.tmpdir)
+        self.assertIsInstance(grid.values, np.memmap)
+        self.assertEqual(grid.digest, self.digest)
+
+    def test_missing_grid(self):
+        """No grid yields None"""
+        self.assertIsNone(PerfGrid.load(self.planetype, "takeoff", self.tmpdir))
+
+    def test_interpolation(self):
+        """Trilinear interpolation stays close to the polynomial"""
+        grid = PerfGrid.build(self.planetype, "takeoff", self.model, self.digest, self.tmpdir)
+        alt = np.linspace(-100, 8000, 101)
+        temp = np.linspace(253, 323, 101)
+        mass = np.linspace(600, 1000, 101)
+        np.testing.assert_allclose(
+            grid.interpolate(alt, temp, mass), self.model(alt, temp, mass), atol=0.5
+        )
+        # Grid nodes are exact
+        node = (grid.alt[3], grid.temp[5], grid.mass[7])
+        self.assertAlmostEqual(float(grid.interpolate(*node)), float(self.model(*node)))
+
+    def test_outside(self):
+        """Conditions outside of the grid are NaN, predict_many falls back"""
+        grid = PlanePerf.grid(self.planetype, "takeoff")
+        self.assertTrue(np.isnan(grid.interpolate(0, 288, 2000)))
+        distances = PlanePerf.predict_many(self.planetype, "takeoff", 2000, 0, 15, 1013)
+        self.assertGreater(distances[0, 0, 0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
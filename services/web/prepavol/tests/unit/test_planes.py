@@ -2,10 +2,13 @@
 """
 
 import unittest
+from unittest.mock import patch
+import numpy as np
 import pandas
 
 from prepavol.planes import WeightBalance
-from prepavol.plane_perf import PlanePerf
+from prepavol.plane_perf import PlanePerf, PerfPolynomial
+from prepavol.plot_cache import plot_cache
 
 class WeightBalanceTestCase(unittest.TestCase):
     """Unit tests of WeightBalance"""
@@ -24,10 +27,10 @@ class WeightBalanceTestCase(unittest.TestCase):
 
     def test_mtow_exceeded(self):
         """All-up weight above MTOW should make is_ready_to_fly False"""
-        self.plane.pax0, self.plane.pax1, self.plane.pax2, self.plane.pax3 = 4 * [100]
-        # Required to update properties
-        _ = self.plane.auw
+        self.plane.pax0, self.plane.pax1, self.plane.pax2, self.plane.pax3 = 4 * [110]
+        self.assertGreater(self.plane.auw, self.plane.mtow)
         self.assertFalse(self.plane.is_ready_to_fly)
+        self.assertIn("All-up weight above MTOW", self.plane.reasons)
 
     def test_cg_out_of_envelope(self):
         """Balance out of envelope should make is_ready_to_fly False"""
@@ -37,12 +40,141 @@ class WeightBalanceTestCase(unittest.TestCase):
         _ = self.plane.cg
         self.assertFalse(self.plane.is_ready_to_fly)
 
+    def test_lazy_update(self):
+        """Derived values are computed once per loading change"""
+        self.plane.pax0 = 80
+        self.assertTrue(self.plane._dirty)
+        auw, cg = self.plane.auw, self.plane.cg
+        self.assertFalse(self.plane._dirty)
+        self.plane.mainfuel = 50
+        self.assertTrue(self.plane._dirty)
+        self.assertGreater(self.plane.auw, auw)
+        self.assertNotEqual(self.plane.cg, cg)
+        self.assertAlmostEqual(self.plane.cg, self.plane.moment / self.plane.auw)
+
+    def test_reasons_cleared(self):
+        """Fixing the loading clears the violations"""
+        self.plane.pax0, self.plane.pax1, self.plane.pax2, self.plane.pax3 = 4 * [110]
+        self.plane.baggage = self.plane.bagmax + 10
+        self.assertIn("Baggage weight over max weight", self.plane.reasons)
+        self.assertIn("All-up weight above MTOW", self.plane.reasons)
+        self.assertEqual(len(self.plane.reasons), len(set(self.plane.reasons)))
+        self.plane.pax0, self.plane.pax1, self.plane.pax2, self.plane.pax3 = 80, 80, 0, 0
+        self.plane.baggage = 0
+        self.plane.mainfuel = 100
+        self.assertEqual(self.plane.reasons, [])
+        self.assertTrue(self.plane.is_ready_to_fly)
+
     def test_plot_balance(self):
         """Test the plot_balance method"""
         self.plane.pax0 = 100
         self.plane.mainfuel_gauge = 4
         self.assertTrue(self.plane.plot_balance(encode=True))
 
+    def test_fuel_burn(self):
+        """Fuel burn goes from the current loading to empty tanks"""
+        self.plane.pax0, self.plane.pax1 = 2 * [80]
+        self.plane.mainfuel = 100
+        self.plane.auxfuel = 40
+        burn = self.plane.fuel_burn(1000)
+        self.assertEqual(len(burn.cg), 1001)
+        self.assertAlmostEqual(burn.cg[0], self.plane.cg)
+        self.assertAlmostEqual(burn.auw[0], self.plane.auw)
+        self.assertEqual(burn.fuel[-1], 0)
+        empty = WeightBalance(self.callsign, pax0=80, pax1=80)
+        self.assertAlmostEqual(burn.cg[-1], empty.cg)
+        self.assertAlmostEqual(burn.auw[-1], empty.auw)
+        self.assertTrue(burn.in_envelope.all())
+        self.assertIsNone(burn.first_out_of_envelope)
+
+    def test_fuel_burn_out_of_envelope(self):
+        """The first loading out of the envelope is reported"""
+        self.plane.pax2, self.plane.pax3 = 2 * [140]
+        self.plane.mainfuel = 60
+        burn = self.plane.fuel_burn(10)
+        self.assertEqual(burn.first_out_index, 0)
+        self.assertEqual(burn.first_out_of_envelope["mainfuel"], 60)
+
+    def test_evaluate_batch(self):
+        """Batch results match one WeightBalance per loading"""
+        loadings = np.array(
+            [
+                [80, 80, 0, 0, 10, 0, 100, 0, 0, 0],
+                [110, 110, 110, 110, 0, 0, 0, 0, 0, 0],
+                [0, 0, 140, 140, 0, 0, 200, 0, 0, 0],
+                [80, 0, 0, 0, 50, 0, 50, 0, 0, 20],
+            ]
+        )
+        batch = WeightBalance.evaluate_batch(self.callsign, loadings)
+        self.assertEqual(len(batch), len(loadings))
+        for i, row in enumerate(loadings.tolist()):
+            plane = WeightBalance(
+                self.callsign, **dict(zip(WeightBalance.batch_columns, row))
+            )
+            self.assertAlmostEqual(batch.auw[i], plane.auw)
+            self.assertAlmostEqual(batch.cg[i], plane.cg)
+            self.assertEqual(batch.endurance[i], plane.endurance)
+            self.assertEqual(batch.ready_to_fly[i], plane.is_ready_to_fly)
+        self.assertEqual(batch.over_mtow.tolist(), [False, True, False, False])
+        self.assertEqual(batch.over_baggage.tolist(), [False, False, False, True])
+
+    def test_evaluate_batch_frame(self):
+        """DataFrame columns are matched by name"""
+        frame = pandas.DataFrame({"mainfuel": [100], "pax0": [80]})
+        batch = WeightBalance.evaluate_batch(self.callsign, frame)
+        plane = WeightBalance(self.callsign, pax0=80, mainfuel=100)
+        self.assertAlmostEqual(batch.cg[0], plane.cg)
+
+    def test_evaluate_fleet(self):
+        """One loading is evaluated on every aircraft"""
+        loading = {"pax0": 80, "pax1": 80, "mainfuel": 100}
+        table, batch = WeightBalance.evaluate_fleet(loading)
+        self.assertEqual(len(batch), len(table))
+        for i, callsign in enumerate(table.callsigns):
+            plane = WeightBalance(callsign, **loading)
+            self.assertAlmostEqual(batch.auw[i], plane.auw)
+            self.assertAlmostEqual(batch.cg[i], plane.cg)
+            self.assertEqual(batch.ready_to_fly[i], plane.is_ready_to_fly)
+
+    def test_max_fuel(self):
+        """Max fuel is the last valid volume of the tank"""
+        self.plane.pax0, self.plane.pax2, self.plane.pax3 = 3 * [100]
+        self.plane.mainfuel = self.plane.maxmainfuel
+        self.assertFalse(self.plane.is_ready_to_fly)
+        volume = self.plane.max_fuel("mainfuel")
+        self.assertAlmostEqual(volume, 78.85, places=2)
+        self.plane.mainfuel = volume - 0.01
+        self.assertTrue(self.plane.is_ready_to_fly)
+        self.plane.mainfuel = volume + 0.01
+        self.assertFalse(self.plane.is_ready_to_fly)
+
+    def test_max_fuel_capacity(self):
+        """A light loading is only limited by the tank"""
+        self.plane.pax0, self.plane.pax1 = 2 * [80]
+        self.assertEqual(self.plane.max_fuel("mainfuel"), self.plane.maxmainfuel)
+        self.assertEqual(self.plane.max_fuel("leftwingfuel"), 0)
+
+    def test_max_baggage(self):
+        """Max baggage is limited by MTOW and sumbagmax"""
+        self.plane.pax0, self.plane.pax1 = 2 * [80]
+        self.plane.mainfuel = 100
+        self.assertEqual(self.plane.max_baggage(), self.plane.sumbagmax)
+        self.plane.pax2, self.plane.pax3 = 2 * [75]
+        self.plane.auxfuel = 20
+        baggage = self.plane.max_baggage()
+        self.assertAlmostEqual(baggage, self.plane.mtow - self.plane.auw)
+        # MTOW is also the top edge of the envelope
+        self.plane.baggage = baggage - 0.01
+        self.assertTrue(self.plane.is_ready_to_fly)
+
+    def test_balance_plot_cached(self):
+        """The same loading is only rendered once"""
+        self.plane.pax0 = 80
+        first = self.plane.balance_png()
+        hits = plot_cache.hits
+        self.assertEqual(self.plane.balance_png(), first)
+        self.assertEqual(plot_cache.hits, hits + 1)
+
 
 class PlanePerfTestCase(unittest.TestCase):
     """Unit tests of PlanePerf"""
@@ -73,6 +205,109 @@ class PlanePerfTestCase(unittest.TestCase):
         """Validate landing distance prediction"""
         self.assertIsInstance(self.planeperf.predict("landing"), pandas.DataFrame)
 
+    def test_model_cache(self):
+        """Models are fitted once per plane type and operation"""
+        other = PlanePerf(self.plane.planetype, 900, 0, 15, 1013)
+        self.assertIs(self.planeperf.make_model("takeoff"), other.make_model("takeoff"))
+        self.assertIsNot(
+            self.planeperf.make_model("takeoff"), self.planeperf.make_model("landing")
+        )
+
+    def test_model_cache_unchanged_file(self):
+        """The csv file is not read again while its mtime and size are unchanged"""
+        self.planeperf.make_model("takeoff")
+        with patch.object(PlanePerf, "_read_data", side_effect=AssertionError):
+            self.planeperf.make_model("takeoff")
+
+    def test_polynomial_matches_sklearn(self):
+        """PerfPolynomial reproduces sklearn's degree 2 regression"""
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import PolynomialFeatures
+        from sklearn.pipeline import make_pipeline
+
+        # S201 data has enough masses for a full rank fit
+        planeperf = PlanePerf("S201", 750, 0, 15, 1013)
+        for operation in ["takeoff", "landing"]:
+            data_df = planeperf._parse_data(planeperf._read_data("S201", operation))
+            pipeline = make_pipeline(PolynomialFeatures(2), LinearRegression())
+            pipeline.fit(data_df.iloc[:, :3].values, data_df.iloc[:, 3].values)
+            conditions = np.column_stack(
+                (
+                    np.linspace(0, 8000, 50),
+                    np.linspace(253, 313, 50),
+                    np.linspace(600, 800, 50),
+                )
+            )
+            model = planeperf.make_model(operation)
+            self.assertIsInstance(model, PerfPolynomial)
+            np.testing.assert_allclose(
+                model.predict(conditions), pipeline.predict(conditions), rtol=0, atol=1e-9
+            )
+
+    def test_polynomial_broadcasting(self):
+        """Scalars and arrays give the same distances"""
+        model = self.planeperf.make_model("takeoff")
+        alts = np.array([0.0, 1000.0, 2000.0])
+        distances = model(alts, 288, self.plane.auw)
+        self.assertEqual(distances.shape, (3,))
+        self.assertAlmostEqual(float(model(1000.0, 288, self.plane.auw)), distances[1])
+
+    @staticmethod
+    def reference_distances(planetype, operation, auw, altitude, temperature, qnh):
+        """One condition evaluated term by term from the fitted polynomial"""
+        zp = altitude + 145442.26627 * (1 - (qnh / 1013.25) ** 0.19035)
+        k = temperature + 273
+        terms = [1, zp, k, auw, zp * zp, zp * k, zp * auw, k * k, k * auw, auw * auw]
+        coefficients = PlanePerf.model(planetype, operation).coefficients
+        distance = sum(float(c) * t for c, t in zip(coefficients, terms))
+        asphalt = [round(distance * w) for w in PlanePerf.wind_factors(operation)]
+        return np.array(
+            [[round(a * f) for a in asphalt] for f in PlanePerf.surface_factors(operation)]
+        )
+
+    def test_predict_many(self):
+        """Batch predictions match the polynomial evaluated row by row"""
+        conditions = pandas.DataFrame(
+            {
+                "auw": [750, 900, 1000],
+                "altitude": [0, 1200, 3000],
+                "temperature": [-5, 25, 35],
+                "qnh": [1030, 1010, 995],
+            }
+        )
+        with patch.object(PlanePerf, "grid", return_value=None):
+            for operation in ["takeoff", "landing"]:
+                distances = PlanePerf.predict_many(self.plane.planetype, operation, conditions)
+                self.assertEqual(
+                    distances.shape,
+                    (3, len(PlanePerf.revetements()), len(PlanePerf.head_winds())),
+                )
+                for k, row in conditions.iterrows():
+                    expected = self.reference_distances(self.plane.planetype, operation, **row)
+                    np.testing.assert_array_equal(distances[k], expected)
+                    self.assertTrue((expected > 0).all())
+
+    def test_predict_many_grid(self):
+        """The grid is close to the polynomial, which takes over outside of it"""
+        grid = PlanePerf.grid(self.plane.planetype, "takeoff")
+        self.assertIsNotNone(grid)
+        # The last two are beyond the masses and the altitudes of the grid
+        conditions = pandas.DataFrame(
+            {
+                "auw": [750, 1000, grid.mass[-1] + 100, 900],
+                "altitude": [0, 3000, 0, grid.alt[-1] + 1000],
+                "temperature": [-5, 35, 15, 15],
+                "qnh": [1030, 995, 1013, 1013],
+            }
+        )
+        distances = PlanePerf.predict_many(self.plane.planetype, "takeoff", conditions)
+        for k, row in conditions.iterrows():
+            expected = self.reference_distances(self.plane.planetype, "takeoff", **row)
+            if k < 2:
+                np.testing.assert_allclose(distances[k], expected, rtol=0.01, atol=2)
+            else:
+                np.testing.assert_array_equal(distances[k], expected)
+
     def test_plot_performance(self):
         """Test plot_performance method"""
         self.assertTrue(self.planeperf.plot_performance("takeoff", encode=True))
@@ -0,0 +1,80 @@
+"""Unit tests of the plot cache
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from prepavol.plot_cache import PlotCache
+
+
+class PlotCacheTestCase(unittest.TestCase):
+    """Unit tests of PlotCache"""
+
+    def setUp(self):
+        self.cache = PlotCache(max_bytes=100)
+
+    def test_key(self):
+        """Keys only depend on the inputs"""
+        self.assertEqual(PlotCache.make_key("a", 1.5), PlotCache.make_key("a", 1.5))
+        self.assertNotEqual(PlotCache.make_key("a", 1.5), PlotCache.make_key("a", 1.6))
+
+    def test_hit_and_miss(self):
+        """Counters follow the lookups"""
+        renders = []
+
+        def render():
+            renders.append(1)
+            return b"png"
+
+        self.assertEqual(self.cache.get_or_render("k", render), b"png")
+        self.assertEqual(self.cache.get_or_render("k", render), b"png")
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.assertEqual(self.cache.stats["misses"], 1)
+
+    def test_lru_eviction(self):
+        """The least recently used images go first when over budget"""
+        self.cache.put("a", 40 * b"a")
+        self.cache.put("b", 40 * b"b")
+        self.cache.get("a")
+        self.cache.put("c", 40 * b"c")
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+        self.assertLessEqual(self.cache.stats["bytes"], 100)
+
+    def test_disk(self):
+        """Images survive on disk when evicted from memory"""
+        directory = tempfile.mkdtemp()
+        try:
+            cache = PlotCache(max_bytes=100, directory=directory)
+            cache.put("a", 60 * b"a")
+            cache.put("b", 60 * b"b")
+            self.assertEqual(cache.get("a"), 60 * b"a")
+            self.assertEqual(cache.stats["disk_hits"], 1)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_disk_budget(self):
+        """The oldest files go first when the folder is over budget"""
+        directory = tempfile.mkdtemp()
+        try:
+            cache = PlotCache(max_bytes=100, directory=directory, max_disk_bytes=100)
+            cache.put("a", 40 * b"a")
+            cache.put("b", 40 * b"b")
+            cache.put("c", 40 * b"c")
+            names = sorted(path.name for path in Path(directory).iterdir())
+            self.assertEqual(names, ["b.png", "c.png"])
+            # The budget covers the files of the other workers too
+            other = PlotCache(max_bytes=100, directory=directory, max_disk_bytes=100)
+            self.assertEqual(other.get("b"), 40 * b"b")
+            other.put("d", 40 * b"d")
+            names = sorted(path.name for path in Path(directory).iterdir())
+            self.assertEqual(names, ["b.png", "d.png"])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Unit tests of the route module
+"""
+
+import unittest
+
+import numpy as np
+
+from prepavol.ads import UnknownAerodromeError, ad_index
+from prepavol.geo import great_circle_nm
+from prepavol.route import parse_route, plan_legs
+
+
+class RouteTestCase(unittest.TestCase):
+    """Unit tests of plan_legs"""
+
+    def test_parse(self):
+        """Codes are split on spaces and dashes"""
+        self.assertEqual(parse_route("lfpn LFAB-LFPO"), ("LFPN", "LFAB", "LFPO"))
+        self.assertEqual(parse_route(["LFPN", "LFAB"]), ("LFPN", "LFAB"))
+
+    def test_no_wind(self):
+        """Without wind, legs are flown at the tas on their course"""
+        legs = plan_legs("LFPN LFAB LFPO", tas=120)
+        self.assertEqual(len(legs), 2)
+        first, second = ad_index.get("LFPN"), ad_index.get("LFAB")
+        self.assertAlmostEqual(
+            legs.distance[0], great_circle_nm(first.lat, first.lon, second.lat, second.lon)
+        )
+        np.testing.assert_allclose(legs.heading, legs.course)
+        np.testing.assert_allclose(legs.time, legs.distance / 120 * 60)
+        np.testing.assert_allclose(legs.fuel(30), legs.time / 2)
+
+    def test_wind(self):
+        """A west wind slows a westbound leg down and speeds the way back up"""
+        legs = plan_legs("LFPO LFPN LFPO", tas=100, wind_from=270, wind_speed=20)
+        self.assertGreater(legs.headwind[0], 0)
+        self.assertAlmostEqual(legs.headwind[1], -legs.headwind[0], delta=0.1)
+        self.assertGreater(legs.time[0], legs.time[1])
+        np.testing.assert_allclose(legs.groundspeed, legs.distance / legs.time * 60)
+
+    def test_same_aerodrome(self):
+        """A leg back to the same aerodrome lasts nothing"""
+        legs = plan_legs(["LFPN", "LFPN"], wind_from=0, wind_speed=20)
+        self.assertEqual(legs.time.tolist(), [0.0])
+
+    def test_invalid_route(self):
+        """Routes need two known aerodromes"""
+        self.assertRaises(ValueError, plan_legs, "LFPN")
+        self.assertRaises(UnknownAerodromeError, plan_legs, "LFPN LFPW")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Unit tests of the cache warm-up
+"""
+
+import os
+import sys
+import unittest
+
+import prepavol
+from prepavol import file_reader, plane_perf
+from prepavol.fleet import fleet_registry
+from prepavol.warmup import STEPS, preload
+
+
+class WarmupTestCase(unittest.TestCase):
+    """Unit tests of preload"""
+
+    def setUp(self):
+        os.environ["FLASK_ENV"] = "testing"
+        self.app = prepavol.create_app()
+
+    def test_preload(self):
+        """Every static cache is built"""
+        with self.app.test_request_context():
+            timings = preload(freeze=False)
+        self.assertEqual(list(timings), list(STEPS))
+        planetypes = {plane.planetype for plane in fleet_registry.aircraft.values()}
+        for planetype in planetypes:
+            self.assertIn((planetype, "takeoff"), plane_perf._models)
+            self.assertIn((planetype, "landing"), plane_perf._grids)
+        self.assertIn("data/oil.yaml", file_reader._parsed)
+        self.assertIn("matplotlib.pyplot", sys.modules)
+
+    def test_file_reader_cache(self):
+        """Yaml files are parsed once while unchanged"""
+        reader = file_reader.FileReader("data/oil.yaml")
+        self.assertIs(reader.readfile(), reader.readfile())
+
+
+if __name__ == "__main__":
+    unittest.main()